@@ -0,0 +1,217 @@
+"""
+Admission control and request deadlines. Excess load is shed with a 503 at
+the door once too many requests are in flight, or once responses have got
+slow, instead of letting every request slow down together. Only routes on the
+default deadline feed the latency signal; the ones given longer deadlines are
+slow by design. Admitted requests
+get a per-route deadline: each database transaction they open is limited to
+the time left with statement_timeout, provider calls get it as their HTTP
+timeout, and a client that disconnects has its running statement cancelled.
+"""
+
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, Dict, Optional, Set
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 64))
+# Time to first response byte, smoothed, above which the worker counts as overloaded
+ADMISSION_MAX_LATENCY_SECONDS = float(os.getenv("ADMISSION_MAX_LATENCY_SECONDS", 2))
+# While overloaded only this many requests run at once, so latency can recover
+ADMISSION_OVERLOAD_IN_FLIGHT = int(os.getenv("ADMISSION_OVERLOAD_IN_FLIGHT", 8))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 30))
+
+# Chat waits on remote models; the hedge needs room for a second provider.
+# Exports stream whole tables from one transaction.
+DEFAULT_ROUTE_DEADLINES: Dict[str, float] = {"/chat": 40, "/admin/exports": 300}
+
+def parse_deadlines(spec: str) -> Dict[str, float]:
+    """Parse ROUTE_DEADLINES, e.g. "/chat=40,/admin/exports=300" (path prefix=seconds)"""
+    deadlines: Dict[str, float] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        prefix, seconds = item.strip().rsplit("=", 1)
+        deadlines[prefix.strip()] = float(seconds)
+    return deadlines
+
+ROUTE_DEADLINES_SPEC = os.getenv("ROUTE_DEADLINES")
+ROUTE_DEADLINES = parse_deadlines(ROUTE_DEADLINES_SPEC) if ROUTE_DEADLINES_SPEC is not None else dict(DEFAULT_ROUTE_DEADLINES)
+
+def deadline_for(path: str) -> float:
+    """Seconds allowed for a request to path: the longest matching prefix, else the default"""
+    matches = [prefix for prefix in ROUTE_DEADLINES if path.startswith(prefix)]
+    return ROUTE_DEADLINES[max(matches, key=len)] if matches else REQUEST_DEADLINE_SECONDS
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time, or its client went away, before its next transaction"""
+
+class RequestControl:
+    """Deadline and cancellation for one request, shared with the database connections it uses"""
+
+    def __init__(self, timeout: float, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + timeout
+        self.cancelled = False
+        self.responded = False
+        self._connections: Set[Any] = set()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return self.expires_at - self.clock()
+
+    def attach(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            self._connections.add(dbapi_connection)
+
+    def detach(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+
+    def respond(self) -> None:
+        with self._lock:
+            self.responded = True
+
+    def cancel(self) -> None:
+        """The client went away: cancel the statements still running for it"""
+        with self._lock:
+            if self.responded:
+                return
+            self.cancelled = True
+            for connection in self._connections:
+                try:
+                    connection.cancel()
+                except Exception:
+                    logger.exception("Could not cancel a statement for a disconnected client")
+
+current: ContextVar[Optional[RequestControl]] = ContextVar("request_control", default=None)
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None outside a request"""
+    control = current.get()
+    return None if control is None else control.remaining()
+
+def is_cancelled_statement(error: DBAPIError) -> bool:
+    # query_canceled: statement_timeout fired, or the statement was cancelled
+    return getattr(error.orig, "pgcode", None) == "57014"
+
+# Every ORM transaction opened while serving a request, whichever session it is on
+@event.listens_for(Session, "after_begin")
+def _apply_deadline(session: Session, transaction: Any, connection: Any) -> None:
+    control = current.get()
+    if control is None:
+        return
+    left = control.remaining()
+    if control.cancelled or left <= 0:
+        raise DeadlineExceeded()
+    if connection.dialect.name != "postgresql":
+        return
+    # SET LOCAL ends with the transaction, so the pooled connection goes back clean
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(left * 1000), 1)}")
+    proxied = connection.connection
+    proxied.info["request_control"] = control
+    control.attach(proxied.dbapi_connection)
+
+@event.listens_for(Pool, "checkin")
+def _release_connection(dbapi_connection: Any, connection_record: Any) -> None:
+    # Before the pool hands the connection to anyone else, so a late cancel cannot reach them
+    control: Optional[RequestControl] = connection_record.info.pop("request_control", None)
+    if control is not None:
+        control.detach(dbapi_connection)
+
+class AdmissionController:
+    """In-flight count and smoothed latency for one worker, deciding who gets in"""
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, max_latency: float = ADMISSION_MAX_LATENCY_SECONDS,
+                 overload_in_flight: int = ADMISSION_OVERLOAD_IN_FLIGHT, smoothing: float = 0.2):
+        self.max_in_flight = max_in_flight
+        self.max_latency = max_latency
+        self.overload_in_flight = overload_in_flight
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency = 0.0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        with self._lock:
+            limit = self.overload_in_flight if self.latency > self.max_latency else self.max_in_flight
+            if self.in_flight >= limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.latency += self.smoothing * (seconds - self.latency)
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+controller = AdmissionController()
+
+class AdmissionMiddleware:
+    """Plain ASGI middleware: sheds load, then runs the request under its deadline"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController = controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Batch sub-requests were admitted with their batch and share its deadline
+        if scope["type"] != "http" or "batch" in scope:
+            await self.app(scope, receive, send)
+            return
+        if not self.controller.admit():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Server busy, try again shortly"}'})
+            return
+        deadline = deadline_for(scope["path"])
+        # A model call or an export taking seconds is normal, not a sign of overload
+        observed = deadline <= REQUEST_DEADLINE_SECONDS
+        control = RequestControl(deadline)
+        token = current.set(control)
+        started = time.perf_counter()
+        # One message of lookahead: the app still reads the body at its own pace,
+        # and once it is read the watcher is left waiting for the disconnect
+        inbox: "asyncio.Queue[Message]" = asyncio.Queue(maxsize=1)
+
+        async def watch() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    control.cancel()
+                await inbox.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def send_watched(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                control.respond()
+                if observed:
+                    self.controller.observe(time.perf_counter() - started)
+            await send(message)
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await self.app(scope, inbox.get, send_watched)
+        finally:
+            watcher.cancel()
+            current.reset(token)
+            self.controller.release()
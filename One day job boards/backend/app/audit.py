@@ -0,0 +1,126 @@
+"""
+Audit log: requests record status and role changes onto a bounded in-process
+queue and return; a background writer drains it into audit_events with
+multi-row INSERTs, whenever a batch fills up or the flush interval passes.
+A full queue blocks the caller briefly (backpressure) before dropping.
+"""
+
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import queue
+import threading
+import uuid
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 1))
+# How long a request waits for room in a full queue before the event is dropped
+AUDIT_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_SECONDS", 2))
+
+Event = Dict[str, Any]
+
+class AuditLog:
+    """Bounded queue of audit events plus the thread that writes them out"""
+
+    def __init__(self, maxsize: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 interval: float = AUDIT_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Event]" = queue.Queue(maxsize=maxsize)
+        # A batch that failed to write; retried before anything newer
+        self._pending: List[Event] = []
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, actor_id: Any, action: str, entity_type: str, entity_id: Any,
+               old_value: Optional[str] = None, new_value: Optional[str] = None) -> None:
+        event = {
+            "id": uuid.uuid4(),
+            "occurred_at": datetime.utcnow(),
+            "actor_id": actor_id,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "old_value": old_value,
+            "new_value": new_value,
+        }
+        try:
+            self._queue.put(event, timeout=AUDIT_ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            self.dropped += 1
+            logger.error("Audit queue full, dropped %s on %s %s", action, entity_type, entity_id)
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _drain(self) -> List[Event]:
+        events: List[Event] = []
+        while len(events) < self.batch_size:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def flush(self, db: Session) -> int:
+        """Write everything queued so far in batches; returns the number of events written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                if not self._pending:
+                    self._pending = self._drain()
+                if not self._pending:
+                    return written
+                db.execute(insert(models.AuditEvent), self._pending)
+                db.commit()
+                written += len(self._pending)
+                self._pending = []
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer after a final flush of everything still queued"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    def _write(self) -> None:
+        db = SessionLocal()
+        try:
+            self.flush(db)
+        except Exception:
+            logger.exception("Writing audit events failed; %d waiting", len(self._pending) + self._queue.qsize())
+            db.rollback()
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._write()
+        self._write()
+
+log = AuditLog()
+
+def record(actor_id: Any, action: str, entity_type: str, entity_id: Any,
+           old_value: Optional[str] = None, new_value: Optional[str] = None) -> None:
+    log.record(actor_id, action, entity_type, entity_id, old_value, new_value)
@@ -1,16 +1,20 @@
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from . import models, database
+from . import models, database, cache
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import hashlib
+import secrets
+import uuid
 
 SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", 14))
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -33,15 +37,86 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _hash_refresh_token(token: str) -> str:
+    # Tokens are 256 random bits, so a fast digest is enough; no password KDF needed
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def create_refresh_token(db: Session, user_id: Any, family_id: Optional[uuid.UUID] = None) -> str:
+    """Store a new refresh token for user_id and return its only plaintext copy"""
+    token = secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4(),
+        expires_at=_utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+    return token
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[models.User, str]:
+    """
+    Exchange a refresh token for its successor. Presenting a token that was
+    already rotated means it leaked, so the whole family is revoked.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    query = db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == _hash_refresh_token(token))
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update()  # two concurrent refreshes must not both win
+    stored = query.first()
+    if stored is None:
+        raise invalid
+    now = _utcnow()
+    if stored.revoked_at is not None:
+        revoke_refresh_tokens(db, family_id=stored.family_id)
+        raise invalid
+    if stored.expires_at <= now:
+        raise invalid
+    user = db.query(models.User).filter(models.User.id == stored.user_id).first()
+    if user is None or user.deactivated_at is not None:
+        raise invalid
+    stored.revoked_at = now
+    return user, create_refresh_token(db, user.id, family_id=stored.family_id)
+
+def revoke_refresh_tokens(db: Session, user_id: Any = None, family_id: Any = None) -> None:
+    """Revoke every live refresh token of a user or of one login family, and commit"""
+    query = db.query(models.RefreshToken).filter(models.RefreshToken.revoked_at.is_(None))
+    if user_id is not None:
+        query = query.filter(models.RefreshToken.user_id == user_id)
+    if family_id is not None:
+        query = query.filter(models.RefreshToken.family_id == family_id)
+    query.update({models.RefreshToken.revoked_at: _utcnow()}, synchronize_session=False)
+    db.commit()
+
+def issue_tokens(db: Session, user: models.User) -> Dict[str, str]:
+    return {
+        "access_token": create_access_token(data={"sub": user.username}),
+        "refresh_token": create_refresh_token(db, user.id),
+        "token_type": "bearer",
+    }
+
 def authenticate_user(db: Session, username: str, password: str):
     user = db.query(models.User).filter(models.User.username == username).first()
-    if not user:
+    if not user or user.deactivated_at is not None:
         return False
     if not verify_password(password, str(user.password_hash)):
         return False
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> models.User:
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> models.User:
+    batch: Optional[database.BatchScope] = request.scope.get("batch")
+    if batch is not None and batch.user is not None:
+        # Authenticated once for the batch; attached to this sub-request's own session
+        return db.merge(batch.user, load=False)
+    return user_from_token(db, token)
+
+def user_from_token(db: Session, token: str) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,8 +131,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if user is None:
+    user = cache.cached_lookup(db, models.User, "username", username)
+    # A deactivated account is being purged; its unexpired access tokens must not write anything more
+    if user is None or user.deactivated_at is not None:
         raise credentials_exception
     return user
 
@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import os
+import tempfile
+
+BLOB_ROOT = os.getenv("BLOB_ROOT", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "blobs"))
+BLOB_CHUNK_SIZE = 1024 * 1024
+READ_SIZE = 64 * 1024
+MAX_SUBMISSION_BYTES = int(os.getenv("MAX_SUBMISSION_BYTES", 100 * 1024 * 1024))
+
+@dataclass
+class BlobInfo:
+    ref: str  # sha256 of the whole content
+    size: int
+
+class BlobStore:
+    """
+    Content-addressed storage on the local filesystem. Content is split into
+    fixed-size chunks stored under their own hash, and a small manifest
+    stored under the hash of the whole content lists them in order.
+    """
+
+    def __init__(self, root: str = BLOB_ROOT, chunk_size: int = BLOB_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def _path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.root, kind, digest[:2], digest)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        if os.path.exists(path):
+            return  # same hash, same bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def _put_chunk(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_atomic(self._path("chunks", digest), data)
+        return digest
+
+    async def write_stream(self, stream: AsyncIterator[bytes], max_size: int = MAX_SUBMISSION_BYTES) -> BlobInfo:
+        """Store a byte stream holding at most one chunk in memory"""
+        content_hash = hashlib.sha256()
+        chunks: List[str] = []
+        buffer = bytearray()
+        size = 0
+        async for piece in stream:
+            size += len(piece)
+            if size > max_size:
+                raise HTTPException(status_code=413, detail="Submission too large")
+            content_hash.update(piece)
+            buffer += piece
+            while len(buffer) >= self.chunk_size:
+                chunks.append(await run_in_threadpool(self._put_chunk, bytes(buffer[:self.chunk_size])))
+                del buffer[:self.chunk_size]
+        if buffer:
+            chunks.append(await run_in_threadpool(self._put_chunk, bytes(buffer)))
+        ref = content_hash.hexdigest()
+        manifest = json.dumps({"size": size, "chunk_size": self.chunk_size, "chunks": chunks}).encode()
+        await run_in_threadpool(self._write_atomic, self._path("manifests", ref), manifest)
+        return BlobInfo(ref=ref, size=size)
+
+    def write_bytes(self, data: bytes) -> BlobInfo:
+        chunks = [self._put_chunk(data[i:i + self.chunk_size]) for i in range(0, len(data), self.chunk_size)]
+        ref = hashlib.sha256(data).hexdigest()
+        manifest = json.dumps({"size": len(data), "chunk_size": self.chunk_size, "chunks": chunks}).encode()
+        self._write_atomic(self._path("manifests", ref), manifest)
+        return BlobInfo(ref=ref, size=len(data))
+
+    def iter_range(self, ref: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive) of a blob, reading only the chunks that overlap"""
+        with open(self._path("manifests", ref), "rb") as f:
+            manifest = json.load(f)
+        size, chunk_size = manifest["size"], manifest["chunk_size"]
+        end = size - 1 if end is None else min(end, size - 1)
+        position = start
+        while position <= end:
+            index, offset = divmod(position, chunk_size)
+            with open(self._path("chunks", manifest["chunks"][index]), "rb") as chunk:
+                chunk.seek(offset)
+                remaining = min(chunk_size - offset, end - position + 1)
+                while remaining > 0:
+                    data = chunk.read(min(READ_SIZE, remaining))
+                    if not data:
+                        return
+                    remaining -= len(data)
+                    position += len(data)
+                    yield data
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=" Range header into inclusive offsets; None means the whole blob"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+store = BlobStore()
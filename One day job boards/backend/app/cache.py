@@ -0,0 +1,393 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from sqlalchemy import Uuid, event, func, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Set
+from datetime import date, datetime
+from decimal import Decimal
+import logging
+import math
+import os
+import random
+import select as io_select
+import threading
+import time
+import uuid
+import orjson
+from .database import engine
+from .processes import LocalSQLite
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 60))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+# Larger beta recomputes hot keys earlier before they expire (probabilistic early refresh)
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", 1.0))
+
+@dataclass
+class Entry:
+    data: Optional[Dict[str, Any]]  # column values of the cached row; None for a tombstone
+    expires_at: float  # wall clock, shared between processes
+    compute_seconds: float  # how long the load took, drives early refresh
+    invalidated_at: Optional[float] = None  # set on tombstones: when the key was invalidated
+
+class Backend(Protocol):
+    def get(self, key: str) -> Optional[Entry]: ...
+    def store(self, key: str, entry: Entry, loaded_since: float) -> None:
+        """Set entry unless the key was invalidated at or after loaded_since, when its load began"""
+    def tombstone(self, keys: Iterable[str], at: float, expires_at: float) -> None: ...
+    def clear(self) -> None: ...
+
+class LRUBackend:
+    """In-process LRU; peers learn about writes through the broadcaster"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _set(self, key: str, entry: Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def store(self, key: str, entry: Entry, loaded_since: float) -> None:
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.invalidated_at is not None and current.invalidated_at >= loaded_since:
+                return
+            self._set(key, entry)
+
+    def tombstone(self, keys: Iterable[str], at: float, expires_at: float) -> None:
+        with self._lock:
+            for key in keys:
+                self._set(key, Entry(None, expires_at, 0.0, at))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteBackend:
+    """Entries in a SQLite file shared by every worker process on the host, as orjson column dicts"""
+
+    def __init__(self, path: str):
+        self.db = LocalSQLite(path, [
+            "CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value BLOB, "
+            "expires_at REAL NOT NULL, compute_seconds REAL NOT NULL, invalidated_at REAL)"
+        ])
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self.db.connection().execute(
+            "SELECT value, expires_at, compute_seconds, invalidated_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at, compute_seconds, invalidated_at = row
+        return Entry(None if value is None else orjson.loads(value), expires_at, compute_seconds, invalidated_at)
+
+    def store(self, key: str, entry: Entry, loaded_since: float) -> None:
+        # One statement, so an invalidation cannot land between the check and the write
+        self.db.connection().execute(
+            "INSERT INTO cache_entries (key, value, expires_at, compute_seconds) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+            "compute_seconds = excluded.compute_seconds, invalidated_at = NULL "
+            "WHERE cache_entries.invalidated_at IS NULL OR cache_entries.invalidated_at < ?",
+            (key, orjson.dumps(entry.data, default=str), entry.expires_at, entry.compute_seconds, loaded_since),
+        )
+
+    def tombstone(self, keys: Iterable[str], at: float, expires_at: float) -> None:
+        self.db.connection().executemany(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, compute_seconds, invalidated_at) "
+            "VALUES (?, NULL, ?, 0, ?)",
+            [(key, expires_at, at) for key in keys],
+        )
+
+    def clear(self) -> None:
+        self.db.connection().execute("DELETE FROM cache_entries")
+
+class Broadcaster(Protocol):
+    def publish(self, keys: List[str]) -> None: ...
+    def start(self, on_invalidate: Callable[[List[str]], None]) -> None: ...
+    def stop(self) -> None: ...
+
+class LocalBroadcaster:
+    """Single-process deployments: nothing to tell"""
+
+    def publish(self, keys: List[str]) -> None:
+        pass
+
+    def start(self, on_invalidate: Callable[[List[str]], None]) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+class PostgresBroadcaster:
+    """Fan invalidations out to every worker with LISTEN/NOTIFY on the primary database"""
+
+    CHANNEL = "entity_cache_invalidation"
+    MAX_PAYLOAD = 7900  # NOTIFY payloads are limited to 8000 bytes
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, keys: List[str]) -> None:
+        payloads: List[str] = []
+        current = ""
+        for key in keys:
+            if current and len(current) + len(key) + 1 > self.MAX_PAYLOAD:
+                payloads.append(current)
+                current = ""
+            current = f"{current}\n{key}" if current else key
+        if current:
+            payloads.append(current)
+        with self.engine.begin() as conn:
+            for payload in payloads:
+                conn.execute(select(func.pg_notify(self.CHANNEL, payload)))
+
+    def start(self, on_invalidate: Callable[[List[str]], None]) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, args=(on_invalidate,), name="cache-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self, on_invalidate: Callable[[List[str]], None]) -> None:
+        while not self._stop.is_set():
+            try:
+                # Dedicated connection outside the pool; it blocks in LISTEN for the process lifetime
+                cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+                conn = self.engine.dialect.connect(*cargs, **cparams)
+                conn.autocommit = True
+                try:
+                    conn.cursor().execute(f"LISTEN {self.CHANNEL}")
+                    # Anything may have changed while we were not listening
+                    on_invalidate([])
+                    while not self._stop.is_set():
+                        if io_select.select([conn], [], [], 1.0)[0]:
+                            conn.poll()
+                            keys: List[str] = []
+                            while conn.notifies:
+                                keys += conn.notifies.pop(0).payload.split("\n")
+                            if keys:
+                                on_invalidate(keys)
+                finally:
+                    conn.close()
+            except Exception:
+                logger.exception("Cache invalidation listener failed; reconnecting")
+                self._stop.wait(5)
+
+@dataclass
+class Stats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class EntityCache:
+    """
+    Read-through cache of ORM rows keyed by table, column and value. Rows are
+    stored as plain column dicts and re-attached to the caller's session with
+    merge(load=False), so cached entities behave like freshly loaded ones.
+    Invalidation leaves a tombstone for one TTL, so a load that began before
+    the write cannot put the stale row back when it finishes.
+    """
+
+    def __init__(self, backend: Backend, broadcaster: Broadcaster, ttl: float = CACHE_TTL_SECONDS,
+                 beta: float = CACHE_EARLY_REFRESH_BETA, clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.broadcaster = broadcaster
+        self.ttl = ttl
+        self.beta = beta
+        self.clock = clock
+        self.stats: Dict[str, Stats] = {}
+        # Column names each cached table is looked up by; used to build invalidation keys
+        self.lookup_fields: Dict[str, Set[str]] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        self._loading_lock = threading.Lock()
+        self._cleared_at = 0.0  # loads that began before a full clear are not stored
+
+    def register(self, model: Any, *fields: str) -> None:
+        """Declare the columns model is looked up by, so every writer knows which keys to invalidate"""
+        self.lookup_fields.setdefault(model.__tablename__, set()).update(fields)
+
+    @staticmethod
+    def key(table: str, field: str, value: Any) -> str:
+        return f"{table}:{field}:{value}"
+
+    def _fresh(self, entry: Optional[Entry]) -> bool:
+        if entry is None or entry.data is None:
+            return False
+        # XFetch: expire a little early with a probability that grows near expiry,
+        # so one caller refreshes a hot key before the whole fleet misses at once
+        jitter = entry.compute_seconds * self.beta * -math.log(max(random.random(), 1e-12))
+        return self.clock() + jitter < entry.expires_at
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._loading_lock:
+            lock = self._loading.get(key)
+            if lock is None:
+                lock = self._loading[key] = threading.Lock()
+            return lock
+
+    def get(self, db: Session, model: Any, field: str, value: Any, load: Callable[[], Any]) -> Any:
+        if self.ttl <= 0:
+            return load()
+        table = model.__tablename__
+        stats = self.stats.setdefault(table, Stats())
+        key = self.key(table, field, value)
+        entry = self.backend.get(key)
+        if self._fresh(entry):
+            stats.hits += 1
+            return self._attach(db, model, entry.data)  # type: ignore[union-attr]
+        # Single flight: concurrent misses on one key in this process share one load
+        lock = self._key_lock(key)
+        with lock:
+            entry = self.backend.get(key)
+            if self._fresh(entry):
+                stats.hits += 1
+                return self._attach(db, model, entry.data)  # type: ignore[union-attr]
+            stats.misses += 1
+            loaded_since = self.clock()
+            started = time.perf_counter()
+            obj = load()
+            if obj is not None and loaded_since > self._cleared_at:
+                data = {attr.key: getattr(obj, attr.key) for attr in inspect(model).column_attrs}
+                entry = Entry(data, self.clock() + self.ttl, time.perf_counter() - started)
+                self.backend.store(key, entry, loaded_since)
+        with self._loading_lock:
+            if not lock.locked():
+                self._loading.pop(key, None)
+        return obj
+
+    @staticmethod
+    def _attach(db: Session, model: Any, data: Dict[str, Any]) -> Any:
+        obj = model(**{key: _restore(model, key, value) for key, value in data.items()})
+        make_transient_to_detached(obj)
+        return db.merge(obj, load=False)
+
+    def keys_for(self, obj: Any) -> List[str]:
+        """Cache keys naming obj under every lookup field, including values it had before this flush"""
+        table = getattr(obj, "__tablename__", None)
+        fields = self.lookup_fields.get(table) if table else None
+        if not fields:
+            return []
+        state = inspect(obj)
+        keys: List[str] = []
+        for field in fields:
+            history = state.attrs[field].history
+            for value in (*history.added, *history.unchanged, *history.deleted):
+                if value is not None:
+                    keys.append(self.key(table, field, value))
+        return keys
+
+    def _tombstone(self, keys: List[str]) -> None:
+        now = self.clock()
+        self.backend.tombstone(keys, now, now + self.ttl)
+
+    def invalidate(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        self._tombstone(keys)
+        try:
+            self.broadcaster.publish(keys)
+        except Exception:
+            logger.exception("Failed to broadcast cache invalidation")
+
+    def on_peer_invalidate(self, keys: List[str]) -> None:
+        if keys:
+            self._tombstone(keys)
+        else:
+            self._cleared_at = self.clock()
+            self.backend.clear()
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.stats.clear()
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            table: {"hits": s.hits, "misses": s.misses, "hit_rate": round(s.hit_rate, 4)}
+            for table, s in self.stats.items()
+        }
+
+# Column types that come back from the SQLite backend's JSON as strings
+_RESTORERS: Dict[type, Callable[[str], Any]] = {
+    uuid.UUID: uuid.UUID,
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    Decimal: Decimal,
+}
+
+def _restore(model: Any, key: str, value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    try:
+        python_type = inspect(model).columns[key].type.python_type
+    except (KeyError, NotImplementedError):
+        return value
+    restore = _RESTORERS.get(python_type)
+    return value if restore is None else restore(value)
+
+def _from_env() -> EntityCache:
+    """CACHE_BACKEND: memory (default), sqlite:///path shared by local workers, or none"""
+    spec = os.getenv("CACHE_BACKEND", "memory")
+    backend: Backend = SQLiteBackend(spec[len("sqlite:///"):]) if spec.startswith("sqlite:///") else LRUBackend()
+    broadcaster: Broadcaster = PostgresBroadcaster(engine) if engine.dialect.name == "postgresql" else LocalBroadcaster()
+    return EntityCache(backend, broadcaster, ttl=0 if spec == "none" else CACHE_TTL_SECONDS)
+
+entities = _from_env()
+
+# Invalidate on every committed ORM write, whichever code path made it
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session: Session, flush_context: Any) -> None:
+    pending: Set[str] = session.info.setdefault("cache_invalidate", set())
+    for obj in (*session.dirty, *session.deleted):
+        pending.update(entities.keys_for(obj))
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    pending: Optional[Set[str]] = session.info.pop("cache_invalidate", None)
+    if pending:
+        entities.invalidate(sorted(pending))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop("cache_invalidate", None)
+
+def start() -> None:
+    entities.broadcaster.start(entities.on_peer_invalidate)
+
+def stop() -> None:
+    entities.broadcaster.stop()
+
+def cached_lookup(db: Session, model: Any, field: str, value: Any) -> Any:
+    """db.query(model).filter(model.<field> == value).first(), read through the cache"""
+    column = getattr(model, field)
+    if isinstance(column.type, Uuid):
+        # One canonical key per row, and malformed ids simply find nothing
+        try:
+            value = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        except ValueError:
+            return None
+    return entities.get(db, model, field, value, lambda: db.query(model).filter(column == value).first())
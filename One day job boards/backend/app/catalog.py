@@ -0,0 +1,94 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Set
+import os
+import threading
+import time
+from . import models, schemas
+
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", 60))
+
+CASE_STUDY_SORTS = ("newest", "quickest", "title")
+
+class CaseStudyCatalog:
+    """
+    In-memory inverted index over the case-study catalog. The catalog is small
+    and mostly read, so list requests are answered without a database round
+    trip. Local writes are applied immediately; other workers pick them up
+    when their copy expires after CATALOG_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._items: Dict[str, schemas.CaseStudy] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_difficulty: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def refresh(self, db: Session) -> None:
+        rows = db.query(models.CaseStudy).all()
+        with self._lock:
+            self._items, self._by_category, self._by_difficulty, self._by_tag = {}, {}, {}, {}
+            for row in rows:
+                self._index(schemas.CaseStudy.model_validate(row))
+            self._loaded_at = time.monotonic()
+
+    def add(self, case_study: models.CaseStudy) -> None:
+        with self._lock:
+            if self._loaded_at is not None:
+                self._index(schemas.CaseStudy.model_validate(case_study))
+
+    def _index(self, item: schemas.CaseStudy) -> None:
+        key = str(item.id)
+        self._items[key] = item
+        self._by_category.setdefault(item.category.lower(), set()).add(key)
+        self._by_difficulty.setdefault(item.difficulty_level.lower(), set()).add(key)
+        for tag in item.tags or []:
+            self._by_tag.setdefault(tag.lower(), set()).add(key)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            self.refresh(db)
+
+    def search(
+        self,
+        db: Session,
+        category: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+        max_time_to_deliver: Optional[int] = None,
+        sort: str = "newest",
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[schemas.CaseStudy]:
+        self._ensure_loaded(db)
+        with self._lock:
+            postings: List[Set[str]] = []
+            if category:
+                postings.append(self._by_category.get(category.lower(), set()))
+            if difficulty_level:
+                postings.append(self._by_difficulty.get(difficulty_level.lower(), set()))
+            for tag in tags or []:
+                postings.append(self._by_tag.get(tag.lower(), set()))
+            if postings:
+                keys = set.intersection(*sorted(postings, key=len))
+                items = [self._items[key] for key in keys]
+            else:
+                items = list(self._items.values())
+        if max_time_to_deliver is not None:
+            items = [item for item in items if item.time_to_deliver <= max_time_to_deliver]
+        if sort == "quickest":
+            items.sort(key=lambda item: (item.time_to_deliver, str(item.id)))
+        elif sort == "title":
+            items.sort(key=lambda item: (item.title.lower(), str(item.id)))
+        else:
+            items.sort(key=lambda item: (item.created_at, str(item.id)), reverse=True)
+        return items[skip:skip + limit]
+
+case_studies = CaseStudyCatalog()
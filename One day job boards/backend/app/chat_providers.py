@@ -0,0 +1,215 @@
+"""
+Chat model providers behind one hedged call. Each provider has its own
+deadline and in-flight limit. The first is asked on its own; if it has not
+answered within its recent p95 latency the next one is asked too, whichever
+replies first wins and the other request is cancelled. A provider that fails
+hands over immediately, so the worst case is bounded by the deadlines rather
+than their sum.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Protocol, cast
+import anyio.from_thread
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+CHAT_OPENAI_TIMEOUT_SECONDS = float(os.getenv("CHAT_OPENAI_TIMEOUT_SECONDS", 20))
+CHAT_HF_TIMEOUT_SECONDS = float(os.getenv("CHAT_HF_TIMEOUT_SECONDS", 30))
+# Requests in flight per provider and worker; a saturated provider is skipped, not queued for
+CHAT_PROVIDER_CONCURRENCY = int(os.getenv("CHAT_PROVIDER_CONCURRENCY", 16))
+# Hedge delay until a provider has CHAT_HEDGE_MIN_SAMPLES latencies to take a p95 from
+CHAT_HEDGE_DELAY_SECONDS = float(os.getenv("CHAT_HEDGE_DELAY_SECONDS", 2))
+CHAT_HEDGE_MIN_SAMPLES = int(os.getenv("CHAT_HEDGE_MIN_SAMPLES", 20))
+LATENCY_WINDOW = 200
+
+Message = Dict[str, str]
+
+class ProviderError(Exception):
+    """The provider answered, but not with a usable reply"""
+
+class Provider(Protocol):
+    name: str
+
+    async def complete(self, prompt: List[Message], timeout: float) -> str: ...
+
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+        self.model = model
+        # Retries are the hedge's job; the deadline bounds each attempt
+        self._client = AsyncOpenAI(api_key=api_key, max_retries=0)
+
+    async def complete(self, prompt: List[Message], timeout: float) -> str:
+        completion = await self._client.chat.completions.create(
+            model=self.model,
+            messages=cast(Any, prompt),
+            temperature=0.6,
+            max_tokens=256,
+            timeout=timeout,
+        )
+        reply = completion.choices[0].message.content if completion.choices else None
+        if not reply:
+            raise ProviderError("empty completion")
+        return reply
+
+class HuggingFaceProvider:
+    name = "huggingface"
+
+    def __init__(self, api_key: str, model_id: str):
+        self.api_key = api_key
+        self.model_id = model_id
+
+    async def complete(self, prompt: List[Message], timeout: float) -> str:
+        # Text-generation models take one prompt string
+        parts = [
+            m["content"] if m["role"] == "system" else f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+            for m in prompt
+        ]
+        parts.append("Assistant:")
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        payload: Dict[str, Any] = {"inputs": "\n".join(parts), "parameters": {"max_new_tokens": 256, "temperature": 0.6}}
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            resp = await client.post(f"https://api-inference.huggingface.co/models/{self.model_id}", headers=headers, json=payload)
+        if resp.status_code != 200:
+            raise ProviderError(f"HTTP {resp.status_code}")
+        raw: Any = resp.json()
+        # Responses can be a list with generated_text or a dict
+        first = raw[0] if isinstance(raw, list) and raw else raw
+        text = None
+        if isinstance(first, dict):
+            text = first.get("generated_text") or first.get("summary_text")
+        if not isinstance(text, str) or not text.strip():
+            raise ProviderError("no generated text")
+        # Extract only the assistant portion if the model echoes the prompt
+        return text.split("Assistant:")[-1].strip()
+
+class Lane:
+    """One provider with its deadline, in-flight limit and recent latencies"""
+
+    def __init__(self, provider: Provider, deadline: float, max_concurrency: int = CHAT_PROVIDER_CONCURRENCY):
+        self.provider = provider
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.max_concurrency:
+                return False
+            self.in_flight += 1
+            return True
+
+    def hedge_delay(self) -> float:
+        """How long to wait for this provider before asking the next: its p95 latency"""
+        samples = sorted(self.latencies)
+        if len(samples) < CHAT_HEDGE_MIN_SAMPLES:
+            return min(CHAT_HEDGE_DELAY_SECONDS, self.deadline)
+        return min(samples[math.ceil(0.95 * len(samples)) - 1], self.deadline)
+
+    async def call(self, prompt: List[Message], budget: Optional[float] = None) -> str:
+        """Ask the provider within its deadline and the caller's budget; releases the slot the caller acquired"""
+        timeout = self.deadline if budget is None else min(self.deadline, budget)
+        started = time.perf_counter()
+        try:
+            # The HTTP client gets the timeout too; wait_for is the backstop that cancels the call
+            reply = await asyncio.wait_for(self.provider.complete(prompt, timeout), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Censored at the cancel: the call took at least this long, and leaving out
+            # the slow ones would pull p95, and with it the hedge delay, down over time
+            self.latencies.append(time.perf_counter() - started)
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        self.latencies.append(time.perf_counter() - started)
+        return reply
+
+class HedgedProviders:
+    """Ask lanes in order, hedging on the next one when the current is slower than usual"""
+
+    def __init__(self, lanes: List[Lane]):
+        self.lanes = lanes
+
+    async def complete(self, prompt: List[Message], timeout: Optional[float] = None) -> Optional[str]:
+        """The first reply within timeout from any provider, or None if every one failed, timed out or was saturated"""
+        loop = asyncio.get_running_loop()
+        ends_at = None if timeout is None else loop.time() + timeout
+        waiting = list(self.lanes)
+        running: Dict["asyncio.Task[str]", Lane] = {}
+        hedge_at: Optional[float] = None
+
+        def launch() -> Optional[float]:
+            budget = None if ends_at is None else ends_at - loop.time()
+            while waiting and (budget is None or budget > 0):
+                lane = waiting.pop(0)
+                if lane.try_acquire():
+                    running[asyncio.ensure_future(lane.call(prompt, budget))] = lane
+                    return loop.time() + lane.hedge_delay() if waiting else None
+                logger.warning("Chat provider %s is at its concurrency limit, skipping", lane.provider.name)
+            return None
+
+        hedge_at = launch()
+        try:
+            while running:
+                wait = None if hedge_at is None else max(hedge_at - loop.time(), 0)
+                done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_at = launch()
+                    continue
+                for task in done:
+                    lane = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    logger.warning("Chat provider %s failed: %r", lane.provider.name, error)
+                if not running:
+                    # Nothing left in flight: move on without waiting out the hedge delay
+                    hedge_at = launch()
+            return None
+        finally:
+            # The losers: their slots are released as the cancellation lands
+            for task in running:
+                task.cancel()
+
+_providers: Optional[HedgedProviders] = None
+
+def providers_from_env() -> HedgedProviders:
+    """OpenAI, then Hugging Face, each only if its API key is configured"""
+    lanes: List[Lane] = []
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if openai_key:
+        lanes.append(Lane(OpenAIProvider(openai_key), CHAT_OPENAI_TIMEOUT_SECONDS))
+    hf_key = os.getenv("HUGGINGFACE_API_KEY")
+    if hf_key:
+        model_id = os.getenv("HF_MODEL_ID", "meta-llama/Llama-3.1-8B-Instruct")
+        lanes.append(Lane(HuggingFaceProvider(hf_key, model_id), CHAT_HF_TIMEOUT_SECONDS))
+    return HedgedProviders(lanes)
+
+def get_providers() -> HedgedProviders:
+    global _providers
+    if _providers is None:
+        _providers = providers_from_env()
+    return _providers
+
+def set_providers(providers: Optional[HedgedProviders]) -> None:
+    """Replace the configured providers; None re-reads the environment on next use"""
+    global _providers
+    _providers = providers
+
+# HTTP connection pools must not be shared with a forked worker
+os.register_at_fork(after_in_child=lambda: set_providers(None))
+
+def complete(prompt: List[Message], timeout: Optional[float] = None) -> Optional[str]:
+    """Hedged completion from a sync route: runs on the server's event loop so losers can be cancelled"""
+    return anyio.from_thread.run(get_providers().complete, prompt, timeout)
@@ -0,0 +1,222 @@
+"""
+Server-side chat sessions: the client sends a session id and its new message,
+the history lives here with a sliding TTL. Stored history is kept under a
+token budget; turns that fall out of it are folded into a short summary, so
+both the request body and the prompt stay the same size however long the
+conversation runs. Each stored session carries a version, so two turns of one
+conversation served at once are both kept instead of the later write winning.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+import json
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from .processes import LocalSQLite
+
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", 1800))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", 10000))
+# Prompt budget for the stored turns, and for the summary of older ones
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", 1500))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", 200))
+# extractive (default), model (ask the chat model) or off (drop old turns)
+CHAT_SUMMARIZE = os.getenv("CHAT_SUMMARIZE", "extractive")
+# Tries to store a turn when other turns of the same conversation keep landing first
+CHAT_SAVE_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, str]
+Summarizer = Callable[[str, List[Message]], str]
+
+def count_tokens(text: str) -> int:
+    # ~4 characters per token for English text; close enough for budgeting
+    return math.ceil(len(text) / 4)
+
+def message_tokens(message: Message) -> int:
+    return count_tokens(message["content"]) + 4  # role and separators
+
+@dataclass
+class ChatSession:
+    messages: List[Message] = field(default_factory=list)
+    summary: str = ""
+    version: int = 0  # of the stored copy this was read from; 0 for a new session
+
+def truncate_tokens(text: str, tokens: int, keep_end: bool = False) -> str:
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    return "…" + text[-limit:] if keep_end else text[:limit] + "…"
+
+def extractive_summary(previous: str, dropped: List[Message]) -> str:
+    """Carry forward what the user asked and the gist of each answer, newest kept when over budget"""
+    lines = [previous] if previous else []
+    for message in dropped:
+        speaker = "User asked" if message["role"] == "user" else "Assistant said"
+        lines.append(f"{speaker}: {truncate_tokens(' '.join(message['content'].split()), 30)}")
+    return truncate_tokens("\n".join(lines), CHAT_SUMMARY_TOKENS, keep_end=True)
+
+def compact(session: ChatSession, summarize: Optional[Summarizer] = None) -> None:
+    """Drop the oldest turns until the rest fit CHAT_HISTORY_TOKENS, folding them into the summary"""
+    dropped: List[Message] = []
+    total = sum(message_tokens(message) for message in session.messages)
+    while total > CHAT_HISTORY_TOKENS and len(session.messages) > 1:
+        message = session.messages.pop(0)
+        total -= message_tokens(message)
+        dropped.append(message)
+    if dropped and CHAT_SUMMARIZE != "off":
+        summary = (summarize or extractive_summary)(session.summary, dropped)
+        session.summary = truncate_tokens(summary, CHAT_SUMMARY_TOKENS, keep_end=True)
+
+def build_prompt(session: ChatSession, system_prompt: str) -> List[Message]:
+    """System prompt, summary of earlier turns, then the newest turns that fit the history budget"""
+    prompt: List[Message] = [{"role": "system", "content": system_prompt}]
+    if session.summary:
+        prompt.append({"role": "system", "content": "Earlier in this conversation:\n" + session.summary})
+    recent: List[Message] = []
+    budget = CHAT_HISTORY_TOKENS
+    for message in reversed(session.messages):
+        cost = message_tokens(message)
+        if recent and cost > budget:
+            break
+        if not recent and cost > budget:
+            # A single oversized message still goes, cut to the budget
+            message = {"role": message["role"], "content": truncate_tokens(message["content"], budget, keep_end=True)}
+            cost = budget
+        recent.append(message)
+        budget -= cost
+    return prompt + recent[::-1]
+
+class Store(Protocol):
+    def get(self, session_id: str) -> Optional[ChatSession]: ...
+    def put(self, session_id: str, session: ChatSession) -> bool: ...
+
+class MemoryStore:
+    """Per-process LRU with a sliding TTL; a session only lives on the worker that served it"""
+
+    def __init__(self, ttl: float = CHAT_SESSION_TTL_SECONDS, max_sessions: int = CHAT_MAX_SESSIONS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self._sessions: "OrderedDict[str, Tuple[float, ChatSession]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._sessions[session_id]
+                return None
+            session = entry[1]
+            return ChatSession(list(session.messages), session.summary, session.version)
+
+    def put(self, session_id: str, session: ChatSession) -> bool:
+        """Store session if it is still the version it was read from; False if another write came first"""
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            current = entry[1].version if entry is not None and entry[0] > now else 0
+            if current != session.version:
+                return False
+            session.version = current + 1
+            self._sessions[session_id] = (now + self.ttl, ChatSession(list(session.messages), session.summary, session.version))
+            self._sessions.move_to_end(session_id)
+            # Same TTL for everyone, so the least recently used entries expire first
+            while self._sessions and (
+                len(self._sessions) > self.max_sessions or next(iter(self._sessions.values()))[0] <= now
+            ):
+                self._sessions.popitem(last=False)
+        return True
+
+class SQLiteStore:
+    """Sessions in a SQLite file shared by every worker process on the host"""
+
+    def __init__(self, path: str, ttl: float = CHAT_SESSION_TTL_SECONDS, max_sessions: int = CHAT_MAX_SESSIONS, clock=time.time):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.db = LocalSQLite(path, [
+            "CREATE TABLE IF NOT EXISTS chat_sessions "
+            "(id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL, version INTEGER NOT NULL DEFAULT 0)",
+            "CREATE INDEX IF NOT EXISTS chat_sessions_expires_at ON chat_sessions (expires_at)",
+        ])
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        row = self.db.connection().execute(
+            "SELECT data, version FROM chat_sessions WHERE id = ? AND expires_at > ?", (session_id, self.clock())
+        ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        return ChatSession(data["messages"], data["summary"], row[1])
+
+    def put(self, session_id: str, session: ChatSession) -> bool:
+        """Store session if it is still the version it was read from; False if another write came first"""
+        conn = self.db.connection()
+        now = self.clock()
+        data = json.dumps({"messages": session.messages, "summary": session.summary})
+        # IMMEDIATE takes the write lock up front, so the version check and the write are atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version FROM chat_sessions WHERE id = ? AND expires_at > ?", (session_id, now)).fetchone()
+            current = row[0] if row is not None else 0
+            if current != session.version:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (id, data, expires_at, version) VALUES (?, ?, ?, ?)",
+                (session_id, data, now + self.ttl, current + 1),
+            )
+            conn.execute("DELETE FROM chat_sessions WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM chat_sessions WHERE id IN (SELECT id FROM chat_sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        session.version = current + 1
+        return True
+
+def store_from_env(spec: str) -> Store:
+    """
+    CHAT_SESSION_BACKEND: "memory" or "sqlite:///path/to/file" shared by local
+    workers. app.serve sets a SQLite file when it runs more than one worker.
+    """
+    if spec.startswith("sqlite:///"):
+        return SQLiteStore(spec[len("sqlite:///"):])
+    return MemoryStore()
+
+store: Store = store_from_env(os.getenv("CHAT_SESSION_BACKEND", "memory"))
+
+def load(session_id: Optional[str]) -> Tuple[str, ChatSession]:
+    """The session for session_id, or a fresh one under a new id if it is unknown or expired"""
+    session = store.get(session_id) if session_id else None
+    if session is None:
+        return secrets.token_urlsafe(16), ChatSession()
+    return str(session_id), session
+
+def save_turn(session_id: str, session: ChatSession, reply: str, summarize: Optional[Summarizer] = None) -> bool:
+    """
+    Store session, whose last message is the user's, with the reply added. If
+    another turn of the conversation was stored meanwhile, this turn is added
+    after it rather than replacing it.
+    """
+    turn = [session.messages[-1], {"role": "assistant", "content": reply}]
+    session.messages.append(turn[1])
+    for _ in range(CHAT_SAVE_ATTEMPTS):
+        compact(session, summarize)
+        if store.put(session_id, session):
+            return True
+        latest = store.get(session_id) or ChatSession()
+        session = ChatSession(latest.messages + turn, latest.summary, latest.version)
+    logger.warning("Dropped a turn of chat session %s after %d conflicting writes", session_id, CHAT_SAVE_ATTEMPTS)
+    return False
@@ -1,15 +1,63 @@
+from sqlalchemy import String, and_, cast, func, or_, select, text
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
-from . import models, schemas, auth
-from uuid import uuid4
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from . import models, schemas, auth, catalog, cache
+from uuid import UUID, uuid4
+import json
+
+# Hot single-row lookups are read through the entity cache
+cache.entities.register(models.User, "username", "id")
+cache.entities.register(models.Job, "id", "slug")
+cache.entities.register(models.CaseStudy, "id")
 
 # User CRUD
 def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+    return cache.cached_lookup(db, models.User, "username", username)
+
+def get_user_by_id(db: Session, user_id: str):
+    return cache.cached_lookup(db, models.User, "id", user_id)
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
+_trigram_enabled: Dict[str, bool] = {}
+
+def trigram_enabled(db: Session) -> bool:
+    """Whether pg_trgm is installed, so % similarity matches can use the GIN indexes"""
+    bind = db.get_bind()
+    key = str(getattr(bind, "engine", bind).url)
+    if key not in _trigram_enabled:
+        _trigram_enabled[key] = bind.dialect.name == "postgresql" and db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trigram_enabled[key]
+
+def search_users(db: Session, q: Optional[str] = None, role: Optional[str] = None, department: Optional[str] = None, columns: Optional[List[Any]] = None):
+    """Users matching q as a substring (or, with pg_trgm, fuzzily) on username or email, ordered by username"""
+    query = db.query(*columns) if columns else db.query(models.User)
+    if role:
+        query = query.filter(models.User.role == role)
+    if department:
+        query = query.filter(models.User.department == department)
+    if q:
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        conditions = [models.User.username.ilike(pattern, escape="\\"), models.User.email.ilike(pattern, escape="\\")]
+        if trigram_enabled(db):
+            conditions += [models.User.username.bool_op("%")(q), models.User.email.bool_op("%")(q)]
+        query = query.filter(or_(*conditions))
+    return query.order_by(models.User.username)
+
+def estimate_count(db: Session, statement: Any) -> int:
+    """Row count from the planner's estimate on Postgres; exact COUNT(*) elsewhere"""
+    statement = statement.order_by(None)
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return db.scalar(select(func.count()).select_from(statement.subquery())) or 0
+    compiled = statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = auth.get_password_hash(str(user.password))
     db_user = models.User(
@@ -19,25 +67,58 @@ def create_user(db: Session, user: schemas.UserCreate):
         role=user.role,
         department=user.department
     )
-    db.add(db_user)
+    # The unique constraints decide; an IntegrityError only rolls back this savepoint
+    with db.begin_nested():
+        db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 # Job CRUD
-def get_jobs(db: Session, skip: int = 0, limit: int = 100, department: Optional[str] = None, status: Optional[str] = None):
-    query = db.query(models.Job)
+# Each order ends in id so pages are stable; every one has a (status, ...) index behind it
+JOB_SORTS = {
+    "newest": (models.Job.created_at.desc(), models.Job.id.desc()),
+    "reward": (models.Job.reward.desc(), models.Job.id.desc()),
+    "featured": (models.Job.is_featured.desc(), models.Job.created_at.desc(), models.Job.id.desc()),
+}
+
+def get_jobs(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    reward_type: Optional[str] = None,
+    min_reward: Optional[float] = None,
+    max_reward: Optional[float] = None,
+    max_estimated_minutes: Optional[int] = None,
+    sort: str = "newest",
+    columns: Optional[List[Any]] = None
+):
+    query = db.query(*columns) if columns else db.query(models.Job)
     if department:
         query = query.filter(models.Job.department == department)
     if status:
         query = query.filter(models.Job.status == status)
-    return query.offset(skip).limit(limit).all()
+    if reward_type:
+        query = query.filter(models.Job.reward_type == reward_type)
+    if min_reward is not None:
+        query = query.filter(models.Job.reward >= min_reward)
+    if max_reward is not None:
+        query = query.filter(models.Job.reward <= max_reward)
+    if max_estimated_minutes is not None:
+        # Jobs without a readable estimate can't be shown to fit a time budget
+        query = query.filter(models.Job.estimated_minutes <= max_estimated_minutes)
+    return query.order_by(*JOB_SORTS[sort]).offset(skip).limit(limit).all()
 
 def get_job_by_id(db: Session, job_id: str):
-    return db.query(models.Job).filter(models.Job.id == job_id).first()
+    return cache.cached_lookup(db, models.Job, "id", job_id)
 
 def get_job_by_slug(db: Session, slug: str):
-    return db.query(models.Job).filter(models.Job.slug == slug).first()
+    return cache.cached_lookup(db, models.Job, "slug", slug)
+
+def get_archived_job(db: Session, job_id: str):
+    return db.query(models.ArchivedJob).filter(models.ArchivedJob.id == job_id).first()
 
 def create_job(db: Session, job: schemas.JobCreate, user_id: str):
     slug = job.title.lower().replace(" ", "-") + "-" + str(uuid4())[:8]
@@ -68,22 +149,57 @@ def delete_job(db: Session, job_id: str):
     return db_job
 
 # Case Study CRUD
-def get_case_studies(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.CaseStudy).offset(skip).limit(limit).all()
+def get_case_studies(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    difficulty_level: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    max_time_to_deliver: Optional[int] = None,
+    sort: str = "newest",
+    columns: Optional[List[Any]] = None
+):
+    # Same matching and ordering as catalog.case_studies.search: case-insensitive filters,
+    # titles compared lowercased and by code point
+    postgres = db.get_bind().dialect.name == "postgresql"
+    query = db.query(*columns) if columns else db.query(models.CaseStudy)
+    if category:
+        query = query.filter(func.lower(models.CaseStudy.category) == category.lower())
+    if difficulty_level:
+        query = query.filter(func.lower(models.CaseStudy.difficulty_level) == difficulty_level.lower())
+    if max_time_to_deliver is not None:
+        query = query.filter(models.CaseStudy.time_to_deliver <= max_time_to_deliver)
+    for tag in tags or []:
+        if postgres:
+            query = query.filter(models.lower_tags().contains([tag.lower()]))
+        else:
+            # The tag as it appears in the stored JSON text, with LIKE wildcards escaped
+            encoded = json.dumps(tag.lower()).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(func.lower(cast(models.CaseStudy.tags, String)).like(f"%{encoded}%", escape="\\"))
+    if sort == "quickest":
+        query = query.order_by(models.CaseStudy.time_to_deliver, models.CaseStudy.id)
+    elif sort == "title":
+        title = func.lower(models.CaseStudy.title)
+        query = query.order_by(title.collate("C") if postgres else title, models.CaseStudy.id)
+    else:
+        query = query.order_by(models.CaseStudy.created_at.desc(), models.CaseStudy.id.desc())
+    return query.offset(skip).limit(limit).all()
 
 def get_case_study_by_id(db: Session, case_study_id: str):
-    return db.query(models.CaseStudy).filter(models.CaseStudy.id == case_study_id).first()
+    return cache.cached_lookup(db, models.CaseStudy, "id", case_study_id)
 
 def create_case_study(db: Session, case_study: schemas.CaseStudyCreate):
     db_case_study = models.CaseStudy(**case_study.model_dump())
     db.add(db_case_study)
     db.commit()
     db.refresh(db_case_study)
+    catalog.case_studies.add(db_case_study)
     return db_case_study
 
 # Review CRUD
-def get_reviews(db: Session, skip: int = 0, limit: int = 100, job_id: Optional[str] = None):
-    query = db.query(models.Review)
+def get_reviews(db: Session, skip: int = 0, limit: int = 100, job_id: Optional[str] = None, columns: Optional[List[Any]] = None):
+    query = db.query(*columns) if columns else db.query(models.Review)
     if job_id:
         query = query.filter(models.Review.job_id == job_id)
     return query.offset(skip).limit(limit).all()
@@ -96,8 +212,9 @@ def create_review(db: Session, review: schemas.ReviewCreate, user_id: str):
     return db_review
 
 # Application CRUD
-def get_applications_for_job(db: Session, job_id: str):
-    return db.query(models.Application).filter(models.Application.job_id == job_id).all()
+def get_applications_for_job(db: Session, job_id: str, archived: bool = False):
+    model = models.ArchivedApplication if archived else models.Application
+    return db.query(model).filter(model.job_id == job_id).all()
 
 def get_applications_for_user(db: Session, user_id: str):
     return db.query(models.Application).filter(models.Application.applicant_id == user_id).all()
@@ -109,6 +226,19 @@ def create_application(db: Session, application: schemas.ApplicationCreate, user
     db.refresh(db_application)
     return db_application
 
+def get_application_by_id(db: Session, application_id: str, archived: bool = False):
+    model = models.ArchivedApplication if archived else models.Application
+    return db.query(model).filter(model.id == application_id).first()
+
+def set_application_submission(db: Session, application: models.Application, ref: str, size: int, content_type: str):
+    setattr(application, 'submission_ref', ref)
+    setattr(application, 'submission_size', size)
+    setattr(application, 'submission_content_type', content_type)
+    setattr(application, 'submitted_work', None)
+    db.commit()
+    db.refresh(application)
+    return application
+
 def update_application_status(db: Session, application_id: str, status: str):
     db_application = db.query(models.Application).filter(models.Application.id == application_id).first()
     if db_application:
@@ -119,16 +249,22 @@ def update_application_status(db: Session, application_id: str, status: str):
 
 def get_doer_earnings(db: Session, doer_id: str) -> Dict[str, Any]:
     """Get total credits and cash earned by a doer from completed applications"""
-    completed_applications = db.query(
-        models.Application,
-        models.Job
-    ).join(
-        models.Job,
-        models.Application.job_id == models.Job.id
-    ).filter(
-        models.Application.applicant_id == doer_id,
-        models.Application.status == "completed"
-    ).all()
+    completed_applications: List[Any] = []
+    # Completed work moves to the archive tables over time; earnings include both
+    for application_model, job_model in (
+        (models.Application, models.Job),
+        (models.ArchivedApplication, models.ArchivedJob),
+    ):
+        completed_applications += db.query(
+            application_model,
+            job_model
+        ).join(
+            job_model,
+            application_model.job_id == job_model.id
+        ).filter(
+            application_model.applicant_id == doer_id,
+            application_model.status == "completed"
+        ).all()
     
     total_credits = 0.0
     total_cash = 0.0
@@ -143,4 +279,91 @@ def get_doer_earnings(db: Session, doer_id: str) -> Dict[str, Any]:
         "total_credits": total_credits,
         "total_cash": total_cash,
         "total_completed_jobs": len(completed_applications)
-    }
\ No newline at end of file
+    }
+
+APPLICATION_STATUSES = ("pending", "accepted", "rejected", "completed")
+
+def get_poster_dashboard(db: Session, poster_id: Any, limit: int = 20, after: Optional[Tuple[datetime, Any]] = None):
+    """
+    One page of a poster's jobs, newest first, each with application counts by
+    status, the newest applicant and review stats, in a single statement.
+    Returns limit + 1 rows so the caller can tell whether another page exists.
+    """
+    job = models.Job
+    page_query = select(*job.__table__.columns).where(job.posted_by == poster_id)
+    if after is not None:
+        created_at, job_id = after
+        page_query = page_query.where(or_(job.created_at < created_at, and_(job.created_at == created_at, job.id < job_id)))
+    page = page_query.order_by(job.created_at.desc(), job.id.desc()).limit(limit + 1).cte("page")
+
+    # Window functions count per job on every application row; rn = 1 marks the newest one
+    application = models.Application
+    per_job = {"partition_by": application.job_id}
+    ranked = (
+        select(
+            application.job_id,
+            application.applicant_id,
+            application.created_at.label("applied_at"),
+            func.row_number().over(order_by=(application.created_at.desc(), application.id.desc()), **per_job).label("rn"),
+            func.count().over(**per_job).label("applications_total"),
+            *[
+                func.count().filter(application.status == status).over(**per_job).label(f"applications_{status}")
+                for status in APPLICATION_STATUSES
+            ],
+        )
+        .join(page, page.c.id == application.job_id)
+        .cte("ranked")
+    )
+    review_stats = (
+        select(
+            models.Review.job_id,
+            func.count().label("review_count"),
+            func.avg(models.Review.rating).label("average_rating"),
+        )
+        .join(page, page.c.id == models.Review.job_id)
+        .group_by(models.Review.job_id)
+        .cte("review_stats")
+    )
+    statement = (
+        select(
+            page,
+            *[column for column in ranked.c if column.name.startswith("applications_")],
+            ranked.c.applicant_id.label("newest_applicant_id"),
+            models.User.username.label("newest_applicant_username"),
+            ranked.c.applied_at.label("newest_applied_at"),
+            review_stats.c.review_count,
+            review_stats.c.average_rating,
+        )
+        .select_from(page)
+        .outerjoin(ranked, and_(ranked.c.job_id == page.c.id, ranked.c.rn == 1))
+        .outerjoin(models.User, models.User.id == ranked.c.applicant_id)
+        .outerjoin(review_stats, review_stats.c.job_id == page.c.id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    )
+    return db.execute(statement).all()
+
+def get_purge_job(db: Session, purge_id: str):
+    try:
+        purge_id = UUID(purge_id)
+    except ValueError:
+        return None
+    return db.query(models.PurgeJob).filter(models.PurgeJob.id == purge_id).first()
+
+def get_audit_events(db: Session, entity_type: Optional[str] = None, entity_id: Optional[UUID] = None,
+                     actor_id: Optional[UUID] = None, action: Optional[str] = None,
+                     limit: int = 50, before: Optional[Tuple[datetime, Any]] = None):
+    """Audit events, newest first; returns limit + 1 rows so the caller can tell whether another page exists"""
+    event = models.AuditEvent
+    query = db.query(event)
+    if entity_type:
+        query = query.filter(event.entity_type == entity_type)
+    if entity_id:
+        query = query.filter(event.entity_id == entity_id)
+    if actor_id:
+        query = query.filter(event.actor_id == actor_id)
+    if action:
+        query = query.filter(event.action == action)
+    if before is not None:
+        occurred_at, event_id = before
+        query = query.filter(or_(event.occurred_at < occurred_at, and_(event.occurred_at == occurred_at, event.id < event_id)))
+    return query.order_by(event.occurred_at.desc(), event.id.desc()).limit(limit + 1).all()
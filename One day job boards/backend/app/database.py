@@ -1,22 +1,192 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql.dml import UpdateBase
+from fastapi import Depends, Request, Response
+from jose import JWTError, jwt
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Comma-separated list of read replicas; reads stay on the primary when empty
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", 10))
+# A replica that stops answering fails its health check after this long instead of hanging it
+REPLICA_CONNECT_TIMEOUT_SECONDS = int(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", 2))
+# How long a caller's reads are pinned to the primary after they write
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+# Per-process pool limits; app.serve sizes the worker count so the sum stays under max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def create_pooled_engine(url: str, **kwargs) -> Engine:
+    if url.startswith("sqlite") and ":memory:" in url:
+        return create_engine(url, **kwargs)
+    return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, **kwargs)
+
+def replica_connect_args(url: str) -> Dict[str, Any]:
+    return {"connect_timeout": REPLICA_CONNECT_TIMEOUT_SECONDS} if url.startswith("postgresql") else {}
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping ones a background health check found down"""
+
+    def __init__(self, urls: List[str], check_interval: float = REPLICA_HEALTH_CHECK_SECONDS):
+        self.engines: List[Engine] = [
+            create_pooled_engine(url, pool_pre_ping=True, connect_args=replica_connect_args(url)) for url in urls
+        ]
+        self.check_interval = check_interval
+        # Unchecked replicas count as down, so reads stay on the primary until the first check
+        self._healthy: Dict[int, bool] = {}
+        self._cycle = itertools.count()
+        self._lock = threading.Lock()
+        self._checker: Optional[threading.Thread] = None
+
+    def check(self) -> None:
+        """Probe every replica once and record which ones answered"""
+        for index, replica in enumerate(self.engines):
+            try:
+                with replica.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                healthy = True
+            except Exception:
+                healthy = False
+            self._healthy[index] = healthy
+
+    def _run_checks(self) -> None:
+        while True:
+            self.check()
+            time.sleep(self.check_interval)
+
+    def start(self) -> None:
+        """Start the health-check thread unless it is running; a forked worker starts its own"""
+        with self._lock:
+            if self._checker is None or not self._checker.is_alive():
+                self._checker = threading.Thread(target=self._run_checks, name="replica-health-check", daemon=True)
+                self._checker.start()
+
+    def is_healthy(self, index: int) -> bool:
+        return self._healthy.get(index, False)
+
+    def pick(self) -> Optional[Engine]:
+        """Return the next healthy replica, or None if all are down; never blocks on a check"""
+        self.start()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                index = next(self._cycle) % len(self.engines)
+            if self.is_healthy(index):
+                return self.engines[index]
+        return None
+
+class RoutingSession(Session):
+    """Session that sends reads to info["replica"] when set and everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or isinstance(clause, UpdateBase):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return replica
+
+# Pins for this worker, keyed on request_principal; the read_after cookie carries them to the others
+_recent_writes: Dict[str, float] = {}
+READ_AFTER_COOKIE = "read_after"
+
+def mark_write(principal: str) -> None:
+    now = time.monotonic()
+    if len(_recent_writes) > 10000:
+        for key, expires in list(_recent_writes.items()):
+            if expires < now:
+                _recent_writes.pop(key, None)
+    _recent_writes[principal] = now + READ_YOUR_WRITES_SECONDS
+
+def wrote_recently(principal: str) -> bool:
+    return _recent_writes.get(principal, 0.0) > time.monotonic()
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flag_write(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer_to_primary(session: Session) -> None:
+    if not session.info.pop("wrote", False):
+        return
+    principal = session.info.get("principal")
+    if principal:
+        mark_write(principal)
+    response: Optional[Response] = session.info.get("response")
+    if response is not None:
+        # Wall-clock time, so any worker (or host) can honour it
+        response.set_cookie(
+            READ_AFTER_COOKIE,
+            f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}",
+            max_age=max(int(READ_YOUR_WRITES_SECONDS), 1),
+            httponly=True,
+            samesite="lax",
+        )
+
+def request_principal(request: Request) -> str:
+    """Key used to pin a caller's reads to the primary after they write: the token's subject, else the client address"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            # Unverified is enough here: a forged subject can only send its own reads to the primary
+            subject = jwt.get_unverified_claims(token).get("sub")
+        except JWTError:
+            subject = None
+        if isinstance(subject, str):
+            return f"user:{subject}"
+    return request.client.host if request.client else ""
+
+def read_after_cookie(request: Request) -> bool:
+    """Whether the caller wrote recently through any worker, per the cookie set on that write"""
+    try:
+        return float(request.cookies.get(READ_AFTER_COOKIE, "")) > time.time()
+    except ValueError:
+        return False
+
+engine = create_pooled_engine(DATABASE_URL)
+replicas: Optional[ReplicaSet] = ReplicaSet(DATABASE_REPLICA_URLS) if DATABASE_REPLICA_URLS else None
+
+def reset_after_fork() -> None:
+    """Forget pooled connections inherited from the parent; the child opens its own"""
+    engine.dispose(close=False)
+    if replicas is not None:
+        for replica in replicas.engines:
+            replica.dispose(close=False)
+
+os.register_at_fork(after_in_child=reset_after_fork)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
 
 Base = declarative_base()
 
+@dataclass
+class BatchScope:
+    """State shared by the sub-requests of one POST /batch call; each still gets its own session"""
+    user: Any = None  # authenticated once for the whole batch
+
 # Dependency to get DB session
-def get_db():
+def get_db(request: Request, response: Response):
     db = SessionLocal()
+    db.info["principal"] = request_principal(request)
+    db.info["response"] = response
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for read-only routes: same session, but reads go to a replica when one is healthy.
+# Batch sub-requests stay on the primary: a mutation earlier in the batch must be visible to them.
+def get_read_db(request: Request, db: Session = Depends(get_db)) -> Session:
+    pinned = wrote_recently(request_principal(request)) or read_after_cookie(request)
+    if replicas is not None and "batch" not in request.scope and not pinned:
+        replica = replicas.pick()
+        if replica is not None:
+            db.info["replica"] = replica
+    return db
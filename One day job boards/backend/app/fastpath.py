@@ -0,0 +1,71 @@
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter, computed_field, create_model
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+import copy
+import os
+
+# Opt-in: list routes select plain rows and encode them with orjson instead of
+# loading ORM entities and running them through response_model validation
+FAST_LIST_SERIALIZATION = os.getenv("FAST_LIST_SERIALIZATION", "false").lower() in ("1", "true", "yes")
+
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """Precompiled validator for List[schema], built once per schema"""
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(List[schema])  # type: ignore[valid-type]
+    return adapter
+
+_fieldsets: Dict[Tuple[Type[BaseModel], Tuple[str, ...]], Type[BaseModel]] = {}
+
+def fieldset(schema: Type[BaseModel], fields: str) -> Type[BaseModel]:
+    """
+    Trimmed copy of schema holding only the comma-separated ?fields= names.
+    Computed fields may be requested too; the stored fields they are computed
+    from (schema.computed_sources) are loaded but left out of the output.
+    """
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        raise HTTPException(status_code=400, detail="No fields requested")
+    # name -> ComputedFieldInfo; model_computed_fields is only readable on instances in this pydantic
+    computed = {name: decorator.info for name, decorator in schema.__pydantic_decorators__.computed_fields.items()}
+    unknown = sorted(requested - set(schema.model_fields) - set(computed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    names = tuple(name for name in [*schema.model_fields, *computed] if name in requested)
+    trimmed = _fieldsets.get((schema, names))
+    if trimmed is None:
+        sources: Dict[str, Tuple[str, ...]] = getattr(schema, "computed_sources", {})
+        hidden = {source for name in names if name in computed for source in sources[name]} - requested
+        definitions: Dict[str, Any] = {}
+        for name in schema.model_fields:
+            if name in requested or name in hidden:
+                info = copy.copy(schema.model_fields[name])
+                info.exclude = name in hidden
+                definitions[name] = (info.annotation, info)
+        namespace: Dict[str, Any] = {"model_config": ConfigDict(from_attributes=True)}
+        for name in names:
+            if name in computed:
+                namespace[name] = computed_field(computed[name].wrapped_property)  # type: ignore[call-overload]
+        base = type(f"{schema.__name__}Computed", (BaseModel,), namespace)
+        trimmed = _fieldsets[(schema, names)] = create_model(  # type: ignore[call-overload]
+            f"{schema.__name__}Fields", __base__=base, **definitions
+        )
+    return trimmed
+
+def list_view(schema: Type[BaseModel], fields: Optional[str] = None) -> Optional[Type[BaseModel]]:
+    """Schema to render a list route from rows, or None to keep the ORM + response_model path"""
+    if fields:
+        return fieldset(schema, fields)
+    return schema if FAST_LIST_SERIALIZATION else None
+
+def columns_for(model: Any, schema: Type[BaseModel]) -> List[Any]:
+    """Model columns backing each field of the response schema"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+def render_rows(schema: Type[BaseModel], rows: Sequence[Any]) -> ORJSONResponse:
+    adapter = list_adapter(schema)
+    items = adapter.validate_python([row._asdict() for row in rows])
+    return ORJSONResponse(adapter.dump_python(items))
@@ -0,0 +1,332 @@
+"""
+Hot/cold lifecycle: expire open jobs nobody took within their day, and move
+completed jobs, with their applications and reviews, into the *_archive
+tables so the live tables only hold active work.
+Run once: python -m app.lifecycle
+On a database created from an earlier schema.sql, apply upgrade.sql first:
+the backfills below fill columns it adds.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+import logging
+import os
+import socket
+import threading
+from . import models, cache, audit, search, blobstore
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+# 0 disables the in-process background archiver
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", 0))
+# Open jobs older than this are expired, unless their estimate says they need longer
+JOB_EXPIRY_HOURS = float(os.getenv("JOB_EXPIRY_HOURS", 24))
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", 500))
+# 0 disables the expiry scheduler; one worker at a time holds its lease
+EXPIRY_INTERVAL_SECONDS = float(os.getenv("EXPIRY_INTERVAL_SECONDS", 300))
+
+# Children first, so foreign keys to jobs.id hold at every step
+_MOVES = (
+    (models.Application, models.ArchivedApplication, models.Application.job_id),
+    (models.Review, models.ArchivedReview, models.Review.job_id),
+    (models.Job, models.ArchivedJob, models.Job.id),
+)
+
+def _move(db: Session, source: Any, target: Any, key: Any, job_ids: List[Any]) -> None:
+    names = [c.name for c in source.__table__.columns]
+    db.execute(
+        insert(target.__table__).from_select(names, select(*source.__table__.columns).where(key.in_(job_ids)))
+    )
+    db.execute(delete(source).where(key.in_(job_ids)))
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archive one batch of completed jobs created before cutoff in a single transaction"""
+    query = (
+        select(models.Job.id, models.Job.slug)
+        .where(models.Job.status == "completed", models.Job.created_at < cutoff)
+        .order_by(models.Job.created_at)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Concurrent archivers (one per worker) take disjoint batches
+        query = query.with_for_update(skip_locked=True)
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+    job_ids = [row.id for row in rows]
+    for source, target, key in _MOVES:
+        _move(db, source, target, key, job_ids)
+    db.commit()
+    # Bulk DML skips the ORM flush events, so evict the moved jobs by hand
+    cache.entities.invalidate(
+        [cache.entities.key("jobs", "id", row.id) for row in rows]
+        + [cache.entities.key("jobs", "slug", row.slug) for row in rows]
+    )
+    return len(job_ids)
+
+def archive_completed_jobs(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Archive completed jobs in batches until none are left. Every batch commits
+    on its own, so an interrupted run simply resumes where it stopped.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(db, cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
+
+def prune_refresh_tokens(db: Session) -> int:
+    """Delete refresh tokens past their expiry; revoked ones are kept until then for reuse detection"""
+    deleted = db.execute(delete(models.RefreshToken).where(models.RefreshToken.expires_at < datetime.utcnow())).rowcount
+    db.commit()
+    return deleted
+
+def acquire_lease(db: Session, name: str, holder: str, ttl_seconds: float) -> bool:
+    """Take or renew the named lease; False while another holder's lease is still live"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    table = models.SchedulerLease.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = (
+        dialect.insert(table)
+        .values(name=name, holder=holder, expires_at=expires_at)
+        .on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"holder": holder, "expires_at": expires_at},
+            where=(table.c.holder == holder) | (table.c.expires_at < now),
+        )
+        .returning(table.c.holder)
+    )
+    held = db.execute(statement).first() is not None
+    db.commit()
+    return held
+
+def release_lease(db: Session, name: str, holder: str) -> None:
+    db.execute(delete(models.SchedulerLease).where(
+        models.SchedulerLease.name == name, models.SchedulerLease.holder == holder))
+    db.commit()
+
+def expire_batch(db: Session, now: datetime, max_age_hours: float = JOB_EXPIRY_HOURS,
+                 batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """Expire one batch of open jobs past their window with a single UPDATE"""
+    job = models.Job
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        past_estimate = job.created_at + func.make_interval(0, 0, 0, 0, 0, job.estimated_minutes) < now
+    else:
+        # SQLite keeps timestamps as text; julianday turns them into fractional days
+        past_estimate = func.julianday(job.created_at) + job.estimated_minutes / 1440.0 < func.julianday(now)
+    stale = (
+        select(job.id)
+        .where(job.status == "open", job.created_at < now - timedelta(hours=max_age_hours))
+        .where(or_(
+            job.estimated_minutes.is_(None),
+            job.estimated_minutes <= max_age_hours * 60,
+            past_estimate,
+        ))
+        .order_by(job.created_at)
+        .limit(batch_size)
+    )
+    if postgres:
+        # Concurrent expirers (one per worker) take disjoint batches
+        stale = stale.with_for_update(skip_locked=True)
+    rows = db.execute(
+        update(job)
+        .where(job.id.in_(stale), job.status == "open")
+        .values(status="expired")
+        .returning(job.id, job.slug)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    cache.entities.invalidate(
+        [cache.entities.key("jobs", "id", row.id) for row in rows]
+        + [cache.entities.key("jobs", "slug", row.slug) for row in rows]
+    )
+    search.index.remove("job", [row.id for row in rows])
+    for row in rows:
+        audit.record(None, "job.status", "job", row.id, "open", "expired")
+    return len(rows)
+
+def expire_stale_jobs(
+    db: Session,
+    max_age_hours: float = JOB_EXPIRY_HOURS,
+    batch_size: int = EXPIRY_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> int:
+    """Expire stale open jobs in batches until none are left; each batch commits on its own"""
+    now = datetime.utcnow()
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        expired = expire_batch(db, now, max_age_hours, batch_size)
+        total += expired
+        batches += 1
+        if expired < batch_size:
+            break
+    return total
+
+def backfill_estimated_minutes(db: Session, batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """
+    Parse estimated_time into estimated_minutes for rows written before the
+    column existed. The bulk UPDATE skips the ORM events, so cached rows are
+    evicted here and the search index is rebuilt on its next use.
+    """
+    job = models.Job
+    last_id, updated = None, 0
+    while True:
+        query = select(job.id, job.slug, job.estimated_time).where(job.estimated_time.isnot(None), job.estimated_minutes.is_(None))
+        if last_id is not None:
+            query = query.where(job.id > last_id)
+        rows = db.execute(query.order_by(job.id).limit(batch_size)).all()
+        if not rows:
+            if updated:
+                search.index.invalidate()
+            return updated
+        last_id = rows[-1].id
+        parsed = [
+            (row, minutes)
+            for row in rows
+            if (minutes := models.parse_duration_minutes(row.estimated_time)) is not None
+        ]
+        if parsed:
+            db.execute(update(job), [{"id": row.id, "estimated_minutes": minutes} for row, minutes in parsed])
+            db.commit()
+            cache.entities.invalidate(
+                [cache.entities.key("jobs", "id", row.id) for row, _ in parsed]
+                + [cache.entities.key("jobs", "slug", row.slug) for row, _ in parsed]
+            )
+            updated += len(parsed)
+
+def backfill_submissions(db: Session, batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """Move legacy inline submitted_work into the blob store, so listings report its size and type"""
+    application = models.Application
+    moved = 0
+    while True:
+        rows = db.execute(
+            select(application.id, application.submitted_work)
+            .where(application.submitted_work.isnot(None), application.submission_ref.is_(None))
+            .order_by(application.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return moved
+        blobs = [(row.id, blobstore.store.write_bytes(str(row.submitted_work).encode())) for row in rows]
+        db.execute(update(application), [
+            {"id": id, "submission_ref": blob.ref, "submission_size": blob.size,
+             "submission_content_type": "text/plain; charset=utf-8"}
+            for id, blob in blobs
+        ])
+        db.commit()
+        moved += len(blobs)
+
+class Archiver:
+    """Background thread that runs archive_completed_jobs every interval"""
+
+    def __init__(self, interval: float = ARCHIVE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                moved = archive_completed_jobs(db)
+                if moved:
+                    logger.info("Archived %d completed jobs", moved)
+                prune_refresh_tokens(db)
+            except Exception:
+                logger.exception("Archiving completed jobs failed")
+                db.rollback()
+            finally:
+                db.close()
+
+archiver = Archiver()
+
+class ExpiryScheduler:
+    """Background thread that expires stale open jobs; a lease keeps it to one worker"""
+
+    LEASE = "job-expiry"
+
+    def __init__(self, interval: float = EXPIRY_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._holder = ""
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        # Per process: workers forked from one master must not share a holder id
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            db = SessionLocal()
+            try:
+                release_lease(db, self.LEASE, self._holder)
+            except Exception:
+                logger.exception("Releasing the job expiry lease failed")
+            finally:
+                db.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                # Outlives a missed tick or two, so a live holder keeps it
+                if acquire_lease(db, self.LEASE, self._holder, self.interval * 3):
+                    expired = expire_stale_jobs(db)
+                    if expired:
+                        logger.info("Expired %d stale open jobs", expired)
+            except Exception:
+                logger.exception("Expiring stale jobs failed")
+                db.rollback()
+            finally:
+                db.close()
+
+expiry = ExpiryScheduler()
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        print(f"Parsed {backfill_estimated_minutes(session)} estimated times")
+        print(f"Moved {backfill_submissions(session)} inline submissions to the blob store")
+        print(f"Expired {expire_stale_jobs(session)} stale open jobs")
+        print(f"Archived {archive_completed_jobs(session)} completed jobs")
+        print(f"Pruned {prune_refresh_tokens(session)} expired refresh tokens")
+    finally:
+        session.close()
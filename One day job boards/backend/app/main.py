@@ -1,8 +1,12 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 from .database import engine
-from . import models
-from .routers import auth, jobs, case_studies, reviews, applications, admin, chat
+from . import models, ratelimit, media, lifecycle, cache, provisioning, purge, audit, admission
+from .routers import auth, jobs, case_studies, reviews, applications, admin, chat, uploads, batch, dashboard
 from dotenv import load_dotenv
 
 # Create database tables
@@ -11,7 +15,29 @@ models.Base.metadata.create_all(bind=engine)
 # Load environment variables from .env (if present)
 load_dotenv()
 
-app = FastAPI(title="One-Day Job Board API", version="1.0.0", redirect_slashes=False)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    cache.start()
+    audit.log.start()
+    lifecycle.archiver.start()
+    lifecycle.expiry.start()
+    purge.purger.start()
+    yield
+    purge.purger.stop()
+    lifecycle.expiry.stop()
+    lifecycle.archiver.stop()
+    audit.log.stop()
+    cache.stop()
+    media.shutdown()
+    provisioning.shutdown()
+
+app = FastAPI(title="One-Day Job Board API", version="1.0.0", redirect_slashes=False, lifespan=lifespan)
+
+# Token-bucket admission control for expensive routes (login, signup, chat)
+app.add_middleware(ratelimit.RateLimitMiddleware, limiter=ratelimit.limiter)
+
+# Shed load with 503 when overloaded; admitted requests run under per-route deadlines
+app.add_middleware(admission.AdmissionMiddleware, controller=admission.controller)
 
 # CORS middleware for frontend integration
 origins = [
@@ -25,8 +51,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
+@app.exception_handler(admission.DeadlineExceeded)
+@app.exception_handler(OperationalError)
+async def deadline_exceeded(request: Request, exc: Exception) -> JSONResponse:
+    if isinstance(exc, OperationalError) and not admission.is_cancelled_statement(exc):
+        raise exc
+    return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
@@ -35,6 +69,12 @@ app.include_router(reviews.router, prefix="/reviews", tags=["Reviews"])
 app.include_router(applications.router, prefix="/applications", tags=["Applications"])
 app.include_router(chat.router, tags=["Chat"])
 app.include_router(admin.router, tags=["Admin"])
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+app.include_router(batch.router, tags=["Batch"])
+app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+
+# Uploaded images and their variants, served with immutable cache headers
+app.mount(media.MEDIA_URL, media.ImmutableStaticFiles(directory=media.MEDIA_ROOT), name="media")
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,129 @@
+from concurrent.futures import Future
+from fastapi import HTTPException, Request
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+import tempfile
+from .processes import SpawnPool
+
+logger = logging.getLogger(__name__)
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "media"))
+MEDIA_URL = "/media"
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 2))
+CHUNK_SIZE = 64 * 1024
+
+# Variant name -> bounding box; every variant is re-encoded as WebP
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "thumb": (400, 300),
+    "web": (1600, 1200),
+}
+
+IMAGE_DIR = os.path.join(MEDIA_ROOT, "images")
+os.makedirs(IMAGE_DIR, exist_ok=True)
+
+def _sniff_extension(head: bytes) -> Optional[str]:
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+def image_url(name: str) -> str:
+    return f"{MEDIA_URL}/images/{name}"
+
+def variant_url(url: str, variant: str) -> str:
+    return f"{os.path.splitext(url)[0]}_{variant}.webp"
+
+def ready_variant_url(url: str, variant: str) -> str:
+    """The variant once the process pool has written it, else the original (still rendering, or failed)"""
+    target = variant_url(url, variant)
+    if os.path.exists(os.path.join(IMAGE_DIR, os.path.basename(target))):
+        return target
+    return url
+
+def thumbnail_url(url: Optional[str]) -> Optional[str]:
+    """Small variant for locally uploaded images; external URLs are returned unchanged"""
+    if url and url.startswith(MEDIA_URL + "/images/"):
+        return ready_variant_url(url, "thumb")
+    return url
+
+async def save_upload(request: Request) -> str:
+    """Stream the request body to disk in chunks and store it under its content hash"""
+    hasher = hashlib.sha256()
+    size = 0
+    extension: Optional[str] = None
+    fd, tmp_path = tempfile.mkstemp(dir=IMAGE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            async for chunk in request.stream():
+                if extension is None and chunk:
+                    extension = _sniff_extension(chunk[:16])
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Unsupported image type")
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Image too large")
+                hasher.update(chunk)
+                tmp.write(chunk)
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Empty upload")
+        name = hasher.hexdigest()[:32] + extension
+        os.replace(tmp_path, os.path.join(IMAGE_DIR, name))
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def render_variants(source: str) -> None:
+    """Write resized WebP variants next to source; runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    base = os.path.splitext(source)[0]
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        for variant, size in VARIANTS.items():
+            target = f"{base}_{variant}.webp"
+            if os.path.exists(target):
+                continue
+            resized = image.copy()
+            resized.thumbnail(size)
+            partial = target + ".part"
+            resized.save(partial, "WEBP", quality=80, method=4)
+            os.replace(partial, target)
+
+_pool = SpawnPool(MEDIA_WORKERS)
+
+def _log_failure(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        logger.error("Image variant generation failed: %s", error)
+
+def generate_variants(name: str) -> Future:
+    """Queue variant generation in the process pool without waiting for it"""
+    future = _pool.get().submit(render_variants, os.path.join(IMAGE_DIR, name))
+    future.add_done_callback(_log_failure)
+    return future
+
+def shutdown() -> None:
+    _pool.shutdown()
+
+class ImmutableStaticFiles(StaticFiles):
+    """Content-hashed files never change, so clients may cache them forever"""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
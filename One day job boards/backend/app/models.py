@@ -1,11 +1,25 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, TIMESTAMP, ForeignKey, JSON, Numeric
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, TIMESTAMP, ForeignKey, JSON, Numeric, Uuid as UUID, Table, Index, cast, event, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from .database import Base
+from typing import Any, Optional
+import logging
+import re
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# JSONB on Postgres (as in schema.sql) so GIN indexes and containment work; plain JSON elsewhere
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("idx_users_role", "role"),
+        Index("idx_users_department", "department"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String(50), unique=True, nullable=False)
@@ -14,9 +28,33 @@ class User(Base):
     role = Column(String(20), nullable=False)  # 'poster', 'doer', 'admin'
     department = Column(String(50))
     created_at = Column(TIMESTAMP, server_default=func.now())
+    deactivated_at = Column(TIMESTAMP)  # set when the account is scheduled for purge; its tokens stop working
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)  # sha256 of the opaque token
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # every rotation of one login
+    expires_at = Column(TIMESTAMP, nullable=False)
+    revoked_at = Column(TIMESTAMP)
+    created_at = Column(TIMESTAMP, server_default=func.now())
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("idx_jobs_posted_by_created", "posted_by", "created_at", "id"),
+        # Unfiltered listings, newest first
+        Index("idx_jobs_created", "created_at", "id"),
+        # Listings filter by status; the rest of each key serves one sort order or range filter
+        Index("idx_jobs_status_created", "status", "created_at", "id"),
+        Index("idx_jobs_status_reward", "status", "reward", "id"),
+        Index("idx_jobs_status_reward_type", "status", "reward_type", "reward", "id"),
+        Index("idx_jobs_status_featured", "status", "is_featured", "created_at", "id"),
+        Index("idx_jobs_status_minutes", "status", "estimated_minutes", "id"),
+        Index("idx_jobs_department_status", "department", "status", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(255), nullable=False)
@@ -27,14 +65,42 @@ class Job(Base):
     posted_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     department = Column(String(50))
     estimated_time = Column(String(50))
-    skills_required = Column(JSON)
-    status = Column(String(20), default="open")  # 'open', 'in_progress', 'completed'
+    estimated_minutes = Column(Integer)  # parsed from estimated_time; None when it can't be read
+    skills_required = Column(JSONDocument)
+    status = Column(String(20), default="open")  # 'open', 'in_progress', 'completed', 'expired'
     is_featured = Column(Boolean, default=False)
     image_url = Column(String(500))
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+_DURATION_UNITS = {
+    "minutes": 1, "minute": 1, "mins": 1, "min": 1, "m": 1,
+    "hours": 60, "hour": 60, "hrs": 60, "hr": 60, "h": 60,
+    "days": 1440, "day": 1440, "d": 1440,
+    "weeks": 10080, "week": 10080, "w": 10080,
+}
+_DURATION = re.compile(
+    r"\b(half an?|an?|\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?\s*("
+    + "|".join(sorted(_DURATION_UNITS, key=len, reverse=True)) + r")\b"
+)
+
+def parse_duration_minutes(text: Optional[str]) -> Optional[int]:
+    """Minutes in a free-text estimate such as '2 hours', '1h 30m' or '2-3 days' (upper bound of a range)"""
+    total = 0.0
+    for amount, upper, unit in _DURATION.findall((text or "").lower()):
+        value = 0.5 if amount.startswith("half") else 1.0 if amount in ("a", "an") else float(upper or amount)
+        total += value * _DURATION_UNITS[unit]
+    return round(total) if total else None
+
+@event.listens_for(Job.estimated_time, "set")
+def _parse_estimated_time(target: "Job", value: Optional[str], oldvalue: object, initiator: object) -> None:
+    target.estimated_minutes = parse_duration_minutes(value)
+
 class CaseStudy(Base):
     __tablename__ = "case_studies"
+    __table_args__ = (
+        Index("idx_case_studies_time_to_deliver", "time_to_deliver"),
+        Index("idx_case_studies_created_at", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(255), nullable=False)
@@ -43,12 +109,26 @@ class CaseStudy(Base):
     solution = Column(Text, nullable=False)
     time_to_deliver = Column(Integer, nullable=False)  # in minutes
     difficulty_level = Column(String(20), nullable=False)  # 'easy', 'medium', 'hard'
-    tags = Column(JSON)
+    tags = Column(JSONDocument)
     image_url = Column(String(500))
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+# Case-study filters are case-insensitive, as in app.catalog, so the indexes are on the lowercased values
+Index("idx_case_studies_category_difficulty", func.lower(CaseStudy.category), func.lower(CaseStudy.difficulty_level), CaseStudy.time_to_deliver)
+Index("idx_case_studies_difficulty_time", func.lower(CaseStudy.difficulty_level), CaseStudy.time_to_deliver)
+
+def lower_tags() -> Any:
+    """The tags document with every tag lowercased, for case-insensitive containment"""
+    return cast(func.lower(cast(CaseStudy.tags, Text)), JSONB)
+
+Index("idx_case_studies_tags", lower_tags(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("idx_reviews_user_id", "user_id"),
+        Index("idx_reviews_job_id", "job_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
@@ -59,10 +139,108 @@ class Review(Base):
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        Index("idx_applications_job_created", "job_id", "created_at"),
+        Index("idx_applications_applicant_id", "applicant_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id"))
     applicant_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     status = Column(String(20), default="pending")  # pending, accepted, rejected, completed
-    submitted_work = Column(Text)
-    created_at = Column(TIMESTAMP, server_default=func.now())
\ No newline at end of file
+    submitted_work = deferred(Column(Text))  # legacy inline submissions; new ones live in the blob store
+    submission_ref = Column(String(64))  # sha256 of the content in app.blobstore
+    submission_size = Column(BigInteger)
+    submission_content_type = Column(String(100))
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class SchedulerLease(Base):
+    """Who may run a periodic task right now; taken and renewed by app.lifecycle"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=False)
+
+class PurgeJob(Base):
+    """A background deletion of a user or job and everything that references it (see app.purge)"""
+    __tablename__ = "purge_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    target_type = Column(String(20), nullable=False)  # 'user', 'job'
+    target_id = Column(UUID(as_uuid=True), nullable=False)
+    requested_by = Column(UUID(as_uuid=True))  # no FK: the requester may be purged later
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    progress = Column(JSON)  # rows deleted so far, per table
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now())
+    finished_at = Column(TIMESTAMP)
+
+class AuditEvent(Base):
+    """Append-only record of a status or role change, written in batches by app.audit"""
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("idx_audit_events_occurred", "occurred_at", "id"),
+        Index("idx_audit_events_entity", "entity_type", "entity_id", "occurred_at"),
+    )
+
+    # No foreign keys: the history outlives purged users and jobs
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    occurred_at = Column(TIMESTAMP, nullable=False)
+    actor_id = Column(UUID(as_uuid=True))
+    action = Column(String(50), nullable=False)  # 'job.status', 'application.status', 'user.role'
+    entity_type = Column(String(20), nullable=False)  # 'job', 'application', 'user'
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    old_value = Column(String(50))
+    new_value = Column(String(50))
+
+# Archive tables for the hot/cold lifecycle (see app.lifecycle). Same columns as
+# the live tables, minus foreign keys, plus the time the row was archived.
+def _archive_table(source: Table, name: str, *indexes: Index) -> Table:
+    columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in source.columns]
+    return Table(name, Base.metadata, *columns, Column("archived_at", TIMESTAMP, server_default=func.now()), *indexes)
+
+class ArchivedJob(Base):
+    __table__ = _archive_table(
+        Job.__table__, "jobs_archive",
+        Index("idx_jobs_archive_slug", "slug"),
+        Index("idx_jobs_archive_posted_by", "posted_by"),
+    )
+
+class ArchivedApplication(Base):
+    __table__ = _archive_table(
+        Application.__table__, "applications_archive",
+        Index("idx_applications_archive_job_id", "job_id"),
+        Index("idx_applications_archive_applicant_id", "applicant_id"),
+    )
+
+class ArchivedReview(Base):
+    __table__ = _archive_table(
+        Review.__table__, "reviews_archive",
+        Index("idx_reviews_archive_job_id", "job_id"),
+    )
+
+# Trigram GIN indexes for admin user search. pg_trgm is optional: when the
+# server does not ship it, search falls back to plain ILIKE scans.
+TRIGRAM_INDEXES = {
+    "idx_users_username_trgm": ("users", "username"),
+    "idx_users_email_trgm": ("users", "email"),
+}
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_trigram_indexes(target, connection, **kw) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    if connection.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is None:
+        logger.warning("pg_trgm is not available; user search will not use trigram indexes")
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for name, (table, column) in TRIGRAM_INDEXES.items():
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"))
+    except DBAPIError as error:
+        logger.warning("Could not create trigram indexes: %s", error)
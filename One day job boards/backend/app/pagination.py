@@ -0,0 +1,32 @@
+"""
+Keyset pagination cursors. A cursor is the sort key of the last row on a
+page, base64-encoded so clients pass it back as an opaque string; the next
+page starts strictly after it instead of at an OFFSET.
+"""
+
+from datetime import datetime
+from fastapi import HTTPException
+from typing import Any, Tuple
+import base64
+import binascii
+import uuid
+
+def encode_cursor(*key: Any) -> str:
+    """Encode a sort key; datetimes as ISO strings, parts joined by |"""
+    raw = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in key)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    """The raw sort key of a cursor; 400 if it isn't one"""
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def decode_time_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """A (timestamp, id) cursor, for lists ordered newest first with the id as tie-break"""
+    timestamp, _, row_id = decode_cursor(cursor).partition("|")
+    try:
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,59 @@
+"""
+Helpers for state that crosses process boundaries: SQLite files shared by
+the pre-fork workers on one host, and process pools for CPU-bound work.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+import multiprocessing
+import os
+import sqlite3
+import threading
+
+class LocalSQLite:
+    """
+    A SQLite file shared by every worker process on the host, one connection
+    per thread. Connections are opened lazily and again after a fork: one
+    inherited from the parent shares its file locks and must not be used by
+    both processes.
+    """
+
+    def __init__(self, path: str, schema: Sequence[str] = ()):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's autocommit connection; transactions are begun explicitly"""
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+class SpawnPool:
+    """
+    A process pool started on first use with the spawn start method: forked
+    workers would inherit the parent's database pools and client sockets,
+    spawned ones start from a fresh interpreter.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
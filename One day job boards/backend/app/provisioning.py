@@ -0,0 +1,103 @@
+"""
+Bulk user provisioning: hash passwords across a process pool, check the whole
+batch against existing users in one query, and insert with ON CONFLICT DO
+NOTHING so anything that slipped in concurrently is reported, not raised.
+"""
+
+from dataclasses import dataclass, field
+from sqlalchemy import or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import os
+import uuid
+from . import models, schemas, auth
+from .processes import SpawnPool
+
+PROVISION_WORKERS = int(os.getenv("PROVISION_WORKERS", os.cpu_count() or 1))
+PROVISION_MAX_USERS = int(os.getenv("PROVISION_MAX_USERS", 5000))
+INSERT_CHUNK_SIZE = 1000
+# Below this many passwords, starting worker processes costs more than it saves
+PARALLEL_HASH_THRESHOLD = 8
+
+_pool = SpawnPool(PROVISION_WORKERS)
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    if len(passwords) < PARALLEL_HASH_THRESHOLD or PROVISION_WORKERS <= 1:
+        return [auth.get_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (PROVISION_WORKERS * 4))
+    return list(_pool.get().map(auth.get_password_hash, passwords, chunksize=chunksize))
+
+def shutdown() -> None:
+    _pool.shutdown()
+
+@dataclass
+class ProvisionReport:
+    created: List[str] = field(default_factory=list)
+    skipped: List[schemas.SkippedUser] = field(default_factory=list)
+
+def _insert(db: Session):
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(models.User.__table__)
+
+def provision_users(db: Session, users: List[schemas.UserCreate]) -> ProvisionReport:
+    report = ProvisionReport()
+
+    def skip(user: schemas.UserCreate, reason: str) -> None:
+        report.skipped.append(schemas.SkippedUser(username=user.username, email=user.email, reason=reason))
+
+    # Duplicates inside the batch itself: first one wins
+    candidates: List[schemas.UserCreate] = []
+    usernames, emails = set(), set()
+    for user in users:
+        if user.username in usernames:
+            skip(user, "duplicate username in batch")
+        elif user.email in emails:
+            skip(user, "duplicate email in batch")
+        else:
+            usernames.add(user.username)
+            emails.add(user.email)
+            candidates.append(user)
+
+    # One query for the whole batch, before spending CPU on hashes
+    taken_usernames, taken_emails = set(), set()
+    if candidates:
+        for username, email in db.execute(
+            select(models.User.username, models.User.email).where(
+                or_(models.User.username.in_(usernames), models.User.email.in_(emails))
+            )
+        ):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+    fresh: List[schemas.UserCreate] = []
+    for user in candidates:
+        if user.username in taken_usernames:
+            skip(user, "username already registered")
+        elif user.email in taken_emails:
+            skip(user, "email already registered")
+        else:
+            fresh.append(user)
+
+    hashes = hash_passwords([user.password for user in fresh])
+    rows: List[Dict[str, object]] = [
+        {
+            "id": uuid.uuid4(),
+            "username": user.username,
+            "email": user.email,
+            "password_hash": password_hash,
+            "role": user.role,
+            "department": user.department,
+        }
+        for user, password_hash in zip(fresh, hashes)
+    ]
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        statement = _insert(db).values(chunk).on_conflict_do_nothing().returning(models.User.__table__.c.username)
+        inserted = set(db.scalars(statement))
+        report.created += [str(row["username"]) for row in chunk if row["username"] in inserted]
+        # Lost a race with a concurrent signup between the check and the insert
+        for user in fresh[start:start + INSERT_CHUNK_SIZE]:
+            if user.username not in inserted:
+                skip(user, "already registered")
+    db.commit()
+    return report
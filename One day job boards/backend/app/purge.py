@@ -0,0 +1,212 @@
+"""
+Background purges: delete a user or a job and everything that references it
+with set-based DELETEs in bounded batches, children before parents, so no
+single statement holds locks for long and foreign keys hold at every step.
+Rows written while the purge runs are swept by repeating the child steps
+until a full pass finds nothing, and only then is the target itself deleted.
+Progress is recorded on the PurgeJob row after every batch; a failed purge
+is retried up to PURGE_MAX_ATTEMPTS times.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import queue
+import threading
+import uuid
+from . import models, cache, search
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 1000))
+# A running purge with no progress for this long is assumed dead and may be claimed again
+PURGE_STALE_SECONDS = int(os.getenv("PURGE_STALE_SECONDS", 600))
+PURGE_MAX_ATTEMPTS = int(os.getenv("PURGE_MAX_ATTEMPTS", 3))
+PURGE_RETRY_SECONDS = float(os.getenv("PURGE_RETRY_SECONDS", 60))
+
+# (table label, model, condition); every model has an id primary key.
+# The last step of each list deletes the purge target itself.
+Step = Tuple[str, Any, Any]
+
+def _user_steps(user_id: uuid.UUID) -> List[Step]:
+    jobs = select(models.Job.id).where(models.Job.posted_by == user_id)
+    archived_jobs = select(models.ArchivedJob.id).where(models.ArchivedJob.posted_by == user_id)
+    return [
+        ("applications", models.Application, or_(models.Application.job_id.in_(jobs), models.Application.applicant_id == user_id)),
+        ("reviews", models.Review, or_(models.Review.job_id.in_(jobs), models.Review.user_id == user_id)),
+        ("jobs", models.Job, models.Job.posted_by == user_id),
+        ("applications_archive", models.ArchivedApplication, or_(
+            models.ArchivedApplication.job_id.in_(archived_jobs), models.ArchivedApplication.applicant_id == user_id)),
+        ("reviews_archive", models.ArchivedReview, or_(
+            models.ArchivedReview.job_id.in_(archived_jobs), models.ArchivedReview.user_id == user_id)),
+        ("jobs_archive", models.ArchivedJob, models.ArchivedJob.posted_by == user_id),
+        ("refresh_tokens", models.RefreshToken, models.RefreshToken.user_id == user_id),
+        ("users", models.User, models.User.id == user_id),
+    ]
+
+def _job_steps(job_id: uuid.UUID) -> List[Step]:
+    return [
+        ("applications", models.Application, models.Application.job_id == job_id),
+        ("reviews", models.Review, models.Review.job_id == job_id),
+        ("jobs", models.Job, models.Job.id == job_id),
+    ]
+
+STEPS: Dict[str, Callable[[uuid.UUID], List[Step]]] = {"user": _user_steps, "job": _job_steps}
+
+# Bulk DML skips the ORM flush events, so cached rows are evicted from what the DELETE returns
+_EVICT: Dict[Any, Tuple[Any, ...]] = {
+    models.Job: (models.Job.id, models.Job.slug),
+    models.User: (models.User.id, models.User.username),
+}
+
+def _delete_batch(db: Session, model: Any, condition: Any, batch_size: int) -> int:
+    ids = select(model.id).where(condition).limit(batch_size)
+    statement = delete(model).where(model.id.in_(ids))
+    evict = _EVICT.get(model)
+    if evict is None:
+        return db.execute(statement).rowcount
+    rows = db.execute(statement.returning(*evict)).all()
+    keys = [
+        cache.entities.key(model.__tablename__, column.key, value)
+        for row in rows for column, value in zip(evict, row)
+    ]
+    db.info.setdefault("purge_evict", []).extend(keys)
+    if model is models.Job:
+        db.info.setdefault("purge_unindex", []).extend(row[0] for row in rows)
+    return len(rows)
+
+def _run_steps(db: Session, job: models.PurgeJob, progress: Dict[str, int], steps: List[Step], batch_size: int) -> int:
+    """One pass over steps, each drained in batches; returns the rows deleted"""
+    total = 0
+    for label, model, condition in steps:
+        while True:
+            deleted = _delete_batch(db, model, condition, batch_size)
+            total += deleted
+            progress[label] = progress.get(label, 0) + deleted
+            job.progress = dict(progress)
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            cache.entities.invalidate(db.info.pop("purge_evict", []))
+            search.index.remove("job", db.info.pop("purge_unindex", []))
+            if deleted < batch_size:
+                break
+    return total
+
+def run_purge(db: Session, purge_id: uuid.UUID, batch_size: int = PURGE_BATCH_SIZE) -> Optional[models.PurgeJob]:
+    """
+    Claim and run one purge to completion; returns None if another worker owns
+    it. A failure with attempts left puts the purge back to pending.
+    """
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(models.PurgeJob)
+        .where(models.PurgeJob.id == purge_id)
+        .where(or_(
+            models.PurgeJob.status == "pending",
+            (models.PurgeJob.status == "running") & (models.PurgeJob.updated_at < now - timedelta(seconds=PURGE_STALE_SECONDS)),
+        ))
+        .values(status="running", updated_at=now, attempts=models.PurgeJob.attempts + 1)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    job = db.query(models.PurgeJob).filter(models.PurgeJob.id == purge_id).one()
+    progress: Dict[str, int] = dict(job.progress or {})
+    *children, target = STEPS[str(job.target_type)](job.target_id)
+    try:
+        # Anything written since the previous pass is caught by the next one
+        while _run_steps(db, job, progress, children, batch_size):
+            pass
+        _run_steps(db, job, progress, [target], batch_size)
+        job.status = "completed"
+    except Exception as error:
+        logger.exception("Purge %s failed", purge_id)
+        db.rollback()
+        db.info.pop("purge_evict", None)
+        db.info.pop("purge_unindex", None)
+        job.error = str(error)
+        job.status = "pending" if job.attempts < PURGE_MAX_ATTEMPTS else "failed"
+    job.updated_at = datetime.utcnow()
+    if job.status != "pending":
+        job.finished_at = job.updated_at
+    db.commit()
+    return job
+
+class Purger:
+    """Single background thread that runs queued purges one at a time"""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[uuid.UUID]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, purge_id: uuid.UUID) -> None:
+        self._queue.put(purge_id)
+
+    def retry(self, purge_id: uuid.UUID, delay: float = PURGE_RETRY_SECONDS) -> None:
+        """Queue a failed purge again after delay; a restart in between picks it up as pending"""
+        timer = threading.Timer(delay, self.submit, args=(purge_id,))
+        timer.daemon = True
+        timer.start()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="purger", daemon=True)
+        self._thread.start()
+        # Pick up purges left behind by a restart; claiming makes this safe across workers
+        db = SessionLocal()
+        try:
+            for (purge_id,) in db.query(models.PurgeJob.id).filter(models.PurgeJob.status.in_(("pending", "running"))):
+                self.submit(purge_id)
+        except Exception:
+            logger.exception("Could not load unfinished purges")
+        finally:
+            db.close()
+
+    def stop(self) -> None:
+        """Finish the purge in progress; queued ones stay pending for the next start"""
+        if self._thread is not None:
+            self._stop.set()
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            purge_id = self._queue.get()
+            if purge_id is None or self._stop.is_set():
+                return
+            db = SessionLocal()
+            try:
+                job = run_purge(db, purge_id)
+                if job is not None and job.status == "pending":
+                    self.retry(purge_id)
+            except Exception:
+                logger.exception("Purge %s crashed", purge_id)
+            finally:
+                db.close()
+
+purger = Purger()
+
+def request_purge(db: Session, target_type: str, target_id: Any, requested_by: Any = None) -> models.PurgeJob:
+    """Schedule a purge of the target, or return the one already scheduled or running for it"""
+    existing = (
+        db.query(models.PurgeJob)
+        .filter(models.PurgeJob.target_type == target_type, models.PurgeJob.target_id == target_id)
+        .filter(models.PurgeJob.status.in_(("pending", "running")))
+        .first()
+    )
+    if existing is not None:
+        return existing
+    job = models.PurgeJob(target_type=target_type, target_id=target_id, requested_by=requested_by, progress={})
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    purger.submit(job.id)
+    return job
@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from jose import JWTError, jwt
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Dict, Optional, Protocol, Tuple
+import math
+import os
+import threading
+import time
+from . import auth
+from .processes import LocalSQLite
+
+@dataclass(frozen=True)
+class Rule:
+    capacity: int  # burst size
+    per_seconds: float  # time to refill a full bucket
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+# Defaults cover the endpoints that burn CPU (pbkdf2) or money (remote LLM calls)
+DEFAULT_RULES: Dict[str, Rule] = {
+    "/auth/login": Rule(10, 60),
+    "/auth/signup": Rule(5, 60),
+    "/chat": Rule(20, 60),
+}
+
+def parse_rules(spec: str) -> Dict[str, Rule]:
+    """Parse RATE_LIMITS, e.g. "/auth/login=10/60,/chat=20/60" (capacity/seconds)"""
+    rules: Dict[str, Rule] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        path, limit = item.strip().rsplit("=", 1)
+        capacity, seconds = limit.split("/")
+        rules[path.strip()] = Rule(int(capacity), float(seconds))
+    return rules
+
+class Backend(Protocol):
+    def take(self, key: str, rule: Rule) -> float:
+        """Consume one token; return 0 if allowed, else seconds until a token is available"""
+        ...
+
+def _refill(tokens: float, stamp: float, now: float, rule: Rule) -> Tuple[float, float]:
+    tokens = min(float(rule.capacity), tokens + (now - stamp) * rule.refill_rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rule.refill_rate
+
+class MemoryBackend:
+    """Per-process buckets; limits are multiplied by the number of workers"""
+
+    def __init__(self, max_keys: int = 100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rule: Rule) -> float:
+        now = self.clock()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (float(rule.capacity), now))
+            tokens, retry_after = _refill(tokens, stamp, now, rule)
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                self._prune(now)
+            self._buckets[key] = (tokens, now)
+        return retry_after
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle for an hour are full again under any sane rule
+        for key, (_, stamp) in list(self._buckets.items()):
+            if now - stamp > 3600:
+                del self._buckets[key]
+
+class SQLiteBackend:
+    """Buckets in a SQLite file shared by every worker process on the host"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.clock = clock
+        self.db = LocalSQLite(path, ["CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)"])
+
+    def take(self, key: str, rule: Rule) -> float:
+        conn = self.db.connection()
+        now = self.clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, stamp FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, stamp = row if row else (float(rule.capacity), now)
+            tokens, retry_after = _refill(tokens, stamp, now, rule)
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, stamp) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+def backend_from_env(spec: str) -> Backend:
+    """RATE_LIMIT_BACKEND: "memory" (default) or "sqlite:///path/to/file" """
+    if spec.startswith("sqlite:///"):
+        return SQLiteBackend(spec[len("sqlite:///"):])
+    return MemoryBackend()
+
+class RateLimiter:
+    def __init__(self, rules: Dict[str, Rule], backend: Backend):
+        self.rules = rules
+        self.backend = backend
+        self._subjects: Dict[str, str] = {}
+
+    def principal(self, scope: Scope) -> str:
+        """Token subject for authenticated callers, client IP otherwise"""
+        for name, value in scope["headers"]:
+            if name == b"authorization" and value[:7].lower() == b"bearer ":
+                subject = self._subject(value[7:].decode("latin-1"))
+                if subject:
+                    return "user:" + subject
+                break
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "")
+
+    def _subject(self, token: str) -> Optional[str]:
+        subject = self._subjects.get(token)
+        if subject is None:
+            try:
+                payload = jwt.decode(token, auth.SECRET_KEY or "", algorithms=[auth.ALGORITHM])
+            except JWTError:
+                return None
+            subject = payload.get("sub")
+            if not isinstance(subject, str):
+                return None
+            if len(self._subjects) >= 4096:
+                self._subjects.clear()
+            self._subjects[token] = subject
+        return subject
+
+    def check(self, scope: Scope) -> float:
+        rule = self.rules.get(scope["path"])
+        if rule is None:
+            return 0.0
+        return self.backend.take(scope["path"] + "|" + self.principal(scope), rule)
+
+RATE_LIMITS = os.getenv("RATE_LIMITS")
+limiter = RateLimiter(
+    parse_rules(RATE_LIMITS) if RATE_LIMITS is not None else dict(DEFAULT_RULES),
+    backend_from_env(os.getenv("RATE_LIMIT_BACKEND", "memory")),
+)
+
+class RateLimitMiddleware:
+    """Plain ASGI middleware: unlimited paths cost one dict lookup"""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.limiter.rules:
+            retry_after = self.limiter.check(scope)
+            if retry_after > 0:
+                await send({
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"retry-after", str(math.ceil(retry_after)).encode()),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": b'{"detail":"Too many requests"}'})
+                return
+        await self.app(scope, receive, send)
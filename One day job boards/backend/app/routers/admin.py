@@ -1,33 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from .. import models, schemas, auth, database
+import uuid
+from .. import crud, models, schemas, auth, database, fastpath, cache, provisioning, purge, audit, export
+from ..pagination import encode_cursor, decode_cursor, decode_time_cursor
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 # User Management Endpoints
 @router.get("/users", response_model=List[schemas.User])
 def get_all_users(
+    response: Response,
     skip: int = Query(0),
-    limit: int = Query(100),
+    limit: int = Query(100, ge=1, le=1000),
     role: Optional[str] = Query(None),
+    department: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, description="Substring or fuzzy match on username and email"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.require_role("admin"))
+):
+    """
+    Search users, ordered by username. X-Total-Count carries the planner's
+    estimate of matching rows and X-Next-Cursor the keyset cursor for the next page.
+    """
+    view = fastpath.list_view(schemas.User, fields)
+    columns = None
+    if view:
+        columns = fastpath.columns_for(models.User, view)
+        if "username" not in view.model_fields:
+            columns.append(models.User.username)  # needed for the cursor
+    query = crud.search_users(db, q=q, role=role, department=department, columns=columns)
+    headers = {"X-Total-Count": str(crud.estimate_count(db, query.statement))}
+    if cursor:
+        query = query.filter(models.User.username > decode_cursor(cursor))
+    else:
+        query = query.offset(skip)
+    # One extra row tells whether another page exists
+    results = query.limit(limit + 1).all()
+    if len(results) > limit:
+        results = results[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(results[-1].username)
+    if view:
+        rendered = fastpath.render_rows(view, results)
+        rendered.headers.update(headers)
+        return rendered
+    response.headers.update(headers)
+    return results
+
+@router.post("/users/bulk", response_model=schemas.BulkProvisionResult)
+def provision_users(
+    body: schemas.BulkUserCreate,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_role("admin"))
 ):
-    """Get all users with optional role filter"""
-    query = db.query(models.User)
-    if role:
-        query = query.filter(models.User.role == role)
-    return query.offset(skip).limit(limit).all()
+    """Create many users at once; existing usernames or emails are reported, not raised"""
+    if len(body.users) > provisioning.PROVISION_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {provisioning.PROVISION_MAX_USERS} users per request")
+    return provisioning.provision_users(db, body.users)
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", status_code=202)
 def delete_user(
     user_id: str,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_role("admin"))
-):
-    """Delete a user account"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+) -> Dict[str, Any]:
+    """Schedule a user account, with their jobs, applications and reviews, for deletion"""
+    user = crud.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -35,9 +77,13 @@ def delete_user(
     if str(user.id) == str(current_user.id):
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
-    db.delete(user)
-    db.commit()
-    return {"message": f"User {user.username} deleted successfully"}
+    # Sign the user out now, access tokens included; the rows go in the background
+    username = user.username
+    if user.deactivated_at is None:
+        user.deactivated_at = datetime.utcnow()
+    auth.revoke_refresh_tokens(db, user_id=user.id)
+    job = purge.request_purge(db, "user", user.id, requested_by=current_user.id)
+    return {"message": f"User {username} scheduled for deletion", "purge_id": str(job.id), "status": job.status}
 
 @router.put("/users/{username}/role", response_model=schemas.User)
 def update_user_role(
@@ -55,8 +101,11 @@ def update_user_role(
     if new_role not in ["poster", "doer", "admin"]:
         raise HTTPException(status_code=400, detail="Invalid role")
     
+    old_role = user.role
     setattr(user, 'role', new_role)
     db.commit()
+    audit.record(current_user.id, "user.role", "user", user.id, old_role, new_role)
+    auth.revoke_refresh_tokens(db, user_id=user.id)
     db.refresh(user)
     return user
 
@@ -64,31 +113,94 @@ def update_user_role(
 @router.get("/jobs", response_model=List[schemas.Job])
 def get_all_jobs(
     skip: int = Query(0),
-    limit: int = Query(100),
+    limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
-    db: Session = Depends(database.get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.require_role("admin"))
 ):
-    """Get all jobs with optional status filter"""
-    query = db.query(models.Job)
+    """Get all jobs with optional status filter; use /admin/exports/jobs for everything at once"""
+    view = fastpath.list_view(schemas.Job, fields)
+    query = db.query(*fastpath.columns_for(models.Job, view)) if view else db.query(models.Job)
     if status:
         query = query.filter(models.Job.status == status)
-    return query.offset(skip).limit(limit).all()
+    results = query.offset(skip).limit(limit).all()
+    return fastpath.render_rows(view, results) if view else results
 
-@router.delete("/jobs/{job_id}")
+@router.get("/exports/{entity}")
+def export_entities(
+    entity: str = Path(..., pattern="^(users|jobs|applications)$"),
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    role: Optional[str] = Query(None),
+    department: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.require_role("admin"))
+):
+    """
+    Stream every matching user, job or application as NDJSON or CSV. Rows are
+    written as they arrive from a server-side cursor, so exports of any size
+    run in constant memory.
+    """
+    model, _ = export.ENTITIES[entity]
+    filters = []
+    for name, value in (("role", role), ("department", department), ("status", status)):
+        if value is None:
+            continue
+        if not hasattr(model, name):
+            raise HTTPException(status_code=400, detail=f"{entity} cannot be filtered by {name}")
+        filters.append(getattr(model, name) == value)
+    return StreamingResponse(
+        export.stream(db, entity, fmt, filters),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{fmt}"'},
+    )
+
+@router.delete("/jobs/{job_id}", status_code=202)
 def delete_job_admin(
     job_id: str,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_role("admin"))
-):
-    """Delete a job post (admin only)"""
-    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+) -> Dict[str, Any]:
+    """Schedule a job post, with its applications and reviews, for deletion (admin only)"""
+    job = crud.get_job_by_id(db, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    db.delete(job)
-    db.commit()
-    return {"message": "Job deleted successfully"}
+    purge_job = purge.request_purge(db, "job", job.id, requested_by=current_user.id)
+    return {"message": "Job scheduled for deletion", "purge_id": str(purge_job.id), "status": purge_job.status}
+
+@router.get("/purges/{purge_id}", response_model=schemas.PurgeJob)
+def get_purge_status(
+    purge_id: str,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_role("admin"))
+):
+    """Progress of a scheduled deletion"""
+    job = crud.get_purge_job(db, purge_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge not found")
+    return job
+
+@router.get("/audit-events", response_model=List[schemas.AuditEvent])
+def get_audit_events(
+    response: Response,
+    entity_type: Optional[str] = Query(None),
+    entity_id: Optional[uuid.UUID] = Query(None),
+    actor_id: Optional[uuid.UUID] = Query(None),
+    action: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.require_role("admin"))
+):
+    """Status and role change history, newest first. Events are written in batches, so the last second or so may be missing."""
+    before = decode_time_cursor(cursor) if cursor else None
+    events = crud.get_audit_events(db, entity_type=entity_type, entity_id=entity_id, actor_id=actor_id,
+                                   action=action, limit=limit, before=before)
+    if len(events) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(events[limit - 1].occurred_at, events[limit - 1].id)
+    return events[:limit]
 
 @router.put("/jobs/{job_id}/status")
 def update_job_status_admin(
@@ -106,7 +218,16 @@ def update_job_status_admin(
     if new_status not in ["open", "in_progress", "completed"]:
         raise HTTPException(status_code=400, detail="Invalid status")
     
+    old_status = job.status
     setattr(job, 'status', new_status)
     db.commit()
+    audit.record(current_user.id, "job.status", "job", job.id, old_status, new_status)
     db.refresh(job)
-    return {"message": "Job status updated", "job": job}
+    return {"message": "Job status updated", "job": schemas.Job.model_validate(job)}
+
+@router.get("/cache-stats")
+def get_cache_stats(
+    current_user: models.User = Depends(auth.require_role("admin"))
+) -> Dict[str, Dict[str, float]]:
+    """Entity cache hits, misses and hit rate per table for this worker"""
+    return cache.entities.report()
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Dict, Any
-from .. import crud, models, schemas, auth, database
+from .. import crud, models, schemas, auth, database, blobstore, audit
 
 router = APIRouter()
 
@@ -26,7 +28,7 @@ def create_application(
 
 @router.get("/my", response_model=List[schemas.Application])
 def get_my_applications(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     return crud.get_applications_for_user(db, user_id=str(current_user.id))
@@ -34,14 +36,17 @@ def get_my_applications(
 @router.get("/job/{job_id}")
 def get_applications_for_job(
     job_id: str,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ) -> List[Dict[str, Any]]:
     job = crud.get_job_by_id(db, job_id=job_id)
+    archived = job is None
+    if archived:
+        job = crud.get_archived_job(db, job_id=job_id)
     if job is None or str(job.posted_by) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    applications = crud.get_applications_for_job(db, job_id=job_id)
+    applications = crud.get_applications_for_job(db, job_id=job_id, archived=archived)
     # Add applicant details to each application
     result: List[Dict[str, Any]] = []
     for app in applications:
@@ -51,7 +56,8 @@ def get_applications_for_job(
             "job_id": str(app.job_id),
             "applicant_id": str(app.applicant_id),
             "status": app.status,
-            "submitted_work": app.submitted_work,
+            "submission_size": app.submission_size,
+            "submission_content_type": app.submission_content_type,
             "created_at": app.created_at.isoformat(),
             "applicant": {
                 "id": str(applicant.id),
@@ -82,12 +88,75 @@ def update_application_status(
         raise HTTPException(status_code=404, detail="Job not found")
     if str(job.posted_by) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
-    return crud.update_application_status(db, application_id=application_id, status=status)
+    old_status, application_uuid = application.status, application.id
+    updated = crud.update_application_status(db, application_id=application_id, status=status)
+    audit.record(current_user.id, "application.status", "application", application_uuid, old_status, status)
+    return updated
 
 @router.get("/earnings/my")
 def get_my_earnings(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ) -> Dict[str, Any]:
     """Get total credits and cash earned by the current doer"""
-    return crud.get_doer_earnings(db, doer_id=str(current_user.id))
\ No newline at end of file
+    return crud.get_doer_earnings(db, doer_id=str(current_user.id))
+
+@router.put("/{application_id}/submission", response_model=schemas.Application)
+async def upload_submission(
+    application_id: str,
+    request: Request,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Stream the request body into the blob store as this application's submitted work"""
+    # Async to read the body as it arrives; the database work goes to the threadpool like a sync route's
+    application = await run_in_threadpool(crud.get_application_by_id, db, application_id=application_id)
+    if application is None:
+        raise HTTPException(status_code=404, detail="Application not found")
+    if str(application.applicant_id) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    blob = await blobstore.store.write_stream(request.stream())
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    return await run_in_threadpool(
+        crud.set_application_submission, db, application, ref=blob.ref, size=blob.size, content_type=content_type
+    )
+
+@router.get("/{application_id}/submission")
+def download_submission(
+    application_id: str,
+    request: Request,
+    # The primary, not a replica: legacy submissions are moved to the blob store on first download
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+) -> StreamingResponse:
+    """Stream submitted work; supports single "Range: bytes=" requests"""
+    application = (crud.get_application_by_id(db, application_id=application_id)
+                   or crud.get_application_by_id(db, application_id=application_id, archived=True))
+    if application is None:
+        raise HTTPException(status_code=404, detail="Application not found")
+    if str(application.applicant_id) != str(current_user.id) and str(current_user.role) != "admin":
+        job = crud.get_job_by_id(db, job_id=str(application.job_id)) or crud.get_archived_job(db, job_id=str(application.job_id))
+        if job is None or str(job.posted_by) != str(current_user.id):
+            raise HTTPException(status_code=403, detail="Not authorized")
+    ref, size = application.submission_ref, int(application.submission_size or 0)
+    content_type = str(application.submission_content_type or "application/octet-stream")
+    if ref is None:
+        if application.submitted_work is None:
+            raise HTTPException(status_code=404, detail="No submission")
+        # Legacy inline submission not yet moved to the blob store; stream what was just written
+        blob = blobstore.store.write_bytes(str(application.submitted_work).encode())
+        ref, size, content_type = blob.ref, blob.size, "text/plain; charset=utf-8"
+        crud.set_application_submission(db, application, ref=ref, size=size, content_type=content_type)
+
+    headers = {"Accept-Ranges": "bytes"}
+    byte_range = blobstore.parse_range(request.headers.get("range"), size)
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        blobstore.store.iter_range(str(ref), start, end),
+        status_code=206 if byte_range else 200,
+        media_type=content_type,
+        headers=headers,
+    )
@@ -1,19 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from typing import Optional
 from .. import crud, models, schemas, auth, database
 
 router = APIRouter()
 
+# Postgres' default names for the UNIQUE columns of users, in schema.sql and create_all alike
+DUPLICATE_USER_CONSTRAINTS = {"users_username_key": "Username", "users_email_key": "Email"}
+# SQLite names the column instead: "UNIQUE constraint failed: users.username"
+DUPLICATE_USER_COLUMNS = {"users.username": "Username", "users.email": "Email"}
+
+def duplicate_user_field(error: IntegrityError) -> Optional[str]:
+    """Which unique field of users a failed insert collided on, or None for any other integrity error"""
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return DUPLICATE_USER_CONSTRAINTS.get(diag.constraint_name or "")
+    message = str(error.orig)
+    if message.startswith("UNIQUE constraint failed: "):
+        return DUPLICATE_USER_COLUMNS.get(message[len("UNIQUE constraint failed: "):].strip())
+    return None
+
 @router.post("/signup", response_model=schemas.User)
 def signup(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = crud.get_user_by_username(db, username=user.username)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    try:
+        return crud.create_user(db=db, user=user)
+    except IntegrityError as error:
+        field = duplicate_user_field(error)
+        if field is None:
+            raise  # not a duplicate account: a real error, not the caller's fault
+        raise HTTPException(status_code=400, detail=f"{field} already registered")
 
 @router.post("/login", response_model=schemas.Token)
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
@@ -24,8 +41,14 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return auth.issue_tokens(db, user)
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh(body: schemas.RefreshRequest, db: Session = Depends(database.get_db)):
+    """Trade a refresh token for a new access token and a new refresh token"""
+    user, refresh_token = auth.rotate_refresh_token(db, body.refresh_token)
     access_token = auth.create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.get("/user", response_model=schemas.User)
 def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
@@ -47,9 +70,10 @@ def promote_user(
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Update role
+    # Update role; sessions issued under the old role must log in again
     target_user.role = update_data.role
     db.commit()
+    auth.revoke_refresh_tokens(db, user_id=target_user.id)
     db.refresh(target_user)
     
     return target_user
\ No newline at end of file
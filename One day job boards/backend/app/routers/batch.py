@@ -0,0 +1,140 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Scope
+from typing import Any, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+from .. import schemas, auth, database
+
+router = APIRouter()
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+# Sub-requests of one batch running at once, each on its own session and pooled connection
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+# Mutations a batch may carry, as "METHOD /route/template"; everything else must be GET
+BATCH_ALLOWED_MUTATIONS: Set[Tuple[str, str]] = {
+    (method.upper(), path)
+    for method, _, path in (
+        entry.strip().partition(" ")
+        for entry in os.getenv("BATCH_ALLOWED_MUTATIONS", "PUT /applications/{application_id}/status").split(",")
+        if entry.strip()
+    )
+}
+# Headers forwarded from the batch to every sub-request
+FORWARDED_HEADERS = (b"authorization", b"host", b"user-agent", b"accept-language", b"cookie")
+
+def _route_template(app: Any, scope: Scope) -> Optional[str]:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+    return None
+
+def _sub_scope(parent: Scope, sub: schemas.SubRequest, batch: database.BatchScope, body: bytes) -> Scope:
+    path, _, query = sub.path.partition("?")
+    headers = [(name, value) for name, value in parent["headers"] if name in FORWARDED_HEADERS]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "scheme": parent["scheme"],
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "method": sub.method.upper(),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "state": dict(parent.get("state", {})),
+        "batch": batch,
+    }
+
+async def _dispatch(app: ASGIApp, scope: Scope, body: bytes) -> Tuple[int, Optional[Any]]:
+    """Run one sub-request through the full application and collect its response"""
+    status: Optional[int] = None
+    content_type = ""
+    chunks: List[bytes] = []
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Streaming responses watch for a disconnect; only report one once the response is done
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"").decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        if status is None:
+            status = 500
+    finally:
+        finished.set()
+    payload = b"".join(chunks)
+    if not payload:
+        return status or 500, None
+    if content_type.startswith("application/json"):
+        return status or 500, json.loads(payload)
+    return status or 500, payload.decode("utf-8", errors="replace")
+
+def _authenticate(db: Session, token: str) -> Any:
+    """The batch's user, detached so sub-requests can merge it, with this session's connection released"""
+    user = auth.user_from_token(db, token)
+    db.expunge(user)
+    db.commit()
+    return user
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def run_batch(
+    batch_request: schemas.BatchRequest,
+    request: Request,
+    db: Session = Depends(database.get_db)
+) -> schemas.BatchResponse:
+    """
+    Run several API calls in one round trip. The caller is authenticated once;
+    sub-requests then run BATCH_CONCURRENCY at a time, each with its own
+    database session. Sub-requests are GETs or allow-listed mutations; each
+    commits on its own, so a batch is not a transaction.
+    """
+    if len(batch_request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} sub-requests per batch")
+    batch = database.BatchScope()
+    scheme, token = get_authorization_scheme_param(request.headers.get("authorization"))
+    if scheme.lower() == "bearer" and token:
+        batch.user = await run_in_threadpool(_authenticate, db, token)
+    # Waiting happens here, on the event loop, never in a threadpool thread
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(sub: schemas.SubRequest) -> schemas.SubResponse:
+        if not sub.path.startswith("/") or sub.path.startswith("/batch"):
+            return schemas.SubResponse(id=sub.id, status=400, body={"detail": "Invalid sub-request path"})
+        body = json.dumps(sub.body).encode() if sub.body is not None else b""
+        scope = _sub_scope(request.scope, sub, batch, body)
+        if scope["method"] != "GET" and (scope["method"], _route_template(request.app, scope)) not in BATCH_ALLOWED_MUTATIONS:
+            return schemas.SubResponse(id=sub.id, status=405, body={"detail": "Method not allowed in a batch"})
+        async with slots:
+            status, payload = await _dispatch(request.app, scope, body)
+        return schemas.SubResponse(id=sub.id, status=status, body=payload)
+
+    responses = await asyncio.gather(*(run(sub) for sub in batch_request.requests))
+    return schemas.BatchResponse(responses=list(responses))
@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas, auth, database
+from typing import Any, Dict, List, Optional
+from .. import crud, models, schemas, auth, database, fastpath, catalog
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.CaseStudy])
-def read_case_studies(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    case_studies = crud.get_case_studies(db, skip=skip, limit=limit)
-    return case_studies
+def read_case_studies(
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = Query(None),
+    difficulty_level: Optional[str] = Query(None),
+    tag: List[str] = Query([], description="Repeat to require several tags"),
+    max_time_to_deliver: Optional[int] = Query(None, description="In minutes"),
+    sort: str = Query("newest", pattern="^(newest|quickest|title)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    db: Session = Depends(database.get_read_db)
+):
+    filters: Dict[str, Any] = dict(
+        skip=skip, limit=limit, category=category, difficulty_level=difficulty_level,
+        tags=tag, max_time_to_deliver=max_time_to_deliver, sort=sort,
+    )
+    view = fastpath.list_view(schemas.CaseStudy, fields)
+    if view is not None:
+        rows = crud.get_case_studies(db, columns=fastpath.columns_for(models.CaseStudy, view), **filters)
+        return fastpath.render_rows(view, rows)
+    return catalog.case_studies.search(db, **filters)
 
 @router.post("/", response_model=schemas.CaseStudy)
 def create_case_study(
@@ -19,7 +36,7 @@ def create_case_study(
     return crud.create_case_study(db=db, case_study=case_study)
 
 @router.get("/{case_study_id}", response_model=schemas.CaseStudy)
-def read_case_study(case_study_id: str, db: Session = Depends(database.get_db)):
+def read_case_study(case_study_id: str, db: Session = Depends(database.get_read_db)):
     db_case_study = crud.get_case_study_by_id(db, case_study_id=case_study_id)
     if db_case_study is None:
         raise HTTPException(status_code=404, detail="Case study not found")
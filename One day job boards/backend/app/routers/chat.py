@@ -1,10 +1,16 @@
 import os
-from typing import List, Literal, cast, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from openai import OpenAI
-from openai.types.chat import ChatCompletionMessageParam
-import httpx
+import re
+from dataclasses import dataclass, field
+from typing import List, Literal, Tuple, Optional, Dict
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy.orm import Session
+from .. import admission, chat_providers, chat_sessions, database, search
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant for One-Day Job Board."
+# Listings from the search index added to provider prompts
+CHAT_GROUNDING_RESULTS = int(os.getenv("CHAT_GROUNDING_RESULTS", 3))
+CHAT_SEARCH_RESULTS = 5
 
 # Request/response schemas
 class ChatMessage(BaseModel):
@@ -12,101 +18,139 @@ class ChatMessage(BaseModel):
     content: str = Field(..., description="Message content")
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
+    session_id: Optional[str] = Field(None, description="From the previous reply; omit to start a conversation")
+    message: Optional[str] = Field(None, description="The new user message")
+    messages: Optional[List[ChatMessage]] = Field(None, description="Deprecated: the whole conversation, without a session")
+
+    @model_validator(mode="after")
+    def check_message(self) -> "ChatRequest":
+        if self.message is None and self.messages is None:
+            raise ValueError("Either message or messages is required")
+        return self
 
 class ChatResponse(BaseModel):
     reply: str
+    session_id: Optional[str] = None
 
 router = APIRouter()
 
-# Initialize OpenAI client lazily
-_openai_client: OpenAI | None = None
+def summarize_with_model(previous: str, dropped: List[chat_sessions.Message]) -> str:
+    """CHAT_SUMMARIZE=model: have the chat providers fold old turns into the running summary"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in dropped)
+    prompt: List[chat_sessions.Message] = [
+        {"role": "system", "content": "Update the summary of this support conversation in at most three sentences."},
+        {"role": "user", "content": f"Summary so far:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+    ]
+    # Same deadline, lane limits and hedging as replies; the request's own time left bounds it
+    budget = admission.remaining()
+    summary = chat_providers.complete(prompt, budget) if budget is None or budget > 0 else None
+    return summary or chat_sessions.extractive_summary(previous, dropped)
 
-def get_client() -> OpenAI:
-    global _openai_client
-    if _openai_client:
-        return _openai_client
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not configured on the server")
-    _openai_client = OpenAI(api_key=api_key)
-    return _openai_client
+@dataclass
+class SearchIntent:
+    kind: str  # 'job' or 'case_study'
+    query: str
+    filters: Dict[str, str] = field(default_factory=dict)
 
-@router.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest) -> ChatResponse:
-    # First, try OpenAI
-    try:
-        client = get_client()
-        messages_param: List[ChatCompletionMessageParam] = cast(
-            List[ChatCompletionMessageParam],
-            [{"role": msg.role, "content": msg.content} for msg in request.messages][-20:]
-        )
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages_param,
-            temperature=0.6,
-            max_tokens=256,
-        )
-        reply = completion.choices[0].message.content if completion.choices else None
-        if reply:
-            return ChatResponse(reply=reply)
-    except Exception:
-        # Continue to fallbacks on provider error (e.g., 429 insufficient quota)
-        pass
+_SEARCH_VERB = re.compile(r"\b(find|search|show|list|browse|looking for|look for|recommend|suggest|are there|is there|got any)\b")
+_SEARCH_SUBJECT = re.compile(r"\b(jobs?|gigs?|tasks?|case stud(y|ies)|examples?)\b")
+# "my job", "our latest task": things the user already has, not something to search for
+_OWNED_SUBJECT = re.compile(r"\b(my|our)\s+(\w+\s+)?(jobs?|gigs?|tasks?|case stud(y|ies)|examples?)\b")
+_HOW_TO = re.compile(r"^\W*(how|why|what is|what's|can i|should i)\b")
+# Words that say a search is wanted but not what to search for
+_GENERIC_TERMS = set(search.tokenize(
+    "find search list browse looking look recommend suggest got job gig task work case study example open available "
+    "new please where anything something"
+))
+
+def classify(db: Session, message: str) -> Optional[SearchIntent]:
+    """
+    A search to answer from the index, or None for anything the model should
+    handle. A search names what to look for (jobs, case studies) and either
+    asks for it with a search verb or narrows it with a known filter.
+    """
+    lower = message.lower()
+    if _HOW_TO.search(lower) or not _SEARCH_SUBJECT.search(_OWNED_SUBJECT.sub(" ", lower)):
+        return None
+    kind = "case_study" if re.search(r"\bcase stud|\bexamples?\b", lower) else "job"
+    filters: Dict[str, str] = {}
+    filter_terms = set()
+    attr = "category" if kind == "case_study" else "department"
+    for value in search.index.values(db, attr):
+        if re.search(rf"\b{re.escape(value)}\b", lower):
+            filters[attr] = value
+            filter_terms.update(search.tokenize(value))
+            break
+    reward_type = re.search(r"\b(cash|credits?)\b", lower)
+    if kind == "job" and reward_type:
+        filters["reward_type"] = "cash" if reward_type.group(1) == "cash" else "credits"
+        filter_terms.update(search.tokenize(reward_type.group(1)))
+    if not (filters or _SEARCH_VERB.search(lower)):
+        return None
+    terms = [t for t in search.tokenize(message) if t not in _GENERIC_TERMS and t not in filter_terms]
+    if not terms and not filters:
+        return None
+    return SearchIntent(kind, " ".join(terms), filters)
+
+def answer_search(intent: SearchIntent, hits: List[Tuple[float, search.Document]]) -> str:
+    label = "case studies" if intent.kind == "case_study" else "open jobs"
+    if not hits:
+        return f"I couldn't find any {label} matching that right now. Try different keywords, or browse the full list with filters."
+    lines = [f"Here are {label} that match:"]
+    lines += [f"- {doc.title} ({doc.details}): {doc.url}" for _, doc in hits]
+    return "\n".join(lines)
 
-    # Fallback 1: Hugging Face Inference API if configured
-    hf_key = os.getenv("HUGGINGFACE_API_KEY")
-    if hf_key:
-        try:
-            # Build a simple prompt from messages
-            prompt_parts: List[str] = []
-            system = next((m.content for m in request.messages if m.role == "system"), "You are a helpful assistant for One-Day Job Board.")
-            prompt_parts.append(system)
-            for m in request.messages[-10:]:
-                role = "User" if m.role == "user" else "Assistant"
-                prompt_parts.append(f"{role}: {m.content}")
-            prompt_parts.append("Assistant:")
-            prompt = "\n".join(prompt_parts)
+def grounding(db: Session, text: str) -> List[chat_sessions.Message]:
+    """A system message listing the indexed jobs and case studies most relevant to text, if any"""
+    if CHAT_GROUNDING_RESULTS <= 0:
+        return []
+    hits = search.index.search(db, text, limit=CHAT_GROUNDING_RESULTS)
+    if not hits:
+        return []
+    listings = "\n".join(f"- {doc.title} ({doc.details}): {doc.url}" for _, doc in hits)
+    return [{"role": "system", "content": "Listings on the board that may be relevant; link to them rather than inventing others:\n" + listings}]
+
+@router.post("/chat", response_model=ChatResponse)
+def chat(request: ChatRequest, db: Session = Depends(database.get_read_db)) -> ChatResponse:
+    """
+    Reply to the next message of a conversation kept on the server. Send the
+    session_id from the previous reply with each new message; an unknown or
+    expired id starts a new conversation under a new id. Searches for jobs
+    and case studies are answered from the local index without a model call.
+    """
+    session_id: Optional[str] = None
+    if request.message is None:
+        # Legacy clients resend the whole conversation; trim it to the same budget
+        history = [{"role": m.role, "content": m.content} for m in request.messages or [] if m.role != "system"]
+        system = next((m.content for m in request.messages or [] if m.role == "system"), DEFAULT_SYSTEM_PROMPT)
+        session = chat_sessions.ChatSession(history)
+    else:
+        session_id, session = chat_sessions.load(request.session_id)
+        session.messages.append({"role": "user", "content": request.message})
+        system = DEFAULT_SYSTEM_PROMPT
+    text = next((m["content"] for m in reversed(session.messages) if m["role"] == "user"), "")
+    intent = classify(db, text)
+    if intent is not None:
+        hits = search.index.search(db, intent.query, intent.kind, intent.filters, limit=CHAT_SEARCH_RESULTS)
+        reply = answer_search(intent, hits)
+    else:
+        prompt = chat_sessions.build_prompt(session, system)
+        prompt[1:1] = grounding(db, text)
+        reply = generate_reply(prompt)
+    if session_id is not None:
+        summarize = summarize_with_model if chat_sessions.CHAT_SUMMARIZE == "model" else None
+        chat_sessions.save_turn(session_id, session, reply, summarize)
+    return ChatResponse(reply=reply, session_id=session_id)
 
-            model_id = os.getenv("HF_MODEL_ID", "meta-llama/Llama-3.1-8B-Instruct")
-            headers: Dict[str, str] = {"Authorization": f"Bearer {hf_key}", "Content-Type": "application/json"}
-            payload: Dict[str, Any] = {"inputs": prompt, "parameters": {"max_new_tokens": 256, "temperature": 0.6}}
-            with httpx.Client(timeout=30.0) as client_http:
-                resp = client_http.post(f"https://api-inference.huggingface.co/models/{model_id}", headers=headers, json=payload)
-            if resp.status_code == 200:
-                raw: Any = resp.json()
-                # Responses can be a list with generated_text or a dict
-                reply_text: Optional[str] = None
-                if isinstance(raw, list) and raw:
-                    first_dict: Dict[str, Any] = cast(Dict[str, Any], raw[0])
-                    gt = first_dict.get("generated_text")
-                    st = first_dict.get("summary_text")
-                    if isinstance(gt, str):
-                        reply_text = gt
-                    elif isinstance(st, str):
-                        reply_text = st
-                elif isinstance(raw, dict):
-                    raw_dict: Dict[str, Any] = cast(Dict[str, Any], raw)
-                    gt = raw_dict.get("generated_text")
-                    st = raw_dict.get("summary_text")
-                    if isinstance(gt, str):
-                        reply_text = gt
-                    elif isinstance(st, str):
-                        reply_text = st
-                if isinstance(reply_text, str) and reply_text:
-                    # Extract only the assistant portion if the model echoes prompt
-                    reply_value: str = (
-                        reply_text.split("Assistant:")[-1].strip()
-                        if "Assistant:" in reply_text
-                        else reply_text.strip()
-                    )
-                    return ChatResponse(reply=reply_value)
-        except Exception:
-            # Ignore and continue to local fallback
-            pass
+def generate_reply(prompt: List[chat_sessions.Message]) -> str:
+    """The first reply from the configured providers, else a canned one so the chat always answers"""
+    budget = admission.remaining()
+    if budget is not None and budget <= 0:
+        return canned_reply(prompt)
+    return chat_providers.complete(prompt, budget) or canned_reply(prompt)
 
-    # Fallback 2: Local canned replies to ensure the chat always responds
-    user_last = next((m.content for m in reversed(request.messages) if m.role == "user"), "")
+def canned_reply(prompt: List[chat_sessions.Message]) -> str:
+    user_last = next((m["content"] for m in reversed(prompt) if m["role"] == "user"), "")
     lower = user_last.lower()
     if any(k in lower for k in ["apply", "application", "how to apply"]):
         reply = "To apply: open a job, click Apply, and submit your work when accepted. You can track status in your Doer Dashboard."
@@ -118,4 +162,4 @@ def chat(request: ChatRequest) -> ChatResponse:
         reply = "For support, use this chat or email the site admin. Admins can manage users and jobs in the Admin Dashboard."
     else:
         reply = "I’m here to help with browsing jobs, applying, and navigating dashboards. Ask me about applying, finding jobs, or managing your account."
-    return ChatResponse(reply=reply)
+    return reply
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import crud, models, schemas, auth, database
+from ..pagination import encode_cursor, decode_time_cursor
+
+router = APIRouter()
+
+@router.get("/poster", response_model=schemas.PosterDashboard)
+def get_poster_dashboard(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(database.get_read_db),
+    current_user: models.User = Depends(auth.require_role("poster"))
+):
+    """The current poster's jobs with application counts, newest applicant and review stats"""
+    after = decode_time_cursor(cursor) if cursor else None
+    rows = crud.get_poster_dashboard(db, poster_id=current_user.id, limit=limit, after=after)
+    items = []
+    for row in rows[:limit]:
+        items.append(schemas.PosterDashboardJob(
+            job=schemas.Job.model_validate(row),
+            applications=schemas.ApplicationCounts(
+                total=row.applications_total or 0,
+                **{status: getattr(row, f"applications_{status}") or 0 for status in crud.APPLICATION_STATUSES},
+            ),
+            newest_applicant=schemas.NewestApplicant(
+                id=row.newest_applicant_id,
+                username=row.newest_applicant_username,
+                applied_at=row.newest_applied_at,
+            ) if row.newest_applicant_id else None,
+            reviews=schemas.ReviewStats(
+                count=row.review_count or 0,
+                average_rating=round(float(row.average_rating), 2) if row.average_rating is not None else None,
+            ),
+        ))
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return schemas.PosterDashboard(items=items, next_cursor=next_cursor)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from .. import crud, models, schemas, auth, database
+from .. import crud, models, schemas, auth, database, fastpath
 
 router = APIRouter()
 
@@ -11,10 +11,23 @@ def read_jobs(
     limit: int = 100,
     department: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(database.get_db)
+    reward_type: Optional[str] = Query(None, pattern="^(credits|cash)$"),
+    min_reward: Optional[float] = Query(None, ge=0),
+    max_reward: Optional[float] = Query(None, ge=0),
+    max_estimated_minutes: Optional[int] = Query(None, ge=0, description="Only jobs estimated to take at most this long"),
+    sort: str = Query("newest", pattern="^(newest|reward|featured)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    db: Session = Depends(database.get_read_db)
 ):
-    jobs = crud.get_jobs(db, skip=skip, limit=limit, department=department, status=status)
-    return jobs
+    filters: Dict[str, Any] = dict(
+        skip=skip, limit=limit, department=department, status=status, reward_type=reward_type,
+        min_reward=min_reward, max_reward=max_reward, max_estimated_minutes=max_estimated_minutes, sort=sort,
+    )
+    view = fastpath.list_view(schemas.Job, fields)
+    if view is not None:
+        rows = crud.get_jobs(db, columns=fastpath.columns_for(models.Job, view), **filters)
+        return fastpath.render_rows(view, rows)
+    return crud.get_jobs(db, **filters)
 
 @router.post("/", response_model=schemas.Job)
 def create_job(
@@ -29,7 +42,7 @@ def get_my_jobs(
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = Query(None),
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """Get all jobs posted by the current user"""
@@ -39,8 +52,8 @@ def get_my_jobs(
     return query.offset(skip).limit(limit).all()
 
 @router.get("/{job_id}", response_model=schemas.Job)
-def read_job(job_id: str, db: Session = Depends(database.get_db)):
-    db_job = crud.get_job_by_id(db, job_id=job_id)
+def read_job(job_id: str, db: Session = Depends(database.get_read_db)):
+    db_job = crud.get_job_by_id(db, job_id=job_id) or crud.get_archived_job(db, job_id=job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     return db_job
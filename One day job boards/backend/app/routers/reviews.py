@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import crud, models, schemas, auth, database
+from .. import crud, models, schemas, auth, database, fastpath
 
 router = APIRouter()
 
@@ -10,8 +10,13 @@ def read_reviews(
     skip: int = 0,
     limit: int = 100,
     job_id: Optional[str] = Query(None),
-    db: Session = Depends(database.get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    db: Session = Depends(database.get_read_db)
 ):
+    view = fastpath.list_view(schemas.Review, fields)
+    if view is not None:
+        rows = crud.get_reviews(db, skip=skip, limit=limit, job_id=job_id, columns=fastpath.columns_for(models.Review, view))
+        return fastpath.render_rows(view, rows)
     reviews = crud.get_reviews(db, skip=skip, limit=limit, job_id=job_id)
     return reviews
 
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Request
+from typing import Dict
+from .. import models, auth, media
+
+router = APIRouter()
+
+@router.post("/images", status_code=201)
+async def upload_image(
+    request: Request,
+    current_user: models.User = Depends(auth.get_current_active_user)
+) -> Dict[str, str]:
+    """
+    Upload an image as the raw request body. The original is stored under its
+    content hash; thumbnail and web variants are generated in the background,
+    and their URLs fall back to the original until they have been written.
+    """
+    name = await media.save_upload(request)
+    media.generate_variants(name)
+    url = media.image_url(name)
+    return {
+        "url": url,
+        "web_url": media.ready_variant_url(url, "web"),
+        "thumbnail_url": media.ready_variant_url(url, "thumb"),
+    }
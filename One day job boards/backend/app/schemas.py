@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional, List, Literal
+from pydantic import BaseModel, EmailStr, ConfigDict, computed_field
+from typing import Any, ClassVar, Dict, Optional, List, Literal, Tuple
 from uuid import UUID
 from datetime import datetime
+from . import media
 
 # User schemas
 class UserBase(BaseModel):
@@ -39,9 +40,17 @@ class Job(JobBase):
     slug: str
     posted_by: UUID
     status: str
+    estimated_minutes: Optional[int] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+    # Stored fields each computed field reads, for ?fields= to load
+    computed_sources: ClassVar[Dict[str, Tuple[str, ...]]] = {"thumbnail_url": ("image_url",)}
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return media.thumbnail_url(self.image_url)
 
 # Case Study schemas
 class CaseStudyBase(BaseModel):
@@ -62,6 +71,13 @@ class CaseStudy(CaseStudyBase):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+    # Stored fields each computed field reads, for ?fields= to load
+    computed_sources: ClassVar[Dict[str, Tuple[str, ...]]] = {"thumbnail_url": ("image_url",)}
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return media.thumbnail_url(self.image_url)
 
 # Review schemas
 class ReviewBase(BaseModel):
@@ -81,7 +97,9 @@ class Review(ReviewBase):
 
 # Application schemas
 class ApplicationBase(BaseModel):
-    submitted_work: Optional[str] = None
+    # Submission content is streamed from /applications/{id}/submission
+    submission_size: Optional[int] = None
+    submission_content_type: Optional[str] = None
 
 class ApplicationCreate(BaseModel):
     job_id: UUID
@@ -99,10 +117,96 @@ class Application(ApplicationBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
 
 class UpdateUserRole(BaseModel):
     username: str
-    role: Literal['poster', 'doer', 'admin']
\ No newline at end of file
+    role: Literal['poster', 'doer', 'admin']
+
+# Admin schemas
+class BulkUserCreate(BaseModel):
+    users: List[UserCreate]
+
+class SkippedUser(BaseModel):
+    username: str
+    email: str
+    reason: str
+
+class BulkProvisionResult(BaseModel):
+    created: List[str]
+    skipped: List[SkippedUser]
+
+class PurgeJob(BaseModel):
+    id: UUID
+    target_type: Literal['user', 'job']
+    target_id: UUID
+    status: Literal['pending', 'running', 'completed', 'failed']
+    progress: Optional[Dict[str, int]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class AuditEvent(BaseModel):
+    id: UUID
+    occurred_at: datetime
+    actor_id: Optional[UUID] = None
+    action: str
+    entity_type: str
+    entity_id: UUID
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Batch schemas
+class SubRequest(BaseModel):
+    id: Optional[str] = None  # echoed back so callers can match responses
+    method: str = "GET"
+    path: str  # may include a query string
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+class SubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[SubResponse]
+
+# Dashboard schemas
+class ApplicationCounts(BaseModel):
+    total: int = 0
+    pending: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    completed: int = 0
+
+class NewestApplicant(BaseModel):
+    id: UUID
+    username: Optional[str] = None
+    applied_at: Optional[datetime] = None
+
+class ReviewStats(BaseModel):
+    count: int = 0
+    average_rating: Optional[float] = None
+
+class PosterDashboardJob(BaseModel):
+    job: Job
+    applications: ApplicationCounts
+    newest_applicant: Optional[NewestApplicant] = None
+    reviews: ReviewStats
+
+class PosterDashboard(BaseModel):
+    items: List[PosterDashboardJob]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,263 @@
+"""
+In-memory BM25 index over open jobs and case studies, used by the chat to
+answer search questions without a model call and to ground the prompts it
+does send. Committed ORM writes are applied as they happen; bulk updates and
+other workers' writes are picked up when the copy is rebuilt in the
+background every SEARCH_INDEX_TTL_SECONDS.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import math
+import os
+import re
+import threading
+import time
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_TTL_SECONDS = float(os.getenv("SEARCH_INDEX_TTL_SECONDS", 300))
+# BM25 term saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Repeating a field's tokens weights it without a per-field BM25 variant
+JOB_FIELDS = (("title", 3), ("skills_required", 2), ("department", 2), ("description", 1))
+CASE_STUDY_FIELDS = (("title", 3), ("tags", 2), ("category", 2), ("problem", 1), ("solution", 1))
+
+STOPWORDS = frozenset(
+    "a about an and any are as at be by can do for from have i in is it me my of on or show some that the "
+    "there this to what where which with you your".split()
+)
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+def _stem(token: str) -> str:
+    # Plural folding is enough for titles and skills ("jobs" -> "job", "studies" -> "study")
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall((text or "").lower()) if token not in STOPWORDS]
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+@dataclass
+class Document:
+    kind: str  # 'job' or 'case_study'
+    id: str
+    title: str
+    url: str
+    # Filterable attributes, lowercased: department and reward_type for jobs, category for case studies
+    attrs: Dict[str, str] = field(default_factory=dict)
+    # Shown in answers and prompt context
+    details: str = ""
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.kind, self.id)
+
+def job_document(job: models.Job) -> Document:
+    details = [job.department or "", f"{job.reward:g} {job.reward_type}" if job.reward is not None else ""]
+    if job.estimated_time:
+        details.append(job.estimated_time)
+    return Document(
+        kind="job",
+        id=str(job.id),
+        title=job.title,
+        url=f"/jobs/{job.id}",
+        attrs={"department": (job.department or "").lower(), "reward_type": (job.reward_type or "").lower()},
+        details=", ".join(part for part in details if part),
+    )
+
+def case_study_document(case_study: models.CaseStudy) -> Document:
+    return Document(
+        kind="case_study",
+        id=str(case_study.id),
+        title=case_study.title,
+        url=f"/case_studies/{case_study.id}",
+        attrs={"category": (case_study.category or "").lower()},
+        details=f"{case_study.category}, {case_study.difficulty_level}, {case_study.time_to_deliver} min",
+    )
+
+def _terms(obj: Any, fields: Iterable[Tuple[str, int]]) -> Counter:
+    terms: Counter = Counter()
+    for name, weight in fields:
+        for token in tokenize(_field_text(getattr(obj, name))):
+            terms[token] += weight
+    return terms
+
+def _entry(obj: Any) -> Optional[Tuple[Document, Counter]]:
+    """What to index for obj, or None if it should not be searchable"""
+    if isinstance(obj, models.Job):
+        return (job_document(obj), _terms(obj, JOB_FIELDS)) if obj.status == "open" else None
+    return case_study_document(obj), _terms(obj, CASE_STUDY_FIELDS)
+
+class SearchIndex:
+    """Inverted index of term -> {document: weighted term frequency}, scored with BM25"""
+
+    def __init__(self, ttl: float = SEARCH_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+        self._documents: Dict[Tuple[str, str], Document] = {}
+        self._lengths: Dict[Tuple[str, str], int] = {}
+        self._terms: Dict[Tuple[str, str], Counter] = {}
+        self._postings: Dict[str, Dict[Tuple[str, str], int]] = {}
+        self._total_length = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def refresh(self, db: Session) -> None:
+        entries = [_entry(row) for row in db.query(models.Job).filter(models.Job.status == "open")]
+        entries += [_entry(row) for row in db.query(models.CaseStudy)]
+        with self._lock:
+            self._documents, self._lengths, self._terms, self._postings = {}, {}, {}, {}
+            self._total_length = 0
+            for entry in entries:
+                if entry is not None:
+                    self._add(*entry)
+            self._loaded_at = time.monotonic()
+
+    def apply(self, changes: List[Tuple[Tuple[str, str], Optional[Tuple[Document, Counter]]]]) -> None:
+        """Apply (key, entry) pairs from committed writes; a None entry removes the document"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for key, entry in changes:
+                self._remove(key)
+                if entry is not None:
+                    self._add(*entry)
+
+    def remove(self, kind: str, ids: Iterable[Any]) -> None:
+        """Drop documents changed by bulk statements, which skip the ORM events"""
+        self.apply([((kind, str(id)), None) for id in ids])
+
+    def _add(self, document: Document, terms: Counter) -> None:
+        key = document.key
+        self._documents[key] = document
+        self._terms[key] = terms
+        self._lengths[key] = length = sum(terms.values())
+        self._total_length += length
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[key] = count
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        if self._documents.pop(key, None) is None:
+            return
+        self._total_length -= self._lengths.pop(key)
+        for term in self._terms.pop(key):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+
+    def _ensure_loaded(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            self.refresh(db)
+        elif time.monotonic() - loaded_at > self.ttl:
+            # Serve the current copy while a fresh one is built
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._background_refresh, name="search-refresh", daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        db = SessionLocal()
+        try:
+            self.refresh(db)
+        except Exception:
+            logger.exception("Rebuilding the search index failed")
+        finally:
+            db.close()
+            self._refreshing = False
+
+    def values(self, db: Session, attr: str) -> Set[str]:
+        """Distinct values of a filterable attribute, e.g. every department with open jobs"""
+        self._ensure_loaded(db)
+        with self._lock:
+            return {doc.attrs[attr] for doc in self._documents.values() if doc.attrs.get(attr)}
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        kind: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None,
+        limit: int = 5,
+    ) -> List[Tuple[float, Document]]:
+        """Best matches for query, highest BM25 score first; with no query terms, any filtered match"""
+        self._ensure_loaded(db)
+        terms = set(tokenize(query))
+        wanted = {name: value.lower() for name, value in (filters or {}).items()}
+
+        def matches(document: Document) -> bool:
+            return (kind is None or document.kind == kind) and all(
+                document.attrs.get(name) == value for name, value in wanted.items()
+            )
+
+        with self._lock:
+            count = len(self._documents)
+            if not count:
+                return []
+            if not terms:
+                if not wanted:
+                    return []
+                found = [(0.0, doc) for doc in self._documents.values() if matches(doc)]
+                return sorted(found, key=lambda hit: hit[1].title.lower())[:limit]
+            average = self._total_length / count
+            scores: Dict[Tuple[str, str], float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[key] / average)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            hits = [(score, self._documents[key]) for key, score in scores.items() if matches(self._documents[key])]
+        hits.sort(key=lambda hit: (-hit[0], hit[1].title.lower()))
+        return hits[:limit]
+
+index = SearchIndex()
+
+# Keep the index in step with every committed ORM write, whichever code path made it
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context: Any) -> None:
+    pending: Dict[Tuple[str, str], Any] = session.info.setdefault("search_changes", {})
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, (models.Job, models.CaseStudy)):
+            entry = _entry(obj)
+            key = entry[0].key if entry else ("job", str(obj.id))
+            pending[key] = entry
+    for obj in session.deleted:
+        if isinstance(obj, models.Job):
+            pending[("job", str(obj.id))] = None
+        elif isinstance(obj, models.CaseStudy):
+            pending[("case_study", str(obj.id))] = None
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session: Session) -> None:
+    pending = session.info.pop("search_changes", None)
+    if pending:
+        index.apply(list(pending.items()))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop("search_changes", None)
@@ -0,0 +1,221 @@
+"""
+Pre-fork production server: python -m app.serve
+
+The master imports the app once (unless SERVE_PRELOAD=false), binds the
+listening socket and forks uvicorn workers that share it. Workers drop the
+database pools and HTTP clients they inherited and open their own.
+
+Signals to the master:
+  SIGHUP           replace workers one at a time; each old one finishes its in-flight
+                   requests before its replacement starts, so no more than the planned
+                   number of workers ever hold database pools
+  SIGTERM/SIGINT   graceful shutdown
+With preload on, SIGHUP keeps the preloaded code; turn preload off to pick up
+code changes on reload.
+"""
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+import uvicorn
+
+load_dotenv()
+
+logger = logging.getLogger("app.serve")
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", 8000))
+# 0 sizes the worker count from CPUs and the database connection budget
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", 0))
+SERVE_PRELOAD = os.getenv("SERVE_PRELOAD", "true").lower() in ("1", "true", "yes")
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", 30))
+# Connections kept free for migrations, psql sessions and scripts
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", 5))
+
+APP = "app.main:app"
+
+def connections_per_worker(pool_size: int, max_overflow: int, listener: bool) -> int:
+    """Most primary connections one worker can open: its pool plus the cache LISTEN connection"""
+    return pool_size + max_overflow + (1 if listener else 0)
+
+def worker_count(cpus: int, max_connections: Optional[int], per_worker: int,
+                 reserved: int = DB_RESERVED_CONNECTIONS, requested: int = 0) -> int:
+    """Requested (or 2 x CPUs + 1) workers, capped so every pool fits in max_connections"""
+    workers = requested if requested > 0 else 2 * cpus + 1
+    if max_connections is not None:
+        budget = (max_connections - reserved) // per_worker
+        if budget < 1:
+            raise SystemExit(
+                f"max_connections={max_connections} leaves no room for a worker needing {per_worker} connections; "
+                "lower DB_POOL_SIZE/DB_MAX_OVERFLOW"
+            )
+        if workers > budget:
+            logger.warning("Capping workers at %d to stay within max_connections=%d", budget, max_connections)
+            workers = budget
+    return max(workers, 1)
+
+def database_max_connections(url: str) -> Optional[int]:
+    """Connections available to clients like us, or None when the database has no such limit"""
+    if not url.startswith("postgresql"):
+        return None
+    probe = create_engine(url, poolclass=NullPool)
+    try:
+        with probe.connect() as conn:
+            total = int(conn.execute(text("SHOW max_connections")).scalar_one())
+            superuser = int(conn.execute(text("SHOW superuser_reserved_connections")).scalar_one())
+    finally:
+        probe.dispose()
+    return total - superuser
+
+def plan_workers() -> int:
+    # Read the settings directly: without preload the master must not import app modules,
+    # or reloaded workers would inherit the old code from sys.modules
+    url = os.getenv("DATABASE_URL", "")
+    per_worker = connections_per_worker(
+        int(os.getenv("DB_POOL_SIZE", 5)), int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        listener=url.startswith("postgresql") and os.getenv("CACHE_BACKEND", "memory") != "none",
+    )
+    return worker_count(os.cpu_count() or 1, database_max_connections(url), per_worker, requested=SERVE_WORKERS)
+
+def shared_chat_sessions(port: int) -> str:
+    """A CHAT_SESSION_BACKEND every worker of this server opens, set before any of them import the app"""
+    return f"sqlite:///{os.path.join(tempfile.gettempdir(), f'one-day-job-board-chat-{port}.db')}"
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+class Master:
+    """Keeps the configured number of workers alive on one shared socket"""
+
+    def __init__(self, app: Any, sock: socket.socket, workers: int, graceful_timeout: int = GRACEFUL_TIMEOUT_SECONDS,
+                 settle_seconds: float = 1.0):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        # How long a new worker runs before the next old one is drained during a reload
+        self.settle_seconds = settle_seconds
+        self.children: Dict[int, float] = {}  # pid -> started at
+        self.draining: Dict[int, float] = {}  # pid -> deadline
+        self.replacing: List[int] = []  # old workers still to be replaced by the current reload
+        self._reload = False
+        self._stopping = False
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            code = 0
+            try:
+                config = uvicorn.Config(
+                    self.app, lifespan="on", proxy_headers=True,
+                    timeout_graceful_shutdown=self.graceful_timeout,
+                )
+                uvicorn.Server(config).run(sockets=[self.sock])
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker %d", pid)
+        return pid
+
+    def drain(self, pid: int) -> None:
+        """Ask a worker to stop accepting and finish what it has in flight"""
+        self.children.pop(pid, None)
+        self.draining[pid] = time.monotonic() + self.graceful_timeout + 5
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.draining.pop(pid, None)
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.draining.pop(pid, None)
+            started = self.children.pop(pid, None)
+            if started is not None and not self._stopping:
+                logger.warning("Worker %d exited unexpectedly (status %d)", pid, status)
+                if time.monotonic() - started < 1:
+                    time.sleep(1)  # crashing on boot; do not spin
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now > deadline:
+                logger.warning("Worker %d did not drain in time; killing it", pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    self.draining.pop(pid, None)
+
+    def _on_reload(self, *_: Any) -> None:
+        self._reload = True
+
+    def _on_stop(self, *_: Any) -> None:
+        self._stopping = True
+
+    def step(self) -> None:
+        if self._reload:
+            self._reload = False
+            logger.info("Reloading: replacing %d workers one at a time", len(self.children))
+            self.replacing = list(self.children)
+        newest = max(self.children.values(), default=0.0)
+        if self.replacing and not self.draining and time.monotonic() - newest >= self.settle_seconds:
+            pid = self.replacing.pop(0)
+            if pid in self.children:
+                self.drain(pid)
+        # A draining worker still holds its pool, so it counts until it has exited
+        while len(self.children) + len(self.draining) < self.workers and not self._stopping:
+            self.spawn()
+        self.reap()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        while not self._stopping:
+            self.step()
+            time.sleep(0.2)
+        logger.info("Shutting down %d workers", len(self.children))
+        for pid in list(self.children):
+            self.drain(pid)
+        while self.draining:
+            self.reap()
+            time.sleep(0.2)
+        self.sock.close()
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    app: Any = APP
+    workers = plan_workers()
+    if workers > 1 and "CHAT_SESSION_BACKEND" not in os.environ:
+        # Per-worker memory would restart a conversation whenever a turn lands on another worker
+        os.environ["CHAT_SESSION_BACKEND"] = shared_chat_sessions(SERVE_PORT)
+    if SERVE_PRELOAD:
+        from .main import app  # imported once, shared copy-on-write by every worker
+        from .database import engine
+        engine.dispose()  # the master never serves requests
+    sock = bind_socket(SERVE_HOST, SERVE_PORT)
+    logger.info("Listening on %s:%d with %d workers (preload=%s)", SERVE_HOST, SERVE_PORT, workers, SERVE_PRELOAD)
+    Master(app, sock, workers).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare requests/second of list endpoints with and without the fast serialization path
+Run: python benchmark_list_endpoints.py [--rows 100] [--requests 300]
+
+Seeds rows inside a transaction that is rolled back at the end, so the
+database pointed to by DATABASE_URL is left untouched.
+"""
+
+import argparse
+import time
+import uuid
+from typing import Generator
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import fastpath, models
+from app.database import engine, get_db, SessionLocal
+from app.main import app
+
+def seed(db: Session, rows: int) -> None:
+    poster = models.User(username=f"bench-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@bench.local",
+                         password_hash="x", role="poster", department="Engineering")
+    db.add(poster)
+    db.flush()
+    for i in range(rows):
+        db.add(models.Job(
+            title=f"Benchmark job {i}",
+            slug=f"benchmark-job-{uuid.uuid4().hex}",
+            description="Lorem ipsum dolor sit amet. " * 40,
+            reward=50 + i,
+            reward_type="credits",
+            posted_by=poster.id,
+            department="Engineering",
+            estimated_time="2 hours",
+            skills_required=["Python", "FastAPI", "SQL"],
+            image_url="https://example.com/job.jpg",
+        ))
+    db.flush()
+
+def measure(client: TestClient, path: str, requests: int) -> float:
+    client.get(path)  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return requests / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = SessionLocal(bind=connection)
+    seed(db, args.rows)
+
+    def override_get_db() -> Generator[Session, None, None]:
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    path = f"/jobs/?limit={args.rows}"
+    try:
+        with TestClient(app) as client:
+            fastpath.FAST_LIST_SERIALIZATION = False
+            baseline = measure(client, path, args.requests)
+            fastpath.FAST_LIST_SERIALIZATION = True
+            fast = measure(client, path, args.requests)
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    print(f"GET {path} ({args.requests} requests)")
+    print(f"  ORM + response_model: {baseline:8.1f} req/s")
+    print(f"  rows + orjson:        {fast:8.1f} req/s  ({fast / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script to create many users at once from a CSV file
+Run: python provision_users.py <users.csv>
+
+Columns: username,email,role,department,password
+Rows without a password get a random one, printed at the end.
+"""
+
+import csv
+import secrets
+import sys
+import os
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+# Load environment variables
+load_dotenv()
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+if not DATABASE_URL:
+    print("❌ Error: DATABASE_URL not found in environment variables")
+    sys.exit(1)
+
+from app import schemas, provisioning
+from app.database import SessionLocal
+
+def read_users(path: str):
+    """Parse the CSV; returns valid users, generated passwords and row errors"""
+    users, generated, errors, seen = [], {}, [], set()
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            username = (row.get("username") or "").strip()
+            password = (row.get("password") or "").strip()
+            is_generated = not password
+            if is_generated:
+                password = secrets.token_urlsafe(12)
+            try:
+                users.append(schemas.UserCreate(
+                    username=username,
+                    email=(row.get("email") or "").strip(),
+                    role=(row.get("role") or "doer").strip(),
+                    department=(row.get("department") or "").strip() or None,
+                    password=password,
+                ))
+            except ValidationError as e:
+                errors.append(f"line {line}: {e.errors()[0]['msg']}")
+                continue
+            # Only the first valid row for a username can be created
+            if is_generated and username not in seen:
+                generated[username] = password
+            seen.add(username)
+    return users, generated, errors
+
+def provision_from_csv(path: str) -> bool:
+    users, generated, errors = read_users(path)
+    for error in errors:
+        print(f"❌ Skipped {error}")
+
+    db = SessionLocal()
+    try:
+        report = provisioning.provision_users(db, users)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+        provisioning.shutdown()
+
+    print(f"✅ Created {len(report.created)} users")
+    for skipped in report.skipped:
+        print(f"⚠️  {skipped.username:20} | {skipped.email:30} | {skipped.reason}")
+    created = set(report.created)
+    new_passwords = [(username, password) for username, password in generated.items() if username in created]
+    if new_passwords:
+        print("\nGenerated passwords (share securely):")
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["username", "password"])
+        writer.writerows(new_passwords)
+    return not errors
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python provision_users.py <users.csv>")
+        print("\nCSV columns: username,email,role,department,password (password optional)")
+        sys.exit(1)
+
+    sys.exit(0 if provision_from_csv(sys.argv[1]) else 1)
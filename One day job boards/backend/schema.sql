@@ -3,6 +3,8 @@
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+-- Trigram indexes for admin user search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Users Table
 CREATE TABLE users (
@@ -12,7 +14,8 @@ CREATE TABLE users (
     password_hash VARCHAR(255) NOT NULL,
     role VARCHAR(20) CHECK (role IN ('poster', 'doer', 'admin')) NOT NULL,
     department VARCHAR(50),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    deactivated_at TIMESTAMP  -- scheduled for purge; sign-in and tokens are refused
 );
 
 -- Jobs Table
@@ -26,8 +29,9 @@ CREATE TABLE jobs (
     posted_by UUID REFERENCES users(id) ON DELETE CASCADE,
     department VARCHAR(50),
     estimated_time VARCHAR(50),
+    estimated_minutes INTEGER,  -- parsed from estimated_time
     skills_required JSONB,
-    status VARCHAR(20) CHECK (status IN ('open', 'in_progress', 'completed')) DEFAULT 'open',
+    status VARCHAR(20) CHECK (status IN ('open', 'in_progress', 'completed', 'expired')) DEFAULT 'open',
     is_featured BOOLEAN DEFAULT FALSE,
     image_url VARCHAR(500),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -63,15 +67,95 @@ CREATE TABLE applications (
     job_id UUID REFERENCES jobs(id) ON DELETE CASCADE,
     applicant_id UUID REFERENCES users(id) ON DELETE CASCADE,
     status VARCHAR(20) DEFAULT 'pending',
-    submitted_work TEXT,
+    submitted_work TEXT,  -- legacy inline submissions
+    submission_ref VARCHAR(64),  -- sha256 of the content in the blob store
+    submission_size BIGINT,
+    submission_content_type VARCHAR(100),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Refresh tokens (opaque; only the sha256 is stored). Rotated on every use;
+-- a family groups the rotations of one login so reuse can revoke them all.
+CREATE TABLE refresh_tokens (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    token_hash VARCHAR(64) UNIQUE NOT NULL,
+    family_id UUID NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Leases for periodic tasks that only one worker should run (app/lifecycle.py)
+CREATE TABLE scheduler_leases (
+    name VARCHAR(50) PRIMARY KEY,
+    holder VARCHAR(100) NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Background purges of a user or job and everything referencing it (app/purge.py)
+CREATE TABLE purge_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    target_type VARCHAR(20) NOT NULL,
+    target_id UUID NOT NULL,
+    requested_by UUID,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress JSON,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Append-only history of status and role changes (app/audit.py); no foreign keys
+CREATE TABLE audit_events (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    occurred_at TIMESTAMP NOT NULL,
+    actor_id UUID,
+    action VARCHAR(50) NOT NULL,
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id UUID NOT NULL,
+    old_value VARCHAR(50),
+    new_value VARCHAR(50)
+);
+
+-- Archive tables for completed jobs (see app/lifecycle.py); no foreign keys
+CREATE TABLE jobs_archive (LIKE jobs INCLUDING DEFAULTS);
+ALTER TABLE jobs_archive ADD PRIMARY KEY (id), ADD COLUMN archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+CREATE TABLE applications_archive (LIKE applications INCLUDING DEFAULTS);
+ALTER TABLE applications_archive ADD PRIMARY KEY (id), ADD COLUMN archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+CREATE TABLE reviews_archive (LIKE reviews INCLUDING DEFAULTS);
+ALTER TABLE reviews_archive ADD PRIMARY KEY (id), ADD COLUMN archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
 -- Indexes for performance
-CREATE INDEX idx_jobs_posted_by ON jobs(posted_by);
-CREATE INDEX idx_jobs_status ON jobs(status);
-CREATE INDEX idx_jobs_department ON jobs(department);
+CREATE INDEX idx_users_role ON users(role);
+CREATE INDEX idx_users_department ON users(department);
+CREATE INDEX idx_users_username_trgm ON users USING gin (username gin_trgm_ops);
+CREATE INDEX idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX idx_jobs_posted_by_created ON jobs(posted_by, created_at, id);
+CREATE INDEX idx_jobs_created ON jobs(created_at, id);
+CREATE INDEX idx_jobs_status_created ON jobs(status, created_at, id);
+CREATE INDEX idx_jobs_status_reward ON jobs(status, reward, id);
+CREATE INDEX idx_jobs_status_reward_type ON jobs(status, reward_type, reward, id);
+CREATE INDEX idx_jobs_status_featured ON jobs(status, is_featured, created_at, id);
+CREATE INDEX idx_jobs_status_minutes ON jobs(status, estimated_minutes, id);
+CREATE INDEX idx_jobs_department_status ON jobs(department, status, created_at, id);
+CREATE INDEX ix_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX ix_refresh_tokens_family_id ON refresh_tokens(family_id);
 CREATE INDEX idx_reviews_user_id ON reviews(user_id);
 CREATE INDEX idx_reviews_job_id ON reviews(job_id);
-CREATE INDEX idx_applications_job_id ON applications(job_id);
-CREATE INDEX idx_applications_applicant_id ON applications(applicant_id);
\ No newline at end of file
+CREATE INDEX idx_applications_job_created ON applications(job_id, created_at);
+CREATE INDEX idx_applications_applicant_id ON applications(applicant_id);
+CREATE INDEX idx_jobs_archive_slug ON jobs_archive(slug);
+CREATE INDEX idx_jobs_archive_posted_by ON jobs_archive(posted_by);
+CREATE INDEX idx_applications_archive_job_id ON applications_archive(job_id);
+CREATE INDEX idx_applications_archive_applicant_id ON applications_archive(applicant_id);
+CREATE INDEX idx_reviews_archive_job_id ON reviews_archive(job_id);
+CREATE INDEX idx_case_studies_category_difficulty ON case_studies(lower(category), lower(difficulty_level), time_to_deliver);
+CREATE INDEX idx_case_studies_difficulty_time ON case_studies(lower(difficulty_level), time_to_deliver);
+CREATE INDEX idx_case_studies_time_to_deliver ON case_studies(time_to_deliver);
+CREATE INDEX idx_case_studies_created_at ON case_studies(created_at);
+CREATE INDEX idx_case_studies_tags ON case_studies USING GIN ((lower(tags::text)::jsonb));
+CREATE INDEX idx_audit_events_occurred ON audit_events(occurred_at, id);
+CREATE INDEX idx_audit_events_entity ON audit_events(entity_type, entity_id, occurred_at);
@@ -1,11 +1,20 @@
 import pytest
 from typing import Any, Dict, Generator
+from fastapi import Request
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+import os
+import tempfile
+
+# Keep uploaded test files out of the source tree
+os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="jobboard-media-"))
+os.environ.setdefault("BLOB_ROOT", tempfile.mkdtemp(prefix="jobboard-blobs-"))
+
 from app.main import app
 from app.database import Base, get_db
-import os
+from app import ratelimit, catalog, cache, search
+from app.routers import batch
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL: str = os.getenv(
@@ -39,13 +48,20 @@ def db() -> Generator[Session, None, None]:
 @pytest.fixture(scope="function")
 def client(db: Session) -> Generator[TestClient, None, None]:
     """Get test client with database session override"""
-    def override_get_db() -> Generator[Session, None, None]:
+    def override_get_db(request: Request) -> Generator[Session, None, None]:
         try:
             yield db
         finally:
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    # Every request shares the one test session, so batch sub-requests must take turns
+    batch.BATCH_CONCURRENCY = 1
+    ratelimit.limiter.backend = ratelimit.MemoryBackend()
+    catalog.case_studies.invalidate()
+    search.index.invalidate()
+    cache.entities.broadcaster = cache.LocalBroadcaster()
+    cache.entities.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
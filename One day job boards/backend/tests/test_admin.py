@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+from app import models, purge, audit, export
+
+def add_users(db: Session) -> None:
+    for name, department in (("alice_ops", "ops"), ("bob_ops", "ops"), ("carol_sales", "sales"), ("dave_100%", "sales")):
+        db.add(models.User(username=name, email=f"{name.replace('%', '')}@corp.example", password_hash="x", role="doer", department=department))
+    db.commit()
+
+def test_user_search_filters_and_keyset_paging(client: TestClient, db: Session, authenticated_admin: Dict[str, Any]) -> None:
+    """Test q matches substrings of username or email, combines with filters, and pages by cursor"""
+    add_users(db)
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+
+    response = client.get("/admin/users?q=_OPS", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [user["username"] for user in response.json()] == ["alice_ops", "bob_ops"]
+    assert int(response.headers["X-Total-Count"]) >= 1
+
+    by_email = client.get("/admin/users?q=corp.example&department=sales", headers=headers).json()
+    assert [user["username"] for user in by_email] == ["carol_sales", "dave_100%"]
+    literal = client.get("/admin/users", params={"q": "100%"}, headers=headers).json()
+    assert [user["username"] for user in literal] == ["dave_100%"]
+
+    first = client.get("/admin/users?q=corp.example&limit=3", headers=headers)
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"/admin/users?q=corp.example&limit=3&cursor={cursor}", headers=headers)
+    assert [user["username"] for user in first.json() + second.json()] == ["alice_ops", "bob_ops", "carol_sales", "dave_100%"]
+    assert "X-Next-Cursor" not in second.headers
+    # A last page that is exactly full does not point at an empty one
+    exact = client.get("/admin/users?q=corp.example&limit=4", headers=headers)
+    assert len(exact.json()) == 4
+    assert "X-Next-Cursor" not in exact.headers
+
+    sparse = client.get(f"/admin/users?q=corp.example&limit=3&fields=email", headers=headers)
+    assert list(sparse.json()[0]) == ["email"]
+    assert sparse.headers["X-Next-Cursor"] == cursor
+
+def test_user_purge_runs_in_batches_and_reports_progress(client: TestClient, db: Session, authenticated_admin: Dict[str, Any], authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test deleting a user returns a handle and the purge removes their jobs and what references them"""
+    monkeypatch.setattr(purge.purger, "submit", lambda purge_id: purge.run_purge(db, purge_id, batch_size=1))
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    job_ids = [client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"] for _ in range(2)]
+    for job_id in job_ids:
+        client.post("/applications/", json={"job_id": job_id}, headers=doer_headers)
+    client.post("/reviews/", json={"rating": 5, "comment": "Great", "job_id": job_ids[0]}, headers=doer_headers)
+    poster = db.query(models.User).filter(models.User.username == authenticated_poster["user"]["username"]).one()
+
+    admin_headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    response = client.delete(f"/admin/users/{poster.id}", headers=admin_headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    purge_id = response.json()["purge_id"]
+
+    job = client.get(f"/admin/purges/{purge_id}", headers=admin_headers).json()
+    assert job["status"] == "completed"
+    assert job["progress"]["applications"] == 2
+    assert job["progress"]["reviews"] == 1
+    assert job["progress"]["jobs"] == 2
+    assert job["progress"]["users"] == 1
+    assert client.get(f"/jobs/{job_ids[0]}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/auth/user", headers=poster_headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_user_purge_signs_out_at_once_and_sweeps_late_writes(client: TestClient, db: Session, authenticated_admin: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test a scheduled user loses access immediately, repeat deletes share one purge, and rows written mid-purge are swept"""
+    submitted = []
+    monkeypatch.setattr(purge.purger, "submit", submitted.append)
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    client.post("/jobs/", json=sample_job_data, headers=poster_headers)
+    poster_id = db.query(models.User).filter(models.User.username == authenticated_poster["user"]["username"]).one().id
+
+    admin_headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    first = client.delete(f"/admin/users/{poster_id}", headers=admin_headers).json()
+    assert client.post("/jobs/", json=sample_job_data, headers=poster_headers).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.delete(f"/admin/users/{poster_id}", headers=admin_headers).json()["purge_id"] == first["purge_id"]
+    assert len(submitted) == 1
+
+    # A request that was already past auth writes a job just after the jobs step drained, then the first run fails
+    delete_batch = purge._delete_batch
+    calls = {"late": 0, "fail": 1}
+
+    def racing_delete_batch(db: Session, model: Any, condition: Any, batch_size: int) -> int:
+        if model is models.User and calls["fail"]:
+            calls["fail"] -= 1
+            raise RuntimeError("lock timeout")
+        deleted = delete_batch(db, model, condition, batch_size)
+        if model is models.Job and not calls["late"]:
+            calls["late"] += 1
+            db.add(models.Job(**sample_job_data, slug="late-write", posted_by=poster_id))
+        return deleted
+
+    monkeypatch.setattr(purge, "_delete_batch", racing_delete_batch)
+    job = purge.run_purge(db, submitted[0])
+    assert job is not None and (job.status, job.attempts) == ("pending", 1)
+    job = purge.run_purge(db, submitted[0])
+    assert job is not None and job.status == "completed"
+    assert job.progress["jobs"] == 2 and job.progress["users"] == 1
+    assert db.query(models.Job).filter(models.Job.posted_by == poster_id).count() == 0
+
+def test_job_purge(client: TestClient, db: Session, authenticated_admin: Dict[str, Any], authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test an admin job deletion is scheduled and removes the job's applications"""
+    submitted = []
+    monkeypatch.setattr(purge.purger, "submit", submitted.append)
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job_id = client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"]
+    client.post("/applications/", json={"job_id": job_id}, headers={"Authorization": f"Bearer {authenticated_doer['token']}"})
+
+    admin_headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    response = client.delete(f"/admin/jobs/{job_id}", headers=admin_headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert client.get(f"/admin/purges/{response.json()['purge_id']}", headers=admin_headers).json()["status"] == "pending"
+
+    purge.run_purge(db, submitted[0])
+    assert client.get(f"/admin/purges/{response.json()['purge_id']}", headers=admin_headers).json()["progress"] == {"applications": 1, "reviews": 0, "jobs": 1}
+    assert db.query(models.Application).filter(models.Application.job_id == job_id).count() == 0
+
+def test_status_changes_are_audited_in_batches(client: TestClient, db: Session, authenticated_admin: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test status changes are queued, written in batches on flush and paged newest first"""
+    log = audit.AuditLog(batch_size=2)
+    monkeypatch.setattr(audit, "log", log)
+    job_id = client.post("/jobs/", json=sample_job_data, headers={"Authorization": f"Bearer {authenticated_poster['token']}"}).json()["id"]
+    admin_headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    for new_status in ("in_progress", "completed", "open"):
+        client.put(f"/admin/jobs/{job_id}/status", json={"status": new_status}, headers=admin_headers)
+    # Nothing is written by the request itself
+    assert db.query(models.AuditEvent).filter(models.AuditEvent.entity_id == job_id).count() == 0
+    assert log.flush(db) == 3
+
+    first = client.get(f"/admin/audit-events?entity_id={job_id}&limit=2", headers=admin_headers)
+    assert first.status_code == status.HTTP_200_OK
+    assert [(event["old_value"], event["new_value"]) for event in first.json()] == [("completed", "open"), ("in_progress", "completed")]
+    admin = db.query(models.User).filter(models.User.username == authenticated_admin["user"]["username"]).one()
+    assert first.json()[0]["actor_id"] == str(admin.id)
+    second = client.get(f"/admin/audit-events?entity_id={job_id}&limit=2&cursor={first.headers['X-Next-Cursor']}", headers=admin_headers)
+    assert [(event["action"], event["new_value"]) for event in second.json()] == [("job.status", "in_progress")]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_full_audit_queue_applies_backpressure_then_drops(monkeypatch: Any) -> None:
+    """Test a full queue makes the caller wait for room, then drops the event"""
+    monkeypatch.setattr(audit, "AUDIT_ENQUEUE_TIMEOUT_SECONDS", 0.01)
+    log = audit.AuditLog(maxsize=1)
+    log.record(None, "user.role", "user", None, "doer", "poster")
+    log.record(None, "user.role", "user", None, "poster", "admin")
+    assert log.dropped == 1
+
+def test_exports_stream_in_batches_as_ndjson_and_csv(client: TestClient, db: Session, authenticated_admin: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test exports are written one cursor batch at a time, in either format"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    for n in range(5):
+        client.post("/jobs/", json={**sample_job_data, "title": f"Export {n}", "department": "Exports"}, headers=poster_headers)
+
+    chunks = list(export.stream(db, "jobs", "ndjson", [models.Job.department == "Exports"], batch_size=2))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert sorted(row["title"] for row in rows) == [f"Export {n}" for n in range(5)]
+    assert rows[0]["reward"] == 100.0 and rows[0]["skills_required"] == ["Python", "FastAPI"]
+
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    response = client.get("/admin/exports/jobs?format=csv&department=Exports", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="jobs.csv"'
+    table = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(table) == 5
+    assert json.loads(table[0]["skills_required"]) == ["Python", "FastAPI"]
+
+    ndjson = client.get("/admin/exports/users?role=poster", headers=headers)
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert "testposter" in [json.loads(line)["username"] for line in ndjson.text.splitlines()]
+    assert client.get("/admin/exports/applications?role=doer", headers=headers).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/admin/exports/jobs", headers=poster_headers).status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from typing import Any, Iterator, List
+import pytest
+from app import admission
+from app.database import SessionLocal, engine
+
+requires_postgres = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="pg_sleep and statement_timeout are PostgreSQL only")
+
+@pytest.fixture
+def request_control() -> Iterator[admission.RequestControl]:
+    """A request with a 0.3 second deadline around the test body"""
+    control = admission.RequestControl(0.3)
+    token = admission.current.set(control)
+    yield control
+    admission.current.reset(token)
+
+@requires_postgres
+def test_statement_timeout_follows_request_deadline(request_control: admission.RequestControl) -> None:
+    """Test a transaction opened for a request is cut off when the request's time runs out"""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        with pytest.raises(OperationalError) as error:
+            db.execute(text("SELECT pg_sleep(5)"))
+        assert admission.is_cancelled_statement(error.value)
+        assert time.perf_counter() - started < 2
+        db.rollback()
+        # Out of time: the next transaction is refused before it reaches the database
+        time.sleep(max(request_control.remaining(), 0))
+        with pytest.raises(admission.DeadlineExceeded):
+            db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+@requires_postgres
+def test_disconnect_cancels_running_statement() -> None:
+    """Test cancelling a request stops its in-flight statement and releases the connection"""
+    control = admission.RequestControl(30)
+    token = admission.current.set(control)
+    db = SessionLocal()
+    try:
+        threading.Timer(0.2, control.cancel).start()
+        started = time.perf_counter()
+        with pytest.raises(OperationalError) as error:
+            db.execute(text("SELECT pg_sleep(5)"))
+        assert admission.is_cancelled_statement(error.value)
+        assert time.perf_counter() - started < 2
+    finally:
+        db.close()
+        admission.current.reset(token)
+    assert not control._connections
+
+def test_middleware_cancels_request_when_client_disconnects() -> None:
+    """Test the disconnect is noticed while the app is still working on the request"""
+    controls: List[admission.RequestControl] = []
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        controls.append(admission.current.get())  # type: ignore[arg-type]
+        await receive()
+        await asyncio.sleep(0.1)
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+
+    async def receive() -> Any:
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(10)
+
+    async def send(message: Any) -> None:
+        pass
+
+    controller = admission.AdmissionController()
+    middleware = admission.AdmissionMiddleware(app, controller)
+    asyncio.run(middleware({"type": "http", "path": "/jobs/"}, receive, send))
+    assert controls[0].cancelled
+    assert controller.in_flight == 0
+
+def test_slow_long_deadline_routes_do_not_trigger_shedding() -> None:
+    """Test only routes on the default deadline move the latency that throttles admission"""
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive() -> Any:
+        await asyncio.sleep(10)
+
+    async def send(message: Any) -> None:
+        pass
+
+    controller = admission.AdmissionController(smoothing=1.0)
+    middleware = admission.AdmissionMiddleware(app, controller)
+    for path in ("/chat", "/admin/exports/jobs"):
+        asyncio.run(middleware({"type": "http", "path": path}, receive, send))
+    assert controller.latency == 0
+    asyncio.run(middleware({"type": "http", "path": "/jobs/"}, receive, send))
+    assert controller.latency >= 0.05
+
+def test_controller_sheds_on_queue_depth_and_latency() -> None:
+    """Test admission stops at the in-flight limit, and at a lower one while responses are slow"""
+    controller = admission.AdmissionController(max_in_flight=3, max_latency=1.0, overload_in_flight=1, smoothing=1.0)
+    assert [controller.admit() for _ in range(4)] == [True, True, True, False]
+    controller.observe(5.0)
+    controller.release()
+    controller.release()
+    assert not controller.admit()
+    controller.release()
+    assert controller.admit()
+    controller.observe(0.1)
+    assert controller.admit()
+    assert controller.shed == 2
+
+def test_overloaded_worker_returns_503(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test excess requests are shed at the door with Retry-After"""
+    monkeypatch.setattr(admission.controller, "max_in_flight", 0)
+    response = client.get("/jobs/")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "1"
+
+def test_expired_deadline_returns_504(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a request whose deadline has passed gets a 504 instead of running its queries"""
+    monkeypatch.setitem(admission.ROUTE_DEADLINES, "/jobs", 0)
+    assert client.get("/jobs/").status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert client.get("/").status_code == status.HTTP_200_OK
@@ -1,6 +1,8 @@
 from fastapi import status
 from fastapi.testclient import TestClient
 from typing import Dict, Any
+from sqlalchemy.orm import Session
+from app import lifecycle, models
 
 def test_create_application(client: TestClient, authenticated_doer: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
     """Test doer creating an application"""
@@ -116,3 +118,65 @@ def test_get_doer_earnings(client: TestClient, authenticated_doer: Dict[str, Any
     assert "total_cash" in data
     assert "total_completed_jobs" in data
     assert data["total_completed_jobs"] >= 1
+
+def test_submission_upload_and_ranged_download(client: TestClient, authenticated_doer: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test submitted work is streamed to the blob store and read back with ranges"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job_id = client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"]
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    app_id = client.post("/applications/", json={"job_id": job_id}, headers=doer_headers).json()["id"]
+
+    body = bytes(range(256)) * 10000  # spans several blob chunks
+    response = client.put(f"/applications/{app_id}/submission", content=body,
+                          headers={**doer_headers, "Content-Type": "application/zip"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["submission_size"] == len(body)
+
+    # Listings report the submission without shipping it
+    listed = client.get(f"/applications/job/{job_id}", headers=poster_headers).json()
+    assert listed[0]["submission_size"] == len(body)
+    assert "submitted_work" not in listed[0]
+
+    full = client.get(f"/applications/{app_id}/submission", headers=poster_headers)
+    assert full.status_code == status.HTTP_200_OK
+    assert full.content == body
+    assert full.headers["content-type"] == "application/zip"
+
+    start, end = 1048570, 1048600  # crosses a chunk boundary
+    ranged = client.get(f"/applications/{app_id}/submission", headers={**poster_headers, "Range": f"bytes={start}-{end}"})
+    assert ranged.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert ranged.content == body[start:end + 1]
+    assert ranged.headers["content-range"] == f"bytes {start}-{end}/{len(body)}"
+
+    unsatisfiable = client.get(f"/applications/{app_id}/submission", headers={**poster_headers, "Range": f"bytes={len(body)}-"})
+    assert unsatisfiable.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+def test_legacy_submissions_move_to_blob_store(client: TestClient, db: Session, authenticated_doer: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test inline submitted_work is streamed on first download, and moved in bulk by the backfill"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    app_ids = []
+    for _ in range(2):
+        job_id = client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"]
+        app_ids.append(client.post("/applications/", json={"job_id": job_id}, headers=doer_headers).json()["id"])
+    db.query(models.Application).filter(models.Application.id.in_(app_ids)).update(
+        {models.Application.submitted_work: "Done, see attached notes"}, synchronize_session=False)
+    db.commit()
+
+    downloaded = client.get(f"/applications/{app_ids[0]}/submission", headers=poster_headers)
+    assert downloaded.status_code == status.HTTP_200_OK
+    assert downloaded.text == "Done, see attached notes"
+    assert downloaded.headers["content-type"].startswith("text/plain")
+
+    assert lifecycle.backfill_submissions(db) == 1
+    listed = {a["id"]: a for a in client.get("/applications/my", headers=doer_headers).json()}
+    assert listed[app_ids[1]]["submission_size"] == len("Done, see attached notes")
+
+def test_submission_upload_only_by_applicant(client: TestClient, authenticated_doer: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test only the applicant can upload submitted work"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job_id = client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"]
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    app_id = client.post("/applications/", json={"job_id": job_id}, headers=doer_headers).json()["id"]
+    response = client.put(f"/applications/{app_id}/submission", content=b"not mine", headers=poster_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
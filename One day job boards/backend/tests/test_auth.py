@@ -1,6 +1,12 @@
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import IntegrityError
 from typing import Dict, Any
+import pytest
+import uuid
+from app import auth, crud, models, provisioning
+from app.routers import auth as auth_router
 
 def test_signup_success(client: TestClient, test_user_data: Dict[str, Any]) -> None:
     """Test successful user signup"""
@@ -88,3 +94,92 @@ def test_get_current_user_unauthorized(client: TestClient) -> None:
     """Test getting current user without token"""
     response = client.get("/auth/user")
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def login(client: TestClient, user_data: Dict[str, Any]) -> Dict[str, Any]:
+    response = client.post(
+        "/auth/login",
+        data={"username": user_data["username"], "password": user_data["password"]},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    return response.json()
+
+def test_refresh_rotates_without_password_check(client: TestClient, test_user_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test refresh issues a new pair, never verifies a password, and detects reuse"""
+    client.post("/auth/signup", json=test_user_data)
+    tokens = login(client, test_user_data)
+    assert tokens["refresh_token"]
+
+    def fail(*args: Any) -> bool:
+        raise AssertionError("refresh must not verify passwords")
+    monkeypatch.setattr(auth.pwd_context, "verify", fail)
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/auth/user", headers={"Authorization": f"Bearer {rotated['access_token']}"}).status_code == status.HTTP_200_OK
+
+    # Replaying the old token revokes the whole family, including the new one
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_role_change_revokes_refresh_tokens(client: TestClient, test_user_data: Dict[str, Any], authenticated_admin: Dict[str, Any]) -> None:
+    """Test an admin role change ends the user's refresh sessions"""
+    client.post("/auth/signup", json=test_user_data)
+    tokens = login(client, test_user_data)
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    client.put(f"/admin/users/{test_user_data['username']}/role", json={"role": "poster"}, headers=headers)
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_signup_duplicate_email(client: TestClient, test_user_data: Dict[str, Any]) -> None:
+    """Test the email unique constraint surfaces as a 400"""
+    client.post("/auth/signup", json=test_user_data)
+    response = client.post("/auth/signup", json={**test_user_data, "username": "another"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Email already registered"
+    response = client.post("/auth/signup", json={**test_user_data, "email": "another@example.com"})
+    assert response.json()["detail"] == "Username already registered"
+
+def test_signup_other_integrity_errors_are_not_duplicates(client: TestClient, test_user_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test a violation of any other constraint is raised, not reported as a taken username"""
+    class Diag:
+        constraint_name = "users_role_check"
+
+    class Orig(Exception):
+        diag = Diag()
+
+    def create_user(db: Any, user: Any) -> None:
+        raise IntegrityError("INSERT INTO users ...", {}, Orig())
+
+    monkeypatch.setattr(crud, "create_user", create_user)
+    with pytest.raises(IntegrityError):
+        client.post("/auth/signup", json=test_user_data)
+
+def test_duplicate_signup_is_recognised_on_sqlite() -> None:
+    """Test SQLite's unique violations, which carry no constraint name, still map to the taken field"""
+    engine = create_engine("sqlite://")
+    models.User.__table__.create(engine)
+    row = {"id": uuid.uuid4(), "username": "sam", "email": "sam@example.com", "password_hash": "x", "role": "doer"}
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), row)
+    for clash, field in (({"email": "other@example.com"}, "Username"), ({"username": "other"}, "Email")):
+        with pytest.raises(IntegrityError) as error, engine.begin() as conn:
+            conn.execute(insert(models.User.__table__), {**row, "id": uuid.uuid4(), **clash})
+        assert auth_router.duplicate_user_field(error.value) == field
+
+def test_bulk_provisioning_reports_conflicts(client: TestClient, authenticated_admin: Dict[str, Any], test_user_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test bulk provisioning creates new users and reports existing and repeated ones"""
+    monkeypatch.setattr(provisioning, "PARALLEL_HASH_THRESHOLD", 2)
+    client.post("/auth/signup", json=test_user_data)
+    users = [
+        {"username": f"bulk{i}", "email": f"bulk{i}@example.com", "password": "pw123456", "role": "doer", "department": "ops"}
+        for i in range(3)
+    ]
+    users.append({**users[0], "email": "other@example.com"})
+    users.append({**test_user_data, "email": "fresh@example.com"})
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    response = client.post("/admin/users/bulk", json={"users": users}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert sorted(result["created"]) == ["bulk0", "bulk1", "bulk2"]
+    assert {item["reason"] for item in result["skipped"]} == {"duplicate username in batch", "username already registered"}
+    assert login(client, users[1])["access_token"]
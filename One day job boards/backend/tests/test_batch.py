@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import status
+from fastapi.testclient import TestClient
+from typing import Any, Dict
+import pytest
+from app.main import app
+from app.routers import batch
+
+def test_batch_runs_dashboard_calls_in_one_request(client: TestClient, authenticated_doer: Dict[str, Any], authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test a batch authenticates once and returns every sub-response in order"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job_id = client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"]
+    headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    client.post("/applications/", json={"job_id": job_id}, headers=headers)
+
+    response = client.post("/batch", json={"requests": [
+        {"id": "me", "path": "/auth/user"},
+        {"id": "applications", "path": "/applications/my"},
+        {"id": "earnings", "path": "/applications/earnings/my"},
+        {"id": "jobs", "path": "/jobs/?limit=5"},
+        {"id": "missing", "path": f"/jobs/{'0' * 8}-0000-0000-0000-{'0' * 12}"},
+    ]}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    results = {item["id"]: item for item in response.json()["responses"]}
+    assert [item["id"] for item in response.json()["responses"]] == ["me", "applications", "earnings", "jobs", "missing"]
+    assert results["me"]["body"]["username"] == authenticated_doer["user"]["username"]
+    assert len(results["applications"]["body"]) == 1
+    assert results["earnings"]["status"] == status.HTTP_200_OK
+    assert results["jobs"]["body"][0]["id"] == job_id
+    assert results["missing"]["status"] == status.HTTP_404_NOT_FOUND
+
+def test_batch_rejects_unlisted_mutations(client: TestClient, authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test only GETs and allow-listed mutations run inside a batch"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job_id = client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"]
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    app_id = client.post("/applications/", json={"job_id": job_id}, headers=doer_headers).json()["id"]
+
+    response = client.post("/batch", json={"requests": [
+        {"method": "DELETE", "path": f"/jobs/{job_id}"},
+        {"method": "PUT", "path": f"/applications/{app_id}/status", "body": {"status": "accepted"}},
+        {"path": "/batch"},
+    ]}, headers=poster_headers)
+    deleted, accepted, nested = response.json()["responses"]
+    assert deleted["status"] == status.HTTP_405_METHOD_NOT_ALLOWED
+    assert accepted["status"] == status.HTTP_200_OK
+    assert nested["status"] == status.HTTP_400_BAD_REQUEST
+    assert client.get(f"/jobs/{job_id}").status_code == status.HTTP_200_OK
+
+def test_batch_with_invalid_token_fails_once(client: TestClient) -> None:
+    """Test an invalid token rejects the whole batch"""
+    response = client.post("/batch", json={"requests": [{"path": "/jobs/"}]}, headers={"Authorization": "Bearer nope"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_concurrent_batches_do_not_starve_the_threadpool(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test several large batches at once all finish, each sub-request on its own pooled session"""
+    # The real get_db: one session per sub-request instead of the shared test session
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    monkeypatch.setattr(batch, "BATCH_CONCURRENCY", 4)
+    payload = {"requests": [{"id": str(n), "path": "/jobs/?limit=5"} for n in range(20)]}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(client.post, "/batch", json=payload) for _ in range(4)]
+        responses = [future.result(timeout=15) for future in futures]
+    for response in responses:
+        assert response.status_code == status.HTTP_200_OK
+        assert {item["status"] for item in response.json()["responses"]} == {status.HTTP_200_OK}
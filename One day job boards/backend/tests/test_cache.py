@@ -0,0 +1,99 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+import os
+import tempfile
+from app import cache, models
+
+class RecordingBroadcaster(cache.LocalBroadcaster):
+    def __init__(self) -> None:
+        self.published: List[List[str]] = []
+
+    def publish(self, keys: List[str]) -> None:
+        self.published.append(keys)
+
+def test_job_lookup_is_cached_and_invalidated_on_commit(client: TestClient, db: Session, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test repeated lookups hit the cache and a committed update evicts the row"""
+    broadcaster = RecordingBroadcaster()
+    cache.entities.broadcaster = broadcaster
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job = client.post("/jobs/", json=sample_job_data, headers=headers).json()
+
+    assert client.get(f"/jobs/{job['id']}").json()["title"] == sample_job_data["title"]
+    assert client.get(f"/jobs/{job['id']}").json()["title"] == sample_job_data["title"]
+    stats = cache.entities.stats["jobs"]
+    assert stats.hits >= 1
+
+    response = client.put(f"/jobs/{job['id']}", json={"title": "Renamed"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    published = [key for keys in broadcaster.published for key in keys]
+    assert f"jobs:id:{job['id']}" in published
+    assert f"jobs:slug:{job['slug']}" in published
+    assert client.get(f"/jobs/{job['id']}").json()["title"] == "Renamed"
+
+def test_peer_invalidation_and_shared_sqlite_backend(db: Session) -> None:
+    """Test two workers sharing a SQLite backend see each other's evictions"""
+    path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    first = cache.EntityCache(cache.SQLiteBackend(path), cache.LocalBroadcaster())
+    second = cache.EntityCache(cache.SQLiteBackend(path), cache.LocalBroadcaster())
+    user = models.User(username="cached", email="cached@example.com", password_hash="x", role="doer")
+    db.add(user)
+    db.commit()
+
+    loads: List[int] = []
+    def load() -> Any:
+        loads.append(1)
+        return db.query(models.User).filter(models.User.username == "cached").first()
+
+    assert first.get(db, models.User, "username", "cached", load).email == "cached@example.com"
+    shared = second.get(db, models.User, "username", "cached", load)
+    assert shared.email == "cached@example.com"
+    # Stored as JSON, with column types restored on the way out
+    assert shared.id == user.id and shared.created_at == user.created_at
+    assert len(loads) == 1
+    assert second.report()["users"] == {"hits": 1, "misses": 0, "hit_rate": 1.0}
+
+    second.on_peer_invalidate([cache.EntityCache.key("users", "username", "cached")])
+    first.get(db, models.User, "username", "cached", load)
+    assert len(loads) == 2
+
+def test_entries_refresh_after_ttl(db: Session) -> None:
+    """Test expired entries are reloaded"""
+    now = [1000.0]
+    entity_cache = cache.EntityCache(cache.LRUBackend(), cache.LocalBroadcaster(), ttl=10, beta=0, clock=lambda: now[0])
+    user = models.User(username="ttl", email="ttl@example.com", password_hash="x", role="doer")
+    db.add(user)
+    db.commit()
+    loads: List[int] = []
+    def load() -> Any:
+        loads.append(1)
+        return user
+
+    entity_cache.get(db, models.User, "username", "ttl", load)
+    entity_cache.get(db, models.User, "username", "ttl", load)
+    now[0] += 11
+    entity_cache.get(db, models.User, "username", "ttl", load)
+    assert len(loads) == 2
+
+def test_load_racing_an_invalidation_is_not_cached(db: Session) -> None:
+    """Test a load that began before a write cannot put its stale row back after the invalidation"""
+    user = models.User(username="racing", email="racing@example.com", password_hash="x", role="doer")
+    db.add(user)
+    db.commit()
+    key = cache.EntityCache.key("users", "username", "racing")
+    backends: List[Any] = [cache.LRUBackend(), cache.SQLiteBackend(os.path.join(tempfile.mkdtemp(), "cache.db"))]
+    for backend in backends:
+        entity_cache = cache.EntityCache(backend, cache.LocalBroadcaster())
+        loads: List[int] = []
+
+        def stale_load() -> Any:
+            loads.append(1)
+            # A writer commits while this load is still reading the old row
+            entity_cache.invalidate([key])
+            return user
+
+        entity_cache.get(db, models.User, "username", "racing", stale_load)
+        entity_cache.get(db, models.User, "username", "racing", lambda: loads.append(1) or user)
+        entity_cache.get(db, models.User, "username", "racing", lambda: loads.append(1) or user)
+        assert len(loads) == 2  # the racing load was not cached; the one after the write was
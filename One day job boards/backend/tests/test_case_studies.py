@@ -0,0 +1,58 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from typing import Any, Dict, List
+
+CASE_STUDIES: List[Dict[str, Any]] = [
+    {"title": "Resume polish", "category": "Writing", "problem": "p", "solution": "s",
+     "time_to_deliver": 60, "difficulty_level": "easy", "tags": ["resume", "editing"]},
+    {"title": "Python script fix", "category": "Engineering", "problem": "p", "solution": "s",
+     "time_to_deliver": 120, "difficulty_level": "medium", "tags": ["python", "debugging"]},
+    {"title": "Data cleanup", "category": "Engineering", "problem": "p", "solution": "s",
+     "time_to_deliver": 240, "difficulty_level": "hard", "tags": ["python", "pandas"]},
+]
+
+@pytest.fixture
+def seeded_case_studies(client: TestClient, authenticated_admin: Dict[str, Any]) -> None:
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    for case_study in CASE_STUDIES:
+        response = client.post("/case-studies/", json=case_study, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+def titles(response: Any) -> List[str]:
+    assert response.status_code == status.HTTP_200_OK
+    return [item["title"] for item in response.json()]
+
+def test_filter_case_studies(client: TestClient, seeded_case_studies: None) -> None:
+    """Test category, difficulty, tag and time filters"""
+    assert titles(client.get("/case-studies/?category=engineering&sort=quickest")) == ["Python script fix", "Data cleanup"]
+    assert titles(client.get("/case-studies/?difficulty_level=easy")) == ["Resume polish"]
+    assert titles(client.get("/case-studies/?tag=python&tag=pandas")) == ["Data cleanup"]
+    assert titles(client.get("/case-studies/?max_time_to_deliver=120&sort=title")) == ["Python script fix", "Resume polish"]
+    assert client.get("/case-studies/?sort=random").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_catalog_and_database_paths_agree(client: TestClient, seeded_case_studies: None, authenticated_admin: Dict[str, Any]) -> None:
+    """Test the in-memory catalog and the indexed SQL path return the same results"""
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    client.post("/case-studies/", headers=headers, json={
+        **CASE_STUDIES[1], "title": "api docs", "difficulty_level": "Medium", "tags": ["Python", "c_sharp", '50% "off"'],
+    })
+    queries = (
+        "tag=python", "tag=PYTHON", "category=Engineering&sort=title", "max_time_to_deliver=200&sort=quickest",
+        "difficulty_level=medium", "difficulty_level=MEDIUM&sort=title", "tag=c_sharp", "tag=c%sharp", "tag=csharp",
+        'tag=50%25 "OFF"', "tag=50", "sort=title",
+    )
+    for query in queries:
+        from_catalog = titles(client.get(f"/case-studies/?{query}"))
+        from_database = titles(client.get(f"/case-studies/?{query}&fields=id,title"))
+        assert from_catalog == from_database, query
+    assert titles(client.get("/case-studies/?tag=PYTHON&sort=title")) == ["api docs", "Data cleanup", "Python script fix"]
+    assert titles(client.get("/case-studies/?tag=c%25sharp&fields=id,title")) == []
+
+def test_catalog_sees_new_case_study(client: TestClient, seeded_case_studies: None, authenticated_admin: Dict[str, Any]) -> None:
+    """Test a write is visible in the catalog immediately"""
+    assert titles(client.get("/case-studies/?tag=design")) == []
+    headers = {"Authorization": f"Bearer {authenticated_admin['token']}"}
+    new_case_study = {**CASE_STUDIES[0], "title": "Poster design", "tags": ["design"]}
+    client.post("/case-studies/", json=new_case_study, headers=headers)
+    assert titles(client.get("/case-studies/?tag=design")) == ["Poster design"]
@@ -1,6 +1,10 @@
 from fastapi import status
 from fastapi.testclient import TestClient
+from pathlib import Path
 from typing import Dict, Any
+import pytest
+from app import chat_sessions
+from app.routers import chat
 
 def test_chat_endpoint_basic(client: TestClient) -> None:
     """Test chat endpoint with basic message"""
@@ -63,3 +67,116 @@ def test_chat_invalid_messages(client: TestClient) -> None:
     response = client.post("/chat", json=chat_data)
     # Should still respond with 200 and fallback
     assert response.status_code == status.HTTP_200_OK
+
+def test_chat_session_keeps_history_on_the_server(client: TestClient) -> None:
+    """Test the client only sends its new message and the server keeps the conversation"""
+    first = client.post("/chat", json={"message": "How do I apply for a job?"}).json()
+    session_id = first["session_id"]
+    assert session_id
+    second = client.post("/chat", json={"session_id": session_id, "message": "Where do I find jobs?"}).json()
+    assert second["session_id"] == session_id
+    session = chat_sessions.store.get(session_id)
+    assert session is not None
+    assert [m["role"] for m in session.messages] == ["user", "assistant", "user", "assistant"]
+    assert session.messages[2]["content"] == "Where do I find jobs?"
+
+    restarted = client.post("/chat", json={"session_id": "expired-or-unknown", "message": "Hi"}).json()
+    assert restarted["session_id"] not in (session_id, "expired-or-unknown")
+    assert client.post("/chat", json={}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_chat_history_is_trimmed_to_token_budget(client: TestClient, monkeypatch: Any) -> None:
+    """Test old turns are folded into a bounded summary so the prompt stays flat"""
+    monkeypatch.setattr(chat_sessions, "CHAT_HISTORY_TOKENS", 120)
+    monkeypatch.setattr(chat_sessions, "CHAT_SUMMARY_TOKENS", 40)
+    session_id = None
+    for turn in range(12):
+        body = client.post("/chat", json={"session_id": session_id, "message": f"Question {turn} about applying " + "x" * 80}).json()
+        session_id = body["session_id"]
+    session = chat_sessions.store.get(session_id)
+    assert session is not None
+    assert sum(chat_sessions.message_tokens(m) for m in session.messages) <= 120
+    assert "Question 0" not in " ".join(m["content"] for m in session.messages)
+    assert session.summary and chat_sessions.count_tokens(session.summary) <= 41
+    prompt = chat_sessions.build_prompt(session, "system")
+    assert prompt[1]["content"].startswith("Earlier in this conversation")
+    assert prompt[-1] == session.messages[-1]
+
+def test_memory_store_expires_and_bounds_sessions() -> None:
+    """Test sessions expire after the TTL and the oldest are evicted past the limit"""
+    now = [0.0]
+    store = chat_sessions.MemoryStore(ttl=10, max_sessions=2, clock=lambda: now[0])
+    for name in ("a", "b", "c"):
+        store.put(name, chat_sessions.ChatSession([{"role": "user", "content": name}]))
+    assert store.get("a") is None
+    assert store.get("c") is not None
+    now[0] = 11
+    assert store.get("c") is None
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_concurrent_turns_are_both_kept(backend: str, tmp_path: Path, monkeypatch: Any) -> None:
+    """Test two turns of one conversation stored at once both survive, whichever worker stored first"""
+    store = chat_sessions.MemoryStore() if backend == "memory" else chat_sessions.SQLiteStore(str(tmp_path / "chat.db"))
+    monkeypatch.setattr(chat_sessions, "store", store)
+    assert store.put("s", chat_sessions.ChatSession([{"role": "user", "content": "hi"}]))
+    first, second = store.get("s"), store.get("s")
+    assert first is not None and second is not None
+    first.messages.append({"role": "user", "content": "one"})
+    second.messages.append({"role": "user", "content": "two"})
+    assert chat_sessions.save_turn("s", first, "reply one")
+    # The stale copy is refused by the store, then merged by save_turn
+    assert not store.put("s", chat_sessions.ChatSession(second.messages, second.summary, second.version))
+    assert chat_sessions.save_turn("s", second, "reply two")
+    stored = store.get("s")
+    assert stored is not None and stored.version == 3
+    assert [m["content"] for m in stored.messages] == ["hi", "one", "reply one", "two", "reply two"]
+
+def test_chat_answers_job_searches_from_the_index(client: TestClient, authenticated_poster: Dict[str, Any],
+                                                  sample_job_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test search questions are answered from the local index, which follows job writes"""
+    def no_model(prompt: Any) -> str:
+        raise AssertionError("search questions must not reach a model")
+    monkeypatch.setattr(chat, "generate_reply", no_model)
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    for title, department in (("Zanzibar python report", "Sales"), ("Zanzibar python scraper", "Engineering")):
+        client.post("/jobs/", json={**sample_job_data, "title": title, "department": department}, headers=headers)
+
+    reply = client.post("/chat", json={"message": "find me zanzibar python jobs in Sales"}).json()["reply"]
+    assert "Zanzibar python report" in reply
+    assert "Zanzibar python scraper" not in reply
+
+    # The index is loaded now; later writes are applied to it as they commit
+    job = client.post("/jobs/", json={**sample_job_data, "title": "Zanzibar python dashboard", "department": "Sales"},
+                      headers=headers).json()
+    reply = client.post("/chat", json={"message": "any zanzibar jobs in sales?"}).json()["reply"]
+    assert "Zanzibar python dashboard" in reply
+    client.put(f"/jobs/{job['id']}", json={**sample_job_data, "title": job["title"], "department": "Sales",
+                                           "status": "completed"}, headers=headers)
+    reply = client.post("/chat", json={"message": "any zanzibar jobs in sales?"}).json()["reply"]
+    assert "Zanzibar python dashboard" not in reply
+    assert "Zanzibar python report" in reply
+
+@pytest.mark.parametrize("message", [
+    "I posted a job yesterday but it is not showing up",
+    "Can you help me with my application for the job?",
+    "My task submission failed to upload",
+    "Thanks for the list!",
+    "I can't find my python job anymore",
+])
+def test_messages_about_jobs_that_are_not_searches_reach_the_model(client: TestClient, message: str, monkeypatch: Any) -> None:
+    """Test only an explicit search, or one narrowed by a known filter, skips the model"""
+    prompts: list = []
+    monkeypatch.setattr(chat, "generate_reply", lambda prompt: prompts.append(prompt) or "ok")
+    assert client.post("/chat", json={"message": message}).json()["reply"] == "ok"
+    assert prompts[0][-1]["content"] == message
+
+def test_model_prompts_are_grounded_in_matching_listings(client: TestClient, authenticated_poster: Dict[str, Any],
+                                                         sample_job_data: Dict[str, Any], monkeypatch: Any) -> None:
+    """Test questions for the model carry the most relevant listings as context"""
+    prompts: list = []
+    monkeypatch.setattr(chat, "generate_reply", lambda prompt: prompts.append(prompt) or "ok")
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    client.post("/jobs/", json={**sample_job_data, "title": "Quokka spreadsheet macros"}, headers=headers)
+
+    client.post("/chat", json={"message": "How hard are quokka spreadsheet macros to learn?"})
+    context = [m["content"] for m in prompts[0] if m["role"] == "system"]
+    assert any("Quokka spreadsheet macros" in content for content in context)
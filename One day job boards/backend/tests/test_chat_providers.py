@@ -0,0 +1,128 @@
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from typing import Any, Iterator, List, Optional
+import pytest
+from app import admission, chat_providers, chat_sessions
+from app.chat_providers import HedgedProviders, Lane, ProviderError
+
+PROMPT = [{"role": "user", "content": "hello"}]
+
+class FakeProvider:
+    """Scripted provider: sleeps for latency, then replies or raises; counts calls and cancellations"""
+
+    def __init__(self, name: str, latency: float = 0.0, error: Optional[Exception] = None):
+        self.name = name
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, prompt: List[chat_providers.Message], timeout: float) -> str:
+        self.timeout = timeout
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return f"reply from {self.name}"
+
+def lane(provider: FakeProvider, deadline: float = 5.0, hedge: Optional[List[float]] = None, max_concurrency: int = 4) -> Lane:
+    result = Lane(provider, deadline, max_concurrency)
+    # Recorded latencies drive the hedge delay once there are enough of them
+    result.latencies.extend(hedge or [])
+    return result
+
+def run(providers: HedgedProviders) -> Optional[str]:
+    async def complete() -> Optional[str]:
+        reply = await providers.complete(PROMPT)
+        await asyncio.sleep(0.01)  # let cancelled losers unwind
+        return reply
+    return asyncio.run(complete())
+
+@pytest.fixture
+def hedge_samples(monkeypatch: Any) -> Iterator[None]:
+    monkeypatch.setattr(chat_providers, "CHAT_HEDGE_MIN_SAMPLES", 5)
+    yield
+
+def test_fast_primary_is_not_hedged(hedge_samples: None) -> None:
+    """Test a primary answering within its p95 is the only provider asked"""
+    primary, secondary = FakeProvider("primary", 0.01), FakeProvider("secondary")
+    assert run(HedgedProviders([lane(primary, hedge=[0.2] * 5), lane(secondary)])) == "reply from primary"
+    assert secondary.calls == 0
+
+def test_slow_primary_is_hedged_and_loser_cancelled(hedge_samples: None) -> None:
+    """Test the secondary is asked after the primary's p95 and the slower request is cancelled"""
+    primary, secondary = FakeProvider("primary", 1.0), FakeProvider("secondary", 0.02)
+    primary_lane = lane(primary, hedge=[0.05] * 5)
+    started = time.perf_counter()
+    assert run(HedgedProviders([primary_lane, lane(secondary)])) == "reply from secondary"
+    assert time.perf_counter() - started < 0.5
+    assert primary.cancelled == 1
+    assert primary_lane.in_flight == 0
+    assert max(primary_lane.latencies) >= 0.05  # the cancelled call, censored at the cancel
+
+def test_failed_primary_hands_over_without_waiting(hedge_samples: None) -> None:
+    """Test an error moves on immediately instead of waiting out the hedge delay"""
+    primary = FakeProvider("primary", 0.01, error=ProviderError("HTTP 429"))
+    secondary = FakeProvider("secondary", 0.01)
+    started = time.perf_counter()
+    assert run(HedgedProviders([lane(primary, hedge=[2.0] * 5), lane(secondary)])) == "reply from secondary"
+    assert time.perf_counter() - started < 0.5
+
+def test_deadlines_bound_the_worst_case() -> None:
+    """Test providers that hang are cut off at their deadlines and the caller gets None"""
+    primary, secondary = FakeProvider("primary", 10), FakeProvider("secondary", 10)
+    lanes = [lane(primary, deadline=0.1), lane(secondary, deadline=0.1)]
+    started = time.perf_counter()
+    assert run(HedgedProviders(lanes)) is None
+    assert time.perf_counter() - started < 1.0
+    assert primary.cancelled == secondary.cancelled == 1
+    # Timed-out calls still count towards p95, at the time they were cut off
+    assert all(len(each.latencies) == 1 and each.latencies[0] >= 0.09 for each in lanes)
+
+def test_saturated_provider_is_skipped() -> None:
+    """Test a provider at its in-flight limit is passed over rather than queued for"""
+    primary, secondary = FakeProvider("primary", 0.2), FakeProvider("secondary", 0.01)
+    providers = HedgedProviders([lane(primary, max_concurrency=1), lane(secondary)])
+
+    async def two_at_once() -> List[Optional[str]]:
+        return list(await asyncio.gather(providers.complete(PROMPT), providers.complete(PROMPT)))
+
+    assert sorted(str(reply) for reply in asyncio.run(two_at_once())) == ["reply from primary", "reply from secondary"]
+    assert primary.calls == 1
+
+def test_chat_route_uses_hedged_providers_and_falls_back(client: TestClient) -> None:
+    """Test the chat answers from the fastest provider, and from canned replies when all fail"""
+    primary = FakeProvider("primary", 0.01, error=ProviderError("HTTP 500"))
+    secondary = FakeProvider("secondary", 0.01)
+    chat_providers.set_providers(HedgedProviders([lane(primary), lane(secondary, deadline=60)]))
+    try:
+        assert client.post("/chat", json={"message": "Tell me a joke"}).json()["reply"] == "reply from secondary"
+        # The provider's own deadline is cut to what is left of the request's
+        assert secondary.timeout <= admission.deadline_for("/chat")
+        chat_providers.set_providers(HedgedProviders([lane(primary)]))
+        assert "apply" in client.post("/chat", json={"message": "How do I apply?"}).json()["reply"].lower()
+    finally:
+        chat_providers.set_providers(None)
+
+def test_model_summaries_go_through_the_providers(client: TestClient, monkeypatch: Any) -> None:
+    """Test CHAT_SUMMARIZE=model folds old turns with the hedged providers, under the request's deadline"""
+    monkeypatch.setattr(chat_sessions, "CHAT_SUMMARIZE", "model")
+    monkeypatch.setattr(chat_sessions, "CHAT_HISTORY_TOKENS", 60)
+    summarizer = FakeProvider("summarizer", 0.01)
+    chat_providers.set_providers(HedgedProviders([lane(summarizer)]))
+    try:
+        session_id = None
+        for turn in range(3):
+            body = client.post("/chat", json={"session_id": session_id, "message": f"Turn {turn} " + "x" * 80}).json()
+            session_id = body["session_id"]
+    finally:
+        chat_providers.set_providers(None)
+    session = chat_sessions.store.get(session_id)
+    assert session is not None and session.summary == "reply from summarizer"
+    assert summarizer.timeout <= admission.deadline_for("/chat")
+
@@ -0,0 +1,36 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from typing import Any, Dict
+
+def test_poster_dashboard_counts_and_pagination(client: TestClient, authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test the dashboard aggregates applications and reviews per job and pages by cursor"""
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    job_ids = [client.post("/jobs/", json=sample_job_data, headers=poster_headers).json()["id"] for _ in range(3)]
+    app_id = client.post("/applications/", json={"job_id": job_ids[0]}, headers=doer_headers).json()["id"]
+    client.put(f"/applications/{app_id}/status", json={"status": "accepted"}, headers=poster_headers)
+    client.post("/reviews/", json={"rating": 4, "comment": "Good", "job_id": job_ids[0]}, headers=doer_headers)
+    client.post("/reviews/", json={"rating": 5, "comment": "Great", "job_id": job_ids[0]}, headers=doer_headers)
+
+    first = client.get("/dashboard/poster?limit=2", headers=poster_headers)
+    assert first.status_code == status.HTTP_200_OK
+    assert len(first.json()["items"]) == 2
+    assert first.json()["next_cursor"]
+    second = client.get(f"/dashboard/poster?limit=2&cursor={first.json()['next_cursor']}", headers=poster_headers).json()
+    assert second["next_cursor"] is None
+    items = {item["job"]["id"]: item for item in first.json()["items"] + second["items"]}
+    assert set(items) == set(job_ids)
+
+    applied = items[job_ids[0]]
+    assert applied["applications"] == {"total": 1, "pending": 0, "accepted": 1, "rejected": 0, "completed": 0}
+    assert applied["newest_applicant"]["username"] == authenticated_doer["user"]["username"]
+    assert applied["reviews"] == {"count": 2, "average_rating": 4.5}
+    assert items[job_ids[1]]["applications"]["total"] == 0
+    assert items[job_ids[1]]["newest_applicant"] is None
+
+def test_poster_dashboard_requires_poster(client: TestClient, authenticated_doer: Dict[str, Any], authenticated_poster: Dict[str, Any]) -> None:
+    """Test doers cannot open the poster dashboard and bad cursors are rejected"""
+    headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    assert client.get("/dashboard/poster", headers=headers).status_code == status.HTTP_403_FORBIDDEN
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    assert client.get("/dashboard/poster?cursor=garbage", headers=poster_headers).status_code == status.HTTP_400_BAD_REQUEST
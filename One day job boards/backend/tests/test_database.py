@@ -0,0 +1,114 @@
+import pytest
+import threading
+from pathlib import Path
+from typing import Any, Dict, Generator
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from starlette.responses import Response
+from app import auth, database, models
+from app.database import Base
+
+def make_request(headers: Dict[str, str]) -> Request:
+    scope: Dict[str, Any] = {
+        "type": "http",
+        "method": "GET",
+        "path": "/jobs/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("10.0.0.1", 1234),
+    }
+    return Request(scope)
+
+def make_user(username: str) -> models.User:
+    return models.User(username=username, email=f"{username}@example.com", password_hash="x", role="doer")
+
+@pytest.fixture
+def primary(tmp_path: Path) -> Generator[Engine, None, None]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def replicas(tmp_path: Path) -> Generator[database.ReplicaSet, None, None]:
+    replica_set = database.ReplicaSet([f"sqlite:///{tmp_path / 'replica.db'}"])
+    Base.metadata.create_all(bind=replica_set.engines[0])
+    replica_set.check()
+    yield replica_set
+    replica_set.engines[0].dispose()
+
+def test_reads_go_to_replica_and_writes_to_primary(primary: Engine, replicas: database.ReplicaSet) -> None:
+    """Test routing session splits reads and writes"""
+    Session = sessionmaker(bind=primary, class_=database.RoutingSession)
+    with sessionmaker(bind=replicas.engines[0])() as seed:
+        seed.add(make_user("replicated"))
+        seed.commit()
+
+    db = Session()
+    db.info["replica"] = replicas.pick()
+    assert db.query(models.User).filter(models.User.username == "replicated").first() is not None
+    db.add(make_user("written"))
+    db.commit()
+    db.close()
+
+    with Session() as on_primary:
+        assert on_primary.query(models.User).filter(models.User.username == "written").first() is not None
+        assert on_primary.query(models.User).filter(models.User.username == "replicated").first() is None
+
+def test_commit_pins_principal_to_primary(primary: Engine) -> None:
+    """Test a caller that just wrote is not routed to a replica"""
+    Session = sessionmaker(bind=primary, class_=database.RoutingSession)
+    db = Session()
+    db.info["principal"] = "user:writer"
+    db.add(make_user("writer"))
+    db.commit()
+    db.close()
+    assert database.wrote_recently("user:writer")
+    assert not database.wrote_recently("user:reader")
+
+def test_get_read_db_respects_read_your_writes(primary: Engine, replicas: database.ReplicaSet, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test read dependency picks a replica only for callers without recent writes"""
+    monkeypatch.setattr(database, "replicas", replicas)
+    Session = sessionmaker(bind=primary, class_=database.RoutingSession)
+
+    reader = database.get_read_db(make_request({"Authorization": "Bearer fresh"}), Session())
+    assert reader.info["replica"] is replicas.engines[0]
+
+    # Pinned by subject, so a fresh token for the same user is pinned too
+    database.mark_write(database.request_principal(make_request({"Authorization": f"Bearer {auth.create_access_token({'sub': 'recent'})}"})))
+    token = auth.create_access_token({"sub": "recent", "fresh": True})
+    writer = database.get_read_db(make_request({"Authorization": f"Bearer {token}"}), Session())
+    assert "replica" not in writer.info
+
+def test_read_after_cookie_pins_across_workers(primary: Engine, replicas: database.ReplicaSet, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a write sets the read_after cookie, which pins reads even where this worker never saw the write"""
+    monkeypatch.setattr(database, "replicas", replicas)
+    Session = sessionmaker(bind=primary, class_=database.RoutingSession)
+    response = Response()
+    db = Session()
+    db.info["response"] = response
+    db.add(make_user("cookie-writer"))
+    db.commit()
+    db.close()
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{database.READ_AFTER_COOKIE}=")
+
+    database._recent_writes.clear()
+    pinned = database.get_read_db(make_request({"Cookie": cookie.split(";")[0]}), Session())
+    assert "replica" not in pinned.info
+    expired = database.get_read_db(make_request({"Cookie": f"{database.READ_AFTER_COOKIE}=1.0"}), Session())
+    assert expired.info["replica"] is replicas.engines[0]
+
+def test_replica_set_skips_unhealthy(tmp_path: Path, replicas: database.ReplicaSet) -> None:
+    """Test round-robin skips a replica that fails its health check"""
+    healthy_url = str(replicas.engines[0].url)
+    replica_set = database.ReplicaSet([f"sqlite:///{tmp_path / 'missing' / 'down.db'}", healthy_url])
+    # The first health check is still running: stay on the primary rather than wait for it
+    first_check = threading.Event()
+    replica_set._run_checks = first_check.wait  # type: ignore[method-assign]
+    assert replica_set.pick() is None
+    first_check.set()
+    replica_set.check()
+    picked = {replica_set.pick() for _ in range(4)}
+    assert picked == {replica_set.engines[1]}
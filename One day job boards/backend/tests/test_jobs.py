@@ -1,6 +1,10 @@
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
 from typing import Dict, Any
+from app import fastpath, models
 
 def test_create_job(client: TestClient, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
     """Test creating a job as poster"""
@@ -100,3 +104,54 @@ def test_get_my_jobs(client: TestClient, authenticated_poster: Dict[str, Any], s
     assert isinstance(data, list)
     assert len(data) > 0
 
+
+def test_get_jobs_fast_path_matches_default(client: TestClient, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the row/orjson list path returns the same payload as the ORM path"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    client.post("/jobs/", json=sample_job_data, headers=headers)
+
+    default = client.get("/jobs/").json()
+    monkeypatch.setattr(fastpath, "FAST_LIST_SERIALIZATION", True)
+    response = client.get("/jobs/")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == default
+
+def test_get_jobs_sparse_fields(client: TestClient, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test ?fields= returns only the requested job fields"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    client.post("/jobs/", json=sample_job_data, headers=headers)
+
+    response = client.get("/jobs/?fields=id,title,reward,reward_type,department,status")
+    assert response.status_code == status.HTTP_200_OK
+    data: list[Any] = response.json()
+    assert len(data) > 0
+    assert set(data[0]) == {"id", "title", "reward", "reward_type", "department", "status"}
+
+    response = client.get("/jobs/?fields=title,password_hash")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_jobs_range_filters_and_sorts(client: TestClient, db: Session, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test reward range, reward type and time budget filters, and each sort order"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    for age, (title, reward, reward_type, estimate, featured) in enumerate((
+        ("Large", 90, "cash", "6 hours", False),
+        ("Medium", 50, "credits", "2 hours", True),
+        ("Small", 10, "cash", "30 minutes", False),
+    )):
+        job_id = client.post("/jobs/", json={**sample_job_data, "title": title, "reward": reward, "reward_type": reward_type,
+                                             "estimated_time": estimate, "is_featured": featured}, headers=headers).json()["id"]
+        db.query(models.Job).filter(models.Job.id == job_id).update({"created_at": datetime.utcnow() - timedelta(minutes=age)})
+    db.commit()
+
+    def titles(query: str) -> list:
+        response = client.get(f"/jobs/?status=open&{query}")
+        assert response.status_code == status.HTTP_200_OK
+        return [job["title"] for job in response.json()]
+
+    assert titles("sort=newest") == ["Large", "Medium", "Small"]
+    assert titles("sort=reward") == ["Large", "Medium", "Small"]
+    assert titles("sort=featured") == ["Medium", "Large", "Small"]
+    assert titles("min_reward=20&max_reward=90&sort=reward") == ["Large", "Medium"]
+    assert titles("reward_type=cash&max_reward=50") == ["Small"]
+    assert titles("max_estimated_minutes=120&sort=reward") == ["Medium", "Small"]
+    assert client.get("/jobs/?sort=random").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+import uuid
+from app import cache, lifecycle, models
+
+def create_completed_job(client: TestClient, db: Session, poster: Dict[str, Any], doer: Dict[str, Any], job_data: Dict[str, Any], age_days: int) -> str:
+    poster_headers = {"Authorization": f"Bearer {poster['token']}"}
+    doer_headers = {"Authorization": f"Bearer {doer['token']}"}
+    job_id: str = client.post("/jobs/", json=job_data, headers=poster_headers).json()["id"]
+    app_id = client.post("/applications/", json={"job_id": job_id}, headers=doer_headers).json()["id"]
+    client.put(f"/applications/{app_id}/status", json={"status": "completed"}, headers=poster_headers)
+    client.post("/reviews/", json={"rating": 5, "comment": "Great", "job_id": job_id}, headers=doer_headers)
+    job = db.query(models.Job).filter(models.Job.id == job_id).one()
+    setattr(job, "status", "completed")
+    setattr(job, "created_at", datetime.utcnow() - timedelta(days=age_days))
+    db.commit()
+    return job_id
+
+def test_archive_completed_jobs(client: TestClient, db: Session, authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test old completed jobs move to the archive with their applications and reviews"""
+    old_job = create_completed_job(client, db, authenticated_poster, authenticated_doer, sample_job_data, age_days=60)
+    recent_job = create_completed_job(client, db, authenticated_poster, authenticated_doer, sample_job_data, age_days=1)
+    doer_headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    earnings_before = client.get("/applications/earnings/my", headers=doer_headers).json()
+
+    assert lifecycle.archive_completed_jobs(db, older_than_days=30, batch_size=1) == 1
+
+    assert db.query(models.Job).filter(models.Job.id == old_job).first() is None
+    assert db.query(models.Application).filter(models.Application.job_id == old_job).count() == 0
+    assert db.query(models.Review).filter(models.Review.job_id == old_job).count() == 0
+    assert db.query(models.ArchivedReview).filter(models.ArchivedReview.job_id == old_job).count() == 1
+    assert db.query(models.Job).filter(models.Job.id == recent_job).first() is not None
+
+    # Archived records stay reachable through the detail routes
+    response = client.get(f"/jobs/{old_job}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "completed"
+    poster_headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    applications = client.get(f"/applications/job/{old_job}", headers=poster_headers).json()
+    assert len(applications) == 1
+    assert client.get("/applications/earnings/my", headers=doer_headers).json() == earnings_before
+
+def test_archive_is_resumable(client: TestClient, db: Session, authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test a run cut short by max_batches picks up the rest on the next run"""
+    for _ in range(3):
+        create_completed_job(client, db, authenticated_poster, authenticated_doer, sample_job_data, age_days=90)
+    assert lifecycle.archive_completed_jobs(db, older_than_days=30, batch_size=1, max_batches=2) == 2
+    assert lifecycle.archive_completed_jobs(db, older_than_days=30, batch_size=1) == 1
+    assert lifecycle.archive_completed_jobs(db, older_than_days=30) == 0
+
+def create_open_job(client: TestClient, db: Session, poster: Dict[str, Any], job_data: Dict[str, Any], age_hours: float, estimated_time: str = "2 hours") -> str:
+    headers = {"Authorization": f"Bearer {poster['token']}"}
+    job_id: str = client.post("/jobs/", json={**job_data, "estimated_time": estimated_time}, headers=headers).json()["id"]
+    job = db.query(models.Job).filter(models.Job.id == job_id).one()
+    setattr(job, "created_at", datetime.utcnow() - timedelta(hours=age_hours))
+    db.commit()
+    return job_id
+
+def test_estimated_time_is_parsed(client: TestClient, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test the free-text estimate is kept in minutes on create and update"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job = client.post("/jobs/", json={**sample_job_data, "estimated_time": "1h 30m"}, headers=headers).json()
+    assert job["estimated_minutes"] == 90
+    updated = client.put(f"/jobs/{job['id']}", json={"estimated_time": "whenever"}, headers=headers).json()
+    assert updated["estimated_minutes"] is None
+    assert models.parse_duration_minutes("2-3 days") == 3 * 1440
+    assert models.parse_duration_minutes("half an hour") == 30
+
+def test_backfill_evicts_cached_jobs(client: TestClient, db: Session, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test rows parsed by the bulk backfill are not served stale from the entity cache"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    job_id = client.post("/jobs/", json={**sample_job_data, "estimated_time": "1h 30m"}, headers=headers).json()["id"]
+    # A row from before the column existed, already cached by a read
+    db.execute(update(models.Job).where(models.Job.id == job_id).values(estimated_minutes=None))
+    db.commit()
+    cache.entities.invalidate([cache.entities.key("jobs", "id", uuid.UUID(job_id))])
+    assert client.get(f"/jobs/{job_id}").json()["estimated_minutes"] is None
+    assert lifecycle.backfill_estimated_minutes(db) == 1
+    assert client.get(f"/jobs/{job_id}").json()["estimated_minutes"] == 90
+
+def test_expire_stale_jobs(client: TestClient, db: Session, authenticated_poster: Dict[str, Any], authenticated_doer: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test open jobs past their window expire in batches, and longer estimates get longer"""
+    stale = [create_open_job(client, db, authenticated_poster, sample_job_data, age_hours=30) for _ in range(3)]
+    long_estimate = create_open_job(client, db, authenticated_poster, sample_job_data, age_hours=30, estimated_time="3 days")
+    recent = create_open_job(client, db, authenticated_poster, sample_job_data, age_hours=1)
+    assert client.get(f"/jobs/{stale[0]}").json()["status"] == "open"  # now cached
+
+    assert lifecycle.expire_stale_jobs(db, max_age_hours=24, batch_size=2) == 3
+    assert lifecycle.expire_stale_jobs(db, max_age_hours=24) == 0
+
+    assert client.get(f"/jobs/{stale[0]}").json()["status"] == "expired"
+    assert client.get(f"/jobs/{long_estimate}").json()["status"] == "open"
+    assert client.get(f"/jobs/{recent}").json()["status"] == "open"
+    response = client.post("/applications/", json={"job_id": stale[1]}, headers={"Authorization": f"Bearer {authenticated_doer['token']}"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_expire_batch_runs_on_sqlite() -> None:
+    """Test the expiry UPDATE, estimate window included, also runs on SQLite"""
+    engine = create_engine("sqlite://")
+    models.User.__table__.create(engine)
+    models.Job.__table__.create(engine)
+    now = datetime.utcnow()
+    with Session(engine) as sqlite_db:
+        def add_job(estimated_time: str) -> models.Job:
+            job = models.Job(title="Job", slug=str(uuid.uuid4()), description="d", reward=10, reward_type="credits",
+                             estimated_time=estimated_time, status="open", created_at=now - timedelta(hours=30))
+            sqlite_db.add(job)
+            return job
+        stale, long_estimate = add_job("2 hours"), add_job("3 days")
+        sqlite_db.commit()
+        stale_id, long_id = stale.id, long_estimate.id
+
+        assert lifecycle.expire_batch(sqlite_db, now, max_age_hours=24) == 1
+        sqlite_db.expire_all()
+        assert sqlite_db.get(models.Job, stale_id).status == "expired"
+        assert sqlite_db.get(models.Job, long_id).status == "open"
+
+def test_lease_has_one_holder(db: Session) -> None:
+    """Test a lease stays with its holder until it lapses"""
+    assert lifecycle.acquire_lease(db, "test-task", "worker-a", 60)
+    assert not lifecycle.acquire_lease(db, "test-task", "worker-b", 60)
+    assert lifecycle.acquire_lease(db, "test-task", "worker-a", 60)
+    lease = db.query(models.SchedulerLease).filter(models.SchedulerLease.name == "test-task").one()
+    setattr(lease, "expires_at", datetime.utcnow() - timedelta(seconds=1))
+    db.commit()
+    assert lifecycle.acquire_lease(db, "test-task", "worker-b", 60)
+    lifecycle.release_lease(db, "test-task", "worker-b")
+    assert lifecycle.acquire_lease(db, "test-task", "worker-a", 60)
@@ -0,0 +1,58 @@
+from pathlib import Path
+from fastapi import status
+from fastapi.testclient import TestClient
+from typing import Any, Dict, List
+import pytest
+from app import ratelimit
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_token_bucket_refills() -> None:
+    """Test bucket allows a burst, then refills at capacity/per_seconds"""
+    clock = FakeClock()
+    backend = ratelimit.MemoryBackend(clock=clock)
+    rule = ratelimit.Rule(3, 30)
+    assert [backend.take("k", rule) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert backend.take("k", rule) == pytest.approx(10.0)
+    clock.now += 10
+    assert backend.take("k", rule) == 0.0
+    assert backend.take("other", rule) == 0.0
+
+def test_sqlite_backend_shared_between_workers(tmp_path: Path) -> None:
+    """Test two backends on one file (two workers) draw from the same bucket"""
+    path = str(tmp_path / "buckets.db")
+    worker_a, worker_b = ratelimit.SQLiteBackend(path), ratelimit.SQLiteBackend(path)
+    rule = ratelimit.Rule(2, 60)
+    assert worker_a.take("login|ip:1.2.3.4", rule) == 0.0
+    assert worker_b.take("login|ip:1.2.3.4", rule) == 0.0
+    assert worker_a.take("login|ip:1.2.3.4", rule) > 0
+
+def test_parse_rules() -> None:
+    """Test RATE_LIMITS parsing"""
+    rules = ratelimit.parse_rules("/auth/login=5/60, /chat=20/30")
+    assert rules == {"/auth/login": ratelimit.Rule(5, 60), "/chat": ratelimit.Rule(20, 30)}
+
+def test_login_rate_limited(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test login returns 429 with Retry-After once the bucket is empty"""
+    monkeypatch.setitem(ratelimit.limiter.rules, "/auth/login", ratelimit.Rule(2, 60))
+    form = {"username": "nobody", "password": "wrong"}
+    statuses: List[int] = [client.post("/auth/login", data=form).status_code for _ in range(3)]
+    assert statuses == [status.HTTP_401_UNAUTHORIZED, status.HTTP_401_UNAUTHORIZED, status.HTTP_429_TOO_MANY_REQUESTS]
+    response = client.post("/auth/login", data=form)
+    assert int(response.headers["retry-after"]) > 0
+    # Other routes are unaffected
+    assert client.get("/").status_code == status.HTTP_200_OK
+
+def test_chat_limited_per_user(client: TestClient, authenticated_doer: Dict[str, Any], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test authenticated callers get their own bucket"""
+    monkeypatch.setitem(ratelimit.limiter.rules, "/chat", ratelimit.Rule(1, 60))
+    body: Dict[str, Any] = {"messages": [{"role": "user", "content": "help"}]}
+    headers = {"Authorization": f"Bearer {authenticated_doer['token']}"}
+    assert client.post("/chat", json=body, headers=headers).status_code == status.HTTP_200_OK
+    assert client.post("/chat", json=body, headers=headers).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert client.post("/chat", json=body).status_code == status.HTTP_200_OK
@@ -0,0 +1,57 @@
+import os
+from typing import List, Tuple
+import pytest
+from app import chat_providers, database, serve
+
+def test_worker_count_fits_connection_budget() -> None:
+    """Test the worker count never lets pools exceed max_connections"""
+    per_worker = serve.connections_per_worker(5, 10, listener=True)
+    assert per_worker == 16
+    assert serve.worker_count(cpus=2, max_connections=None, per_worker=per_worker) == 5
+    assert serve.worker_count(cpus=8, max_connections=100, per_worker=per_worker, reserved=5) == 5
+    assert serve.worker_count(cpus=8, max_connections=100, per_worker=per_worker, reserved=5, requested=3) == 3
+    with pytest.raises(SystemExit):
+        serve.worker_count(cpus=1, max_connections=10, per_worker=per_worker, reserved=5)
+
+def test_forked_child_drops_inherited_pools() -> None:
+    """Test a forked worker gets a fresh engine pool and chat provider clients"""
+    chat_providers.set_providers(object())  # type: ignore[arg-type]
+    parent_pool = id(database.engine.pool)
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = id(database.engine.pool) != parent_pool and chat_providers._providers is None
+        os.write(write, b"1" if ok else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b"1"
+    assert id(database.engine.pool) == parent_pool
+    chat_providers.set_providers(None)
+
+def test_reload_replaces_workers_one_at_a_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a reload never has more workers holding pools than planned"""
+    exited: List[int] = []
+    monkeypatch.setattr(serve.os, "kill", lambda pid, sig: exited.append(pid))
+
+    def waitpid(pid: int, options: int) -> Tuple[int, int]:
+        return (exited.pop(0), 0) if exited else (0, 0)
+
+    monkeypatch.setattr(serve.os, "waitpid", waitpid)
+    master = serve.Master(None, None, workers=3, settle_seconds=0)  # type: ignore[arg-type]
+    pids = iter(range(100, 200))
+
+    def spawn() -> int:
+        pid = next(pids)
+        master.children[pid] = 0.0
+        return pid
+
+    monkeypatch.setattr(master, "spawn", spawn)
+    master.step()
+    old = set(master.children)
+    assert len(old) == 3
+
+    master._on_reload()
+    for _ in range(10):
+        master.step()
+        assert len(master.children) + len(master.draining) <= 3
+    assert len(master.children) == 3 and not old & set(master.children)
@@ -0,0 +1,71 @@
+import io
+import os
+from fastapi import status
+from fastapi.testclient import TestClient
+from PIL import Image
+from typing import Any, Dict
+from app import media
+
+def make_png(width: int = 1200, height: int = 900) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (20, 120, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_upload_image(client: TestClient, authenticated_poster: Dict[str, Any]) -> None:
+    """Test uploading an image stores it under its content hash with immutable caching"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}", "Content-Type": "image/png"}
+    body = make_png()
+    response = client.post("/uploads/images", content=body, headers=headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert data["url"].startswith("/media/images/") and data["url"].endswith(".png")
+    # The original until the background render has written the variant
+    assert data["thumbnail_url"] in (data["url"], data["url"][:-4] + "_thumb.webp")
+
+    # Same bytes, same name
+    again = client.post("/uploads/images", content=body, headers=headers)
+    assert again.json()["url"] == data["url"]
+
+    served = client.get(data["url"])
+    assert served.status_code == status.HTTP_200_OK
+    assert served.content == body
+    assert "immutable" in served.headers["cache-control"]
+
+def test_upload_rejects_non_images(client: TestClient, authenticated_poster: Dict[str, Any]) -> None:
+    """Test non-image bodies and anonymous uploads are rejected"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    response = client.post("/uploads/images", content=b"#!/bin/sh\necho hi", headers=headers)
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    response = client.post("/uploads/images", content=make_png())
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_render_variants(tmp_path: Any) -> None:
+    """Test thumbnail and web variants fit their bounding boxes"""
+    source = os.path.join(tmp_path, "photo.png")
+    with open(source, "wb") as f:
+        f.write(make_png(3000, 1000))
+    media.render_variants(source)
+    for variant, (max_width, max_height) in media.VARIANTS.items():
+        with Image.open(os.path.join(tmp_path, f"photo_{variant}.webp")) as image:
+            assert image.width <= max_width and image.height <= max_height
+
+def test_listing_references_thumbnail(client: TestClient, authenticated_poster: Dict[str, Any], sample_job_data: Dict[str, Any]) -> None:
+    """Test job listings expose the thumbnail of uploaded images once it exists, the original until then"""
+    headers = {"Authorization": f"Bearer {authenticated_poster['token']}"}
+    sample_job_data["image_url"] = "/media/images/0123abcd.jpg"
+    client.post("/jobs/", json=sample_job_data, headers=headers)
+    jobs = client.get("/jobs/").json()
+    assert any(job["thumbnail_url"] == "/media/images/0123abcd.jpg" for job in jobs)
+
+    thumbnail = os.path.join(media.IMAGE_DIR, "0123abcd_thumb.webp")
+    with open(thumbnail, "wb") as f:
+        f.write(b"RIFF")
+    try:
+        jobs = client.get("/jobs/").json()
+        assert any(job["thumbnail_url"] == "/media/images/0123abcd_thumb.webp" for job in jobs)
+        # Computed fields can be asked for on their own; image_url is read but not returned
+        sparse = client.get("/jobs/?fields=id,thumbnail_url").json()
+        assert {"/media/images/0123abcd_thumb.webp"} <= {job["thumbnail_url"] for job in sparse}
+        assert all(set(job) == {"id", "thumbnail_url"} for job in sparse)
+    finally:
+        os.remove(thumbnail)
@@ -0,0 +1,46 @@
+-- Upgrade a database created from an earlier schema.sql to the current one.
+-- Every statement can be re-run. New tables are created by the app on start
+-- (create_all), but create_all never changes tables that already exist, so
+-- their new columns and indexes are added here. Run this first, then
+-- python -m app.lifecycle to backfill the new columns.
+
+-- Submissions in the blob store (app/blobstore.py); backfill_submissions moves submitted_work
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS submission_ref VARCHAR(64);
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS submission_size BIGINT;
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS submission_content_type VARCHAR(100);
+ALTER TABLE applications_archive ADD COLUMN IF NOT EXISTS submission_ref VARCHAR(64);
+ALTER TABLE applications_archive ADD COLUMN IF NOT EXISTS submission_size BIGINT;
+ALTER TABLE applications_archive ADD COLUMN IF NOT EXISTS submission_content_type VARCHAR(100);
+
+-- Accounts scheduled for purge are refused at once (app/purge.py); purges are retried
+ALTER TABLE users ADD COLUMN IF NOT EXISTS deactivated_at TIMESTAMP;
+ALTER TABLE purge_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+-- Stale open jobs expire (app/lifecycle.py); longer estimates keep them open longer
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS estimated_minutes INTEGER;
+ALTER TABLE jobs_archive ADD COLUMN IF NOT EXISTS estimated_minutes INTEGER;
+ALTER TABLE jobs DROP CONSTRAINT IF EXISTS jobs_status_check;
+ALTER TABLE jobs ADD CONSTRAINT jobs_status_check CHECK (status IN ('open', 'in_progress', 'completed', 'expired'));
+CREATE INDEX IF NOT EXISTS idx_jobs_status_minutes ON jobs(status, estimated_minutes, id);
+
+-- Indexes checked by tests/test_query_plans.py; the single-column ones they replace are dropped.
+-- The trigram indexes for user search are created by the app when pg_trgm is installed.
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+CREATE INDEX IF NOT EXISTS idx_users_department ON users(department);
+CREATE INDEX IF NOT EXISTS idx_jobs_posted_by_created ON jobs(posted_by, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_reward ON jobs(status, reward, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_reward_type ON jobs(status, reward_type, reward, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_featured ON jobs(status, is_featured, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_department_status ON jobs(department, status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_applications_job_created ON applications(job_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_case_studies_category_difficulty ON case_studies(lower(category), lower(difficulty_level), time_to_deliver);
+CREATE INDEX IF NOT EXISTS idx_case_studies_difficulty_time ON case_studies(lower(difficulty_level), time_to_deliver);
+CREATE INDEX IF NOT EXISTS idx_case_studies_time_to_deliver ON case_studies(time_to_deliver);
+CREATE INDEX IF NOT EXISTS idx_case_studies_created_at ON case_studies(created_at);
+CREATE INDEX IF NOT EXISTS idx_case_studies_tags ON case_studies USING GIN ((lower(tags::text)::jsonb));
+DROP INDEX IF EXISTS idx_jobs_posted_by;
+DROP INDEX IF EXISTS idx_jobs_status;
+DROP INDEX IF EXISTS idx_jobs_department;
+DROP INDEX IF EXISTS idx_applications_job_id;
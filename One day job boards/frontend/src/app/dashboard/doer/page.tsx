@@ -6,13 +6,15 @@ import { api } from "@/lib/api";
 import toast from "react-hot-toast";
 import Link from "next/link";
 import { LoadingSpinner } from "@/components/LoadingSpinner";
+import { SubmittedWork } from "@/components/SubmittedWork";
 
 interface Application {
   id: string;
   job_id: string;
   applicant_id: string;
   status: string;
-  submitted_work?: string;
+  submission_size?: number | null;
+  submission_content_type?: string | null;
   created_at: string;
   job?: {
     id: string;
@@ -256,12 +258,12 @@ export default function DoerDashboard() {
                       </>
                     )}
 
-                    {application.submitted_work && (
-                      <div className="mt-4 p-4 bg-neutral-800/50 rounded-lg">
-                        <p className="text-sm text-neutral-400 mb-2">Submitted Work:</p>
-                        <p className="text-neutral-200">{application.submitted_work}</p>
-                      </div>
-                    )}
+                    <SubmittedWork
+                      applicationId={application.id}
+                      size={application.submission_size}
+                      contentType={application.submission_content_type}
+                      className="bg-neutral-800/50"
+                    />
                   </div>
 
                   {/* Actions */}
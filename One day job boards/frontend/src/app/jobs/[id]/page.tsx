@@ -6,6 +6,7 @@ import { api } from "@/lib/api";
 import toast from "react-hot-toast";
 import Link from "next/link";
 import { LoadingSpinner } from "@/components/LoadingSpinner";
+import { SubmittedWork } from "@/components/SubmittedWork";
 
 interface Job {
   id: string;
@@ -28,7 +29,8 @@ interface Application {
   job_id: string;
   applicant_id: string;
   status: string;
-  submitted_work?: string;
+  submission_size?: number | null;
+  submission_content_type?: string | null;
   created_at: string;
   applicant?: {
     id: string;
@@ -341,12 +343,12 @@ export default function JobDetailPage({ params }: { params: Promise<{ id: string
                           {application.applicant?.department && <p>📁 {application.applicant.department}</p>}
                           <p>📅 Applied: {new Date(application.created_at).toLocaleDateString()}</p>
                         </div>
-                        {application.submitted_work && (
-                          <div className="mt-4 p-4 bg-neutral-900 rounded-lg">
-                            <p className="text-sm text-neutral-400 mb-2">Submitted Work:</p>
-                            <p className="text-neutral-200">{application.submitted_work}</p>
-                          </div>
-                        )}
+                        <SubmittedWork
+                          applicationId={application.id}
+                          size={application.submission_size}
+                          contentType={application.submission_content_type}
+                          className="bg-neutral-900"
+                        />
                       </div>
 
                       {/* Action Buttons */}
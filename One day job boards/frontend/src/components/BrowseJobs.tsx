@@ -76,16 +76,10 @@ export default function BrowseJobs({ showApplyButton = true, initialFilters = {}
       const params: any = {};
       if (filters.department) params.department = filters.department;
       if (filters.status) params.status = filters.status;
+      if (filters.reward_type) params.reward_type = filters.reward_type;
       
       const jobsData = await api.getJobs(params) as Job[];
-      
-      // Filter by reward_type on frontend if needed
-      let filteredJobs = jobsData;
-      if (filters.reward_type) {
-        filteredJobs = jobsData.filter((job: Job) => job.reward_type === filters.reward_type);
-      }
-      
-      setJobs(filteredJobs);
+      setJobs(jobsData);
     } catch (error) {
       const message = error instanceof Error ? error.message : "Failed to fetch jobs";
       toast.error(message);
@@ -18,6 +18,8 @@ export function ChatWidget() {
   const [messages, setMessages] = useState<ChatMessage[]>(initialMessages);
   const [input, setInput] = useState("");
   const [isSending, setIsSending] = useState(false);
+  // The server keeps the conversation; each turn sends only the new message
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const listRef = useRef<HTMLDivElement | null>(null);
 
   useEffect(() => {
@@ -29,12 +31,12 @@ export function ChatWidget() {
     const trimmed = input.trim();
     if (!trimmed || isSending) return;
     const userMessage: ChatMessage = { role: "user", content: trimmed };
-    const nextMessages = [...messages, userMessage];
-    setMessages(nextMessages);
+    setMessages((prev) => [...prev, userMessage]);
     setInput("");
     setIsSending(true);
     try {
-      const response = await api.chat(nextMessages);
+      const response = await api.chat({ session_id: sessionId, message: trimmed });
+      setSessionId(response.session_id ?? null);
       const reply: ChatMessage = { role: "assistant", content: response.reply };
       setMessages((prev) => [...prev, reply]);
     } catch (err) {
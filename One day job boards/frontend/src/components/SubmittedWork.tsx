@@ -0,0 +1,109 @@
+"use client";
+
+import { useState } from "react";
+import toast from "react-hot-toast";
+import { API_URL } from "@/config/api";
+
+interface SubmittedWorkProps {
+  applicationId: string;
+  size?: number | null;
+  contentType?: string | null;
+  className?: string;
+}
+
+// Text submissions are previewed inline from their first bytes; anything else is downloaded
+const PREVIEW_BYTES = 4096;
+
+function formatSize(bytes: number): string {
+  if (bytes < 1024) return `${bytes} B`;
+  if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+}
+
+async function fetchSubmission(applicationId: string, range?: string): Promise<Blob> {
+  const token = localStorage.getItem("token");
+  const response = await fetch(`${API_URL}/applications/${applicationId}/submission`, {
+    headers: {
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      ...(range ? { Range: range } : {}),
+    },
+  });
+  if (!response.ok) {
+    throw new Error(response.status === 404 ? "No submission found" : "Failed to load submission");
+  }
+  return response.blob();
+}
+
+export function SubmittedWork({ applicationId, size, contentType, className = "" }: SubmittedWorkProps) {
+  const [preview, setPreview] = useState<string | null>(null);
+  const [loading, setLoading] = useState(false);
+
+  if (!size) return null;
+
+  const isText = (contentType || "").startsWith("text/");
+
+  const handlePreview = async () => {
+    try {
+      setLoading(true);
+      const blob = await fetchSubmission(applicationId, `bytes=0-${PREVIEW_BYTES - 1}`);
+      setPreview(await blob.text());
+    } catch (error) {
+      toast.error(error instanceof Error ? error.message : "Failed to load submission");
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const handleDownload = async () => {
+    try {
+      setLoading(true);
+      const url = URL.createObjectURL(await fetchSubmission(applicationId));
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `submission-${applicationId}`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      toast.error(error instanceof Error ? error.message : "Failed to download submission");
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className={`mt-4 p-4 rounded-lg ${className}`}>
+      <div className="flex items-center justify-between gap-4">
+        <p className="text-sm text-neutral-400">
+          Submitted Work: {formatSize(size)}
+          {contentType && <span className="text-neutral-500"> · {contentType.split(";")[0]}</span>}
+        </p>
+        <div className="flex gap-2">
+          {isText && preview === null && (
+            <button
+              onClick={handlePreview}
+              disabled={loading}
+              className="px-3 py-1 bg-neutral-700 text-neutral-200 text-sm rounded-lg hover:bg-neutral-600 transition disabled:opacity-50"
+            >
+              Preview
+            </button>
+          )}
+          <button
+            onClick={handleDownload}
+            disabled={loading}
+            className="px-3 py-1 bg-white text-black text-sm font-semibold rounded-lg hover:bg-neutral-200 transition disabled:opacity-50"
+          >
+            {loading ? "..." : "Download"}
+          </button>
+        </div>
+      </div>
+      {preview !== null && (
+        <p className="mt-2 text-neutral-200 whitespace-pre-wrap">
+          {preview}
+          {size > PREVIEW_BYTES && <span className="text-neutral-500">…</span>}
+        </p>
+      )}
+    </div>
+  );
+}
+
+export default SubmittedWork;
@@ -21,10 +21,12 @@ export interface Job {
   posted_by: string;
   department?: string;
   estimated_time?: string;
+  estimated_minutes?: number | null;
   skills_required?: string[];
-  status: 'open' | 'in_progress' | 'completed';
+  status: 'open' | 'in_progress' | 'completed' | 'expired';
   is_featured?: boolean;
   image_url?: string;
+  thumbnail_url?: string;
   created_at: string;
 }
 
@@ -33,7 +35,8 @@ export interface Application {
   job_id: string;
   applicant_id: string;
   status: 'pending' | 'accepted' | 'rejected' | 'completed';
-  submitted_work?: string;
+  submission_size?: number;
+  submission_content_type?: string;
   created_at: string;
 }
 
@@ -47,6 +50,7 @@ export interface CaseStudy {
   difficulty_level: 'easy' | 'medium' | 'hard';
   tags?: string[];
   image_url?: string;
+  thumbnail_url?: string;
   created_at: string;
 }
 
@@ -62,5 +66,51 @@ export interface Review {
 export interface Token {
   access_token: string;
   token_type: string;
+  refresh_token?: string;
 }
 
+
+export interface SubRequest {
+  id?: string;
+  method?: 'GET' | 'PUT' | 'POST' | 'DELETE';
+  path: string;
+  body?: unknown;
+}
+
+export interface SubResponse<T = unknown> {
+  id?: string;
+  status: number;
+  body: T;
+}
+
+export interface BatchResponse {
+  responses: SubResponse[];
+}
+
+export interface PosterDashboardJob {
+  job: Job;
+  applications: {
+    total: number;
+    pending: number;
+    accepted: number;
+    rejected: number;
+    completed: number;
+  };
+  newest_applicant?: { id: string; username?: string; applied_at?: string } | null;
+  reviews: { count: number; average_rating?: number | null };
+}
+
+export interface PosterDashboard {
+  items: PosterDashboardJob[];
+  next_cursor?: string | null;
+}
+
+export interface ChatRequest {
+  session_id?: string | null;
+  message: string;
+}
+
+export interface ChatResponse {
+  reply: string;
+  session_id?: string | null;
+}